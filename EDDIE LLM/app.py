@@ -1,12 +1,39 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
-from llm_pipeline import process_user_query
 
 # ===== PAGE CONFIG =====
 st.set_page_config(page_title="EDDIE", layout="wide")
 
-# ===== SESSION STORAGE (ONLY CHAT HISTORY) =====
+
+# ===== SHARED RESOURCES (ONE PER SERVER PROCESS, NOT PER SESSION/RERUN) =====
+@st.cache_resource
+def load_pipeline():
+    """Chroma client, embedding model, HTTP sessions and ingest workers are created on import."""
+    import llm_pipeline
+    return llm_pipeline
+
+
+@st.cache_resource
+def query_pool() -> ThreadPoolExecutor:
+    """Queries run here so a long one never blocks the script thread of any session."""
+    return ThreadPoolExecutor(max_workers=int(os.getenv("EDDIE_UI_WORKERS", "4")),
+                              thread_name_prefix="eddie-query")
+
+
+pipeline = load_pipeline()
+
+# ===== SESSION STORAGE (CHAT HISTORY + RUNNING QUERY) =====
 if "messages" not in st.session_state:
     st.session_state.messages = []   # list of {role, content}
+if "last_trace" not in st.session_state:
+    st.session_state.last_trace = None   # stage timings of the latest query
+if "pending" not in st.session_state:
+    st.session_state.pending = None   # {future, trace, started} while a query runs
+if "context" not in st.session_state:
+    st.session_state.context = pipeline.ConversationContext()   # what follow-ups refer to
 
 
 # ===== DARK THEME UI =====
@@ -18,26 +45,10 @@ st.markdown("""
         font-family: 'Inter', sans-serif;
     }
 
-    .chat-bubble {
-        padding: 12px 18px;
+    [data-testid="stChatMessage"] {
         border-radius: 12px;
-        margin-bottom: 12px;
-        max-width: 75%;
         line-height: 1.5;
         font-size: 16px;
-        word-wrap: break-word;
-    }
-
-    .assistant {
-        background-color: #1E222A;
-        color: #EDEDED;
-        margin-right: auto;
-    }
-
-    .user {
-        background-color: #0078FF;
-        color: white;
-        margin-left: auto;
     }
 
     .chat-input-container {
@@ -80,57 +91,121 @@ with st.sidebar:
     st.title("EDDIE ⚙️")
     if st.button("🔁 Reload"):
         st.session_state.messages = []
+        st.session_state.last_trace = None
+        st.session_state.pending = None
+        st.session_state.context = pipeline.ConversationContext()
         st.rerun()
 
+    # Optional timings panel (per-stage spans of the last query)
+    if st.checkbox("⏱️ Show stage timings") and st.session_state.last_trace:
+        trace = st.session_state.last_trace
+        st.metric("Total", f"{trace['duration_ms'] / 1000:.2f} s")
+        st.dataframe(
+            [
+                {
+                    "stage": s["stage"],
+                    "ms": s["duration_ms"],
+                    "bytes": s.get("bytes"),
+                    "tokens": s.get("tokens"),
+                    "cache": s.get("cache"),
+                }
+                for s in trace["spans"]
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+
 
 # ===== TITLE =====
 st.markdown("<h1 style='text-align:center; color:#EDEDED;'>💼 EDDIE</h1>", unsafe_allow_html=True)
 st.caption("AI Financial Research Assistant")
 
 
-# ===== DISPLAY CHAT HISTORY =====
+# ===== DISPLAY CHAT HISTORY (full reruns only: first load, sidebar) =====
 chat_container = st.container()
 
 with chat_container:
     for msg in st.session_state.messages:
-        bubble_class = "assistant" if msg["role"] == "assistant" else "user"
-        st.markdown(
-            f"<div class='chat-bubble {bubble_class}'>{msg['content']}</div>",
-            unsafe_allow_html=True
-        )
-
-
-# ===== INPUT BAR (FIXED AT BOTTOM) =====
-st.markdown("<div class='chat-input-container'>", unsafe_allow_html=True)
-
-col1, col2 = st.columns([8, 1])
-with col1:
-    user_input = st.text_input("Ask EDDIE...", "", label_visibility="collapsed")
-
-with col2:
-    send = st.button("Enter")
-
-st.markdown("</div>", unsafe_allow_html=True)
-
-
-# ===== MESSAGE HANDLING =====
-if send:
-    if not user_input.strip():
-        st.warning("⚠️ Please enter something before pressing Enter.")
-    else:
-        # Add user message to chat history
-        st.session_state.messages.append({
-            "role": "user",
-            "content": user_input
-        })
-
-        # Run LLM + dispatch logic
-        final_answer = process_user_query(user_input)
-
-        # Add assistant message to chat history
-        st.session_state.messages.append({
-            "role": "assistant",
-            "content": final_answer
-        })
-
-        st.rerun()  # Refresh UI to show new messages
+        with st.chat_message(msg["role"]):
+            st.markdown(msg["content"])
+st.session_state.drawn = len(st.session_state.messages)   # turns after this are drawn by the fragments
+
+
+# ===== RUNNING QUERY (only this fragment reruns while waiting) =====
+@st.fragment(run_every=0.5)
+def pending_answer():
+    job = st.session_state.pending
+    if job is not None and job["future"].done():
+        try:
+            answer = job["future"].result()
+        except Exception as e:
+            answer = f"❌ {e}"
+        st.session_state.messages.append({"role": "assistant", "content": answer})
+        st.session_state.last_trace = job["trace"].to_dict()
+        st.session_state.pending = None
+
+    # The answer lands here, not in a full rerun that would redraw the whole history
+    for msg in st.session_state.messages[st.session_state.shown:]:
+        with st.chat_message(msg["role"]):
+            st.markdown(msg["content"])
+
+    job = st.session_state.pending
+    if job is not None:
+        done = [s["stage"] for s in job["trace"].spans]
+        with st.chat_message("assistant"):
+            st.markdown(f"⏳ Working… {time.time() - job['started']:.1f}s"
+                        + (f" · done: {', '.join(done)}" if done else ""))
+
+
+# ===== NEW TURNS + INPUT BAR (Enter reruns this fragment, not the app) =====
+@st.fragment
+def conversation():
+    new_turns = st.container()
+    live = st.container()    # fixed slot, so pending_answer keeps one fragment id across turns
+
+    st.markdown("<div class='chat-input-container'>", unsafe_allow_html=True)
+
+    col1, col2 = st.columns([8, 1])
+    with col1:
+        user_input = st.text_input("Ask EDDIE...", "", label_visibility="collapsed")
+
+    with col2:
+        send = st.button("Enter")
+
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # ===== MESSAGE HANDLING =====
+    if send:
+        if not user_input.strip():
+            st.warning("⚠️ Please enter something before pressing Enter.")
+        elif st.session_state.pending is not None:
+            st.info("⏳ Still working on the previous question.")
+        else:
+            # Add user message to chat history
+            st.session_state.messages.append({
+                "role": "user",
+                "content": user_input
+            })
+
+            # Run LLM + dispatch logic in the shared worker pool
+            trace = pipeline.Trace("query")
+            st.session_state.pending = {
+                "future": query_pool().submit(pipeline.process_user_query, user_input, trace=trace,
+                                              context=st.session_state.context),
+                "trace": trace,
+                "started": time.time(),
+            }
+
+    # Only the turns since the last full rerun; older ones stay as chat_container drew them
+    with new_turns:
+        for msg in st.session_state.messages[st.session_state.drawn:]:
+            with st.chat_message(msg["role"]):
+                st.markdown(msg["content"])
+    st.session_state.shown = len(st.session_state.messages)
+
+    if st.session_state.pending is not None:
+        with live:
+            pending_answer()
+
+
+conversation()
@@ -0,0 +1,492 @@
+# benchmark.py
+"""
+Offline benchmark harness for EDDIE.
+
+Measures, over the bundled docs/UNKNOWN_*_10-K.txt (and synthetic scaled-up
+corpora built from them):
+1. Cleaning throughput       (rag_engine.clean_html, MB/s)
+2. Chunking throughput       (rag_engine.chunk_text_simple, chunks/s)
+3. Embedding throughput      (local MiniLM embedding function, chunks/s)
+4. Chroma ingest + query     (chunks/s, query p50/p95 at 10k … 1M chunks), against
+                              exact per-filing .npy search (RAG/vectors.py): p50/p95
+                              and recall@6 of the filtered HNSW query
+5. End-to-end latency        (process_user_query, p50/p95)
+6. Quantized vectors         (RAG/vectors.py int8 tier: bytes read per query, extra
+                              bytes on disk, recall@k and latency vs float32 on the
+                              embedded bundled docs)
+7. LLM client hedging        (RAG.llm_client p50/p95 with and without hedging
+                              against a jittery and a steady stub provider)
+
+OpenRouter, Gemini, /dispatch and the SEC archive are replaced by local stub
+servers (see stub_servers.py), so runs are reproducible and need no API keys.
+Results are written as JSON so two commits can be compared:
+
+    python benchmark.py --out bench/HEAD.json
+    python benchmark.py --out bench/new.json --compare bench/HEAD.json
+    python benchmark.py --only chroma --scales 10000,100000,1000000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Same path trick as llm_pipeline: make the repo root importable for RAG.*
+WORK_DIR = Path(__file__).resolve().parent.parent
+if str(WORK_DIR) not in sys.path:
+    sys.path.insert(0, str(WORK_DIR))
+
+import stub_servers
+
+SECTIONS = ["clean", "chunk", "embed", "chroma", "quant", "e2e", "llm"]
+
+E2E_QUERIES = [
+    "What is the CIK of AAPL?",
+    "Company info for MSFT",
+    "Fetch revenue of AMZN for 2022",
+    "Summarize the risk factors in the 2023 10-K for TSLA",
+    "What did NFLX say about liquidity in its 2022 10-K?",
+]
+
+
+# -------------------------------------------------------
+# Helpers
+# -------------------------------------------------------
+def percentile(samples: list, p: float) -> float:
+    """Nearest-rank percentile (p in 0..100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def latency_stats(samples_s: list) -> dict:
+    ms = [s * 1000 for s in samples_s]
+    return {
+        "n": len(ms),
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).resolve().parent, timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def synthetic_chunks(base: list, n: int) -> list:
+    """Cycle the real chunks up to `n` documents (suffix keeps them distinct)."""
+    return [f"{base[i % len(base)]} [s{i}]" for i in range(n)]
+
+
+def random_unit_vectors(rng, n: int, dim: int):
+    import numpy as np
+    vecs = rng.standard_normal((n, dim), dtype=np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    return vecs
+
+
+# -------------------------------------------------------
+# 1 + 2. Cleaning & chunking
+# -------------------------------------------------------
+def bench_clean(rag, html_docs: list, repeat: int) -> dict:
+    total_bytes = sum(len(h) for h in html_docs) * repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in html_docs:
+            rag.clean_html(html)
+    elapsed = time.perf_counter() - start
+    return {
+        "docs": len(html_docs) * repeat,
+        "mb": round(total_bytes / 1e6, 3),
+        "seconds": round(elapsed, 4),
+        "mb_per_s": round(total_bytes / 1e6 / elapsed, 3),
+    }
+
+
+def bench_chunk(rag, texts: list, repeat: int) -> dict:
+    n_chunks, total_bytes = 0, sum(len(t) for t in texts) * repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            n_chunks += len(rag.chunk_text_simple(text))
+    elapsed = time.perf_counter() - start
+    return {
+        "chunks": n_chunks,
+        "mb": round(total_bytes / 1e6, 3),
+        "seconds": round(elapsed, 4),
+        "chunks_per_s": round(n_chunks / elapsed, 1),
+        "mb_per_s": round(total_bytes / 1e6 / elapsed, 3),
+    }
+
+
+# -------------------------------------------------------
+# 3. Embedding
+# -------------------------------------------------------
+def bench_embed(rag, chunks: list, batch_size: int = 100) -> dict:
+    rag.local_ef(chunks[:2])   # warm-up: model load is not throughput
+    start = time.perf_counter()
+    for i in range(0, len(chunks), batch_size):
+        rag.local_ef(chunks[i:i + batch_size])
+    elapsed = time.perf_counter() - start
+    return {
+        "chunks": len(chunks),
+        "seconds": round(elapsed, 4),
+        "chunks_per_s": round(len(chunks) / elapsed, 1),
+    }
+
+
+# -------------------------------------------------------
+# 4. Chroma ingest + query at scale
+# -------------------------------------------------------
+def bench_chroma(base_chunks: list, scales: list, queries: int, dim: int,
+                 filing_size: int, workdir: str, seed: int) -> dict:
+    """
+    Embeddings are random unit vectors so this isolates Chroma itself from
+    the embedding model. Filters mirror rag_pipeline: one {company, year}.
+    The same vectors are written as per-filing matrices for the exact path.
+    """
+    import chromadb
+    import numpy as np
+    from RAG.vectors import VectorStore
+
+    rng = np.random.default_rng(seed)
+    out = {}
+    for scale in scales:
+        client = chromadb.PersistentClient(path=os.path.join(workdir, f"chroma_{scale}"))
+        coll = client.get_or_create_collection(name="bench", metadata={"hnsw:space": "cosine"},
+                                               embedding_function=None)
+        store = VectorStore(os.path.join(workdir, f"vectors_{scale}"))
+        docs = synthetic_chunks(base_chunks, scale)
+        n_filings = max(1, -(-scale // filing_size))
+
+        batch = 5000
+        pending_ids, pending_vecs = [], []
+        start = time.perf_counter()
+        for i in range(0, scale, batch):
+            n = min(batch, scale - i)
+            vecs = random_unit_vectors(rng, n, dim)
+            coll.add(
+                ids=[f"c{i + j}" for j in range(n)],
+                documents=docs[i:i + n],
+                embeddings=vecs.tolist(),
+                metadatas=[{"company": f"F{(i + j) // filing_size}", "year": "2023"} for j in range(n)],
+            )
+            pending_ids += [f"c{i + j}" for j in range(n)]
+            pending_vecs.append(vecs)
+            # Flush every filing whose rows are all in (what ingestion does per section)
+            done = len(pending_ids) if i + n == scale else len(pending_ids) - (i + n) % filing_size
+            if done:
+                mat = np.concatenate(pending_vecs)
+                for a in range(0, done, filing_size):
+                    first = int(pending_ids[a][1:])
+                    store.write_section(f"F{first // filing_size}", "2023", "all",
+                                        pending_ids[a:a + filing_size], mat[a:a + filing_size])
+                pending_ids, pending_vecs = pending_ids[done:], [mat[done:]]
+        ingest_s = time.perf_counter() - start
+
+        qvecs = random_unit_vectors(rng, queries, dim).tolist()
+        filtered, unfiltered, exact, recall = [], [], [], []
+        for q in qvecs:
+            company = f"F{int(rng.integers(n_filings))}"
+            t0 = time.perf_counter()
+            got = coll.query(query_embeddings=[q], n_results=6,
+                             where={"$and": [{"company": company}, {"year": "2023"}]})
+            filtered.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            truth = store.search(q, [(company, "2023", ["all"])], 6)
+            exact.append(time.perf_counter() - t0)
+            truth_ids = {cid for cid, _ in truth}
+            recall.append(len(truth_ids & set(got["ids"][0])) / max(1, len(truth_ids)))
+            t0 = time.perf_counter()
+            coll.query(query_embeddings=[q], n_results=6)
+            unfiltered.append(time.perf_counter() - t0)
+
+        out[str(scale)] = {
+            "ingest_seconds": round(ingest_s, 3),
+            "ingest_chunks_per_s": round(scale / ingest_s, 1),
+            "query_filtered": latency_stats(filtered),
+            "query_unfiltered": latency_stats(unfiltered),
+            "query_exact": latency_stats(exact),
+            "recall_at_6_filtered": round(sum(recall) / len(recall), 4),
+        }
+        print(f"   chroma @ {scale:>9,} chunks → ingest {scale / ingest_s:,.0f}/s, "
+              f"filtered p95 {out[str(scale)]['query_filtered']['p95_ms']} ms, "
+              f"exact p95 {out[str(scale)]['query_exact']['p95_ms']} ms, "
+              f"filtered recall@6 {out[str(scale)]['recall_at_6_filtered']}")
+        del coll, client
+    return out
+
+
+# -------------------------------------------------------
+# 4b. int8 vector tier vs float32
+# -------------------------------------------------------
+def bench_quant(rag, chunks: list, queries: int, k: int, workdir: str, seed: int) -> dict:
+    """
+    The bundled docs, embedded with the real model, as one "filing": float32
+    exact search is the ground truth, int8 is measured with and without
+    float32 re-scoring of the shortlist.
+    """
+    import numpy as np
+    from RAG.vectors import VectorStore
+
+    rng = random.Random(seed)
+    ids = [f"q_{i}" for i in range(len(chunks))]
+    embeddings = []
+    for i in range(0, len(chunks), 100):
+        embeddings += list(rag.local_ef(chunks[i:i + 100]))
+    store = VectorStore(os.path.join(workdir, "quant"), tier="int8")
+    store.write_section("BENCH", "2023", "all", ids, embeddings)
+    scope = [("BENCH", "2023", ["all"])]
+
+    # Queries: the e2e questions + opening words of random chunks
+    texts = E2E_QUERIES + [" ".join(c.split()[:12]) for c in rng.sample(chunks, min(queries, len(chunks)))]
+    qvecs = [np.asarray(v, dtype=np.float32) for v in rag.local_ef(texts)]
+
+    modes = {
+        "float32": VectorStore(os.path.join(workdir, "quant"), tier="float32"),
+        "int8_rescored": store,
+        "int8_only": VectorStore(os.path.join(workdir, "quant"), tier="int8", rescore=1),
+    }
+    truth = [{cid for cid, _ in modes["float32"].search(q, scope, k)} for q in qvecs]
+    out = {"chunks": len(chunks), "queries": len(qvecs), "k": k,
+           **store.footprint("BENCH", "2023", ["all"], k=k)}
+    disk, read = out["disk_bytes"], out["query_bytes"]
+    out["query_bytes_saved_pct"] = round(100 * (1 - read["int8"] / read["float32"]), 1)
+    out["disk_bytes_added_pct"] = round(100 * disk["int8"] / disk["float32"], 1)
+    for name, vs in modes.items():
+        samples, recall = [], []
+        for q, t in zip(qvecs, truth):
+            t0 = time.perf_counter()
+            got = vs.search(q, scope, k)
+            samples.append(time.perf_counter() - t0)
+            recall.append(len(t & {cid for cid, _ in got}) / max(1, len(t)))
+        out[name] = {**latency_stats(samples), f"recall_at_{k}": round(sum(recall) / len(recall), 4)}
+    print(f"   int8: {out['query_bytes_saved_pct']}% fewer bytes read per query, "
+          f"+{out['disk_bytes_added_pct']}% vector-file bytes on disk, recall@{k} "
+          f"{out['int8_rescored'][f'recall_at_{k}']} re-scored / {out['int8_only'][f'recall_at_{k}']} int8 only")
+    return out
+
+
+# -------------------------------------------------------
+# 5. End-to-end process_user_query
+# -------------------------------------------------------
+def bench_e2e(rounds: int) -> dict:
+    from llm_pipeline import process_user_query
+    from RAG.tracing import Trace
+
+    samples, per_query, per_stage, errors = [], {}, {}, 0
+    for _ in range(rounds):
+        for q in E2E_QUERIES:
+            trace = Trace("bench")
+            t0 = time.perf_counter()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    process_user_query(q, trace=trace)
+            except Exception as e:
+                errors += 1
+                print(f"   ⚠️ {q!r}: {e}")
+            dt = time.perf_counter() - t0
+            samples.append(dt)
+            per_query.setdefault(q, []).append(dt)
+            for stage, ms in trace.stage_totals().items():
+                per_stage.setdefault(stage, []).append(ms / 1000)
+    result = latency_stats(samples)
+    result["errors"] = errors
+    result["by_query"] = {q: latency_stats(v) for q, v in per_query.items()}
+    result["by_stage"] = {st: latency_stats(v) for st, v in per_stage.items()}
+    return result
+
+
+# -------------------------------------------------------
+# 6. LLM client: hedged vs plain calls
+# -------------------------------------------------------
+def bench_llm(calls: int, latency: float, jitter: float) -> dict:
+    """
+    Two OpenRouter stubs: "flaky" has a long random tail, "steady" does not.
+    The route prefers "flaky"; with hedging the tail should be cut to roughly
+    the flaky provider's p90 + the steady provider's latency.
+    """
+    from RAG.llm_client import LLMClient, OpenRouterProvider
+
+    flaky = stub_servers.StubServer(stub_servers.OpenRouterHandler, latency, jitter).start()
+    steady = stub_servers.StubServer(stub_servers.OpenRouterHandler, latency * 2, 0.0).start()
+    out = {}
+    try:
+        for hedge in (False, True):
+            client = LLMClient(
+                {
+                    "flaky": OpenRouterProvider("stub", f"{flaky.url}/api/v1/chat/completions", "stub"),
+                    "steady": OpenRouterProvider("stub", f"{steady.url}/api/v1/chat/completions", "stub"),
+                },
+                {"bench": ["flaky", "steady"]},
+                deadline=30, hedge=hedge,
+            )
+            samples, hedged = [], 0
+            for _ in range(calls):
+                t0 = time.perf_counter()
+                res = client.complete("benchmark prompt", route="bench", max_tokens=16)
+                samples.append(time.perf_counter() - t0)
+                hedged += res["hedged"]
+            key = "hedged" if hedge else "plain"
+            out[key] = {**latency_stats(samples), "hedged_calls": hedged, "providers": client.stats()}
+            print(f"   {key}: p50 {out[key]['p50_ms']} ms, p95 {out[key]['p95_ms']} ms, "
+                  f"{hedged}/{calls} hedged")
+    finally:
+        flaky.stop()
+        steady.stop()
+    return out
+
+
+# -------------------------------------------------------
+# Regression comparison
+# -------------------------------------------------------
+def _flatten(d: dict, prefix: str = "") -> dict:
+    flat = {}
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else k
+        if isinstance(v, dict):
+            flat.update(_flatten(v, key))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            flat[key] = v
+    return flat
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Return human-readable regressions (throughput down / latency up beyond tolerance)."""
+    cur, base = _flatten(current["results"]), _flatten(baseline["results"])
+    regressions = []
+    for key, new in cur.items():
+        old = base.get(key)
+        if not old or not (key.endswith("_per_s") or key.endswith("_ms")):
+            continue
+        change = (new - old) / old
+        worse = change < -tolerance if key.endswith("_per_s") else change > tolerance
+        if worse:
+            regressions.append(f"{key}: {old} → {new} ({change:+.1%})")
+    return regressions
+
+
+# -------------------------------------------------------
+# MAIN
+# -------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="EDDIE offline benchmark")
+    parser.add_argument("--only", default=",".join(SECTIONS), help="comma list of: " + ",".join(SECTIONS))
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--compare", default=None, help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the docs for clean/chunk")
+    parser.add_argument("--doc-multiplier", type=int, default=8, help="size of the synthetic scaled-up doc")
+    parser.add_argument("--embed-chunks", type=int, default=512)
+    parser.add_argument("--scales", default="10000,100000", help="chroma corpus sizes (e.g. 10000,100000,1000000)")
+    parser.add_argument("--queries", type=int, default=200, help="queries per chroma scale")
+    parser.add_argument("--filing-size", type=int, default=300, help="chunks per synthetic filing")
+    parser.add_argument("--e2e-rounds", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="stub LLM latency (s)")
+    parser.add_argument("--llm-calls", type=int, default=100, help="calls per mode in the llm section")
+    parser.add_argument("--llm-jitter", type=float, default=0.3, help="tail jitter (s) of the flaky llm stub")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    only = {s.strip() for s in args.only.split(",") if s.strip()}
+    random.seed(args.seed)
+    workdir = tempfile.mkdtemp(prefix="eddie_bench_")
+
+    # Everything the pipeline talks to is local from here on.
+    servers = stub_servers.start_all(llm_latency=args.llm_latency)
+    os.environ.update(stub_servers.stub_env(servers))
+    os.environ["CHROMA_DB_DIR"] = os.path.join(workdir, "pipeline_db")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from RAG import rag_engine as rag   # imported late: reads the env above
+
+    docs = stub_servers.load_docs()
+    texts = list(docs.values())
+    big_text = "\n".join(texts) * args.doc_multiplier
+    html_docs = [stub_servers.text_to_html(t) for t in texts]
+    base_chunks = [c for t in texts for c in rag.chunk_text_simple(t)]
+
+    results = {}
+    try:
+        if "clean" in only:
+            print("🧽 Cleaning throughput...")
+            results["clean"] = {
+                "bundled": bench_clean(rag, html_docs, args.repeat),
+                "synthetic": bench_clean(rag, [stub_servers.text_to_html(big_text)], 1),
+            }
+        if "chunk" in only:
+            print("✂️ Chunking throughput...")
+            results["chunk"] = {
+                "bundled": bench_chunk(rag, texts, args.repeat),
+                "synthetic": bench_chunk(rag, [big_text], 1),
+            }
+        if "embed" in only:
+            print("🧮 Embedding throughput...")
+            results["embed"] = bench_embed(rag, synthetic_chunks(base_chunks, args.embed_chunks))
+        if "chroma" in only:
+            print("🗄️ Chroma ingest / query...")
+            scales = [int(s) for s in args.scales.split(",") if s.strip()]
+            results["chroma"] = bench_chroma(base_chunks, scales, args.queries, 384,
+                                             args.filing_size, workdir, args.seed)
+        if "quant" in only:
+            print("🗜️ int8 vector tier vs float32...")
+            results["quant"] = bench_quant(rag, base_chunks, args.queries, 6, workdir, args.seed)
+        if "e2e" in only:
+            print("🔁 End-to-end process_user_query...")
+            results["e2e"] = bench_e2e(args.e2e_rounds)
+        if "llm" in only:
+            print("🛰️ LLM client hedging...")
+            results["llm"] = bench_llm(args.llm_calls, max(args.llm_latency, 0.02), args.llm_jitter)
+    finally:
+        for s in servers.values():
+            s.stop()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text, encoding="utf-8")
+        print(f"📄 Results written to {args.out}")
+    else:
+        print(text)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("❌ Regressions vs baseline:")
+            for r in regressions:
+                print("   " + r)
+            sys.exit(1)
+        print("✅ No regressions vs baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# conversation.py
+"""
+Per-session conversation context for follow-up questions.
+
+Only structured state is kept: the last resolved ticker / year / form, the
+/dispatch request, the filing and the chunk ids retrieved for it, plus a
+tiny LRU of dispatch results. No transcript, so memory stays constant no
+matter how long the chat gets.
+
+    "Summarize the risk factors in TSLA's 2023 10-K"   → normal pipeline
+    "and for 2022?"        → same request with year=2022, no LLM parse
+    "tell me more"         → same filing, same retrieved chunks, no re-dispatch
+    "what about its debt?" → LLM parse, missing ticker/year filled from context
+"""
+
+import copy
+import json
+import re
+from collections import OrderedDict
+
+FOLLOWUP_START = re.compile(r"^\s*(and|also|what about|how about|same for|same but|now)\b", re.IGNORECASE)
+ELABORATE = re.compile(
+    r"\b(more detail|more details|elaborate|expand on|tell me more|go deeper|explain (?:that|this|it)|why is that)\b|^\s*why\??\s*$",
+    re.IGNORECASE,
+)
+YEAR = re.compile(r"\b(?:19|20)\d{2}\b")
+TICKER = re.compile(r"\b[A-Z]{1,5}\b")
+NOT_TICKERS = {"I", "A", "K", "Q", "MD", "AND", "FOR", "THE", "SEC", "CIK", "US", "USA", "OK"}
+
+# Words that may surround a substitution ("and for 2022?", "what about MSFT in 2021")
+FILLER = {
+    "and", "also", "what", "about", "how", "same", "but", "now", "for", "in", "the",
+    "year", "fiscal", "fy", "please", "then", "of", "with", "instead",
+}
+
+MAX_ELABORATE_WORDS = 8
+MAX_DISPATCH_CACHE = 4
+
+
+def _is_screen(json_query: dict) -> bool:
+    """Cross-company screens are never tied to the conversation's company or cached."""
+    return "screen" in (json_query.get("actions") or [])
+
+class ConversationContext:
+    def __init__(self):
+        self.ticker = None
+        self.year = None
+        self.form_type = None
+        self.json_query = None      # last resolved /dispatch request
+        self.topic = None           # last standalone question (what "and for 2022?" refers to)
+        self.filing = None          # (ticker, year, url) the chunk ids belong to
+        self.chunk_ids = []
+        self._dispatch = OrderedDict()
+        self.elaborating = False
+
+    # ---- resolving the next question -----------------------------------
+    def resolve(self, user_query: str):
+        """
+        Pure follow-up → (json_query, effective_query) built locally, else None.
+        effective_query is the previous question rewritten for the new
+        ticker/year, so downstream keyword routing still sees the topic.
+        """
+        self.elaborating = False
+        if self.json_query is None or not self.topic:
+            return None
+
+        words = user_query.split()
+        if ELABORATE.search(user_query) and len(words) <= MAX_ELABORATE_WORDS:
+            self.elaborating = True
+            return copy.deepcopy(self.json_query), f"{self.topic} — {user_query.strip()}"
+
+        if not FOLLOWUP_START.match(user_query):
+            return None
+
+        years = YEAR.findall(user_query)
+        tickers = [t for t in TICKER.findall(user_query) if t not in NOT_TICKERS]
+        residue = [w for w in re.findall(r"[A-Za-z0-9&']+", user_query)
+                   if w.lower() not in FILLER and w not in years and w not in tickers]
+        if residue or not (years or tickers):
+            return None     # a new question about the same company, not a substitution
+
+        json_query = copy.deepcopy(self.json_query)
+        query = self.topic
+        if years:
+            json_query["year"] = int(years[0])
+            query = self._swap(query, str(self.year), years[0], f"in {years[0]}")
+        if tickers:
+            json_query["ticker"] = tickers[0]
+            query = self._swap(query, self.ticker, tickers[0], f"for {tickers[0]}")
+        return json_query, query
+
+    @staticmethod
+    def _swap(text: str, old, new: str, suffix: str) -> str:
+        if old and re.search(rf"\b{re.escape(str(old))}\b", text):
+            return re.sub(rf"\b{re.escape(str(old))}\b", new, text)
+        return f"{text} ({suffix})"
+
+    def fill_missing(self, json_query: dict) -> dict:
+        """
+        LLM-parsed request without a ticker → same company, year and form as
+        before. Not for screens: their empty ticker means "all companies".
+        """
+        if _is_screen(json_query):
+            return json_query
+        if not json_query.get("ticker") and self.ticker:
+            json_query["ticker"] = self.ticker
+            if json_query.get("year") is None and self.year is not None:
+                json_query["year"] = self.year
+            if not json_query.get("form_type") and self.form_type:
+                json_query["form_type"] = self.form_type
+        return json_query
+
+    def hint(self) -> str:
+        """One line for the NL → JSON prompt, e.g. "ticker=AAPL, year=2023, form_type=10-K"."""
+        fields = {"ticker": self.ticker, "year": self.year, "form_type": self.form_type}
+        return ", ".join(f"{k}={v}" for k, v in fields.items() if v is not None)
+
+    # ---- remembering what was resolved ---------------------------------
+    def remember(self, json_query: dict, topic: str):
+        self.json_query = copy.deepcopy(json_query)
+        self.ticker = json_query.get("ticker") or self.ticker
+        self.year = json_query.get("year") if json_query.get("year") is not None else self.year
+        self.form_type = json_query.get("form_type") or self.form_type
+        self.topic = topic
+
+    def remember_retrieval(self, ticker: str, year, url: str, chunk_ids: list):
+        self.filing = (ticker, str(year), url)
+        self.chunk_ids = list(chunk_ids)
+
+    def reusable_chunks(self, ticker: str, year, url: str) -> list:
+        """Chunk ids to answer an elaboration from, if it is about the same filing."""
+        if self.elaborating and self.filing == (ticker, str(year), url):
+            return self.chunk_ids
+        return []
+
+    # ---- dispatch results (small LRU) ----------------------------------
+    def cached_dispatch(self, json_query: dict):
+        if _is_screen(json_query):
+            return None
+        key = json.dumps(json_query, sort_keys=True)
+        if key in self._dispatch:
+            self._dispatch.move_to_end(key)
+            return self._dispatch[key]
+        return None
+
+    def store_dispatch(self, json_query: dict, result: dict):
+        if _is_screen(json_query):
+            return
+        self._dispatch[json.dumps(json_query, sort_keys=True)] = result
+        while len(self._dispatch) > MAX_DISPATCH_CACHE:
+            self._dispatch.popitem(last=False)
@@ -0,0 +1,205 @@
+# dispatch_format.py
+"""
+Compact rendering of /dispatch results for LLM prompts.
+
+json.dumps(dispatch_output, indent=2) of a multi-year get_company_facts
+response runs to tens of thousands of tokens, most of it the same value
+re-reported by every later 10-K/10-Q. Instead we:
+1. Deduplicate facts by (metric, period), keeping the latest filing
+2. Render them as a small pipe-separated table
+3. Stop adding rows once a token budget is reached (newest periods first,
+   round-robin across metrics so every metric gets its latest value)
+get_derived_metrics results are already aligned by period, so they become
+one row per period (newest first) with ratios rendered as percentages;
+screen results become one row per ranked company.
+"""
+
+import json
+
+from RAG.tracing import approx_tokens
+
+DEFAULT_TOKEN_BUDGET = 1500
+
+
+# -------------------------------------------------------
+# 1. Facts: dedupe by (metric, period)
+# -------------------------------------------------------
+def period_label(entry: dict) -> str:
+    """CY2023 / CY2023Q1 style frame if present, else start..end (or end for instants)."""
+    if entry.get("frame"):
+        return entry["frame"]
+    if entry.get("start"):
+        return f"{entry['start']}..{entry.get('end')}"
+    return str(entry.get("end"))
+
+
+def dedupe_facts(details: dict) -> dict:
+    """{metric: [entries]} → {metric: [one entry per period, newest period first]}"""
+    out = {}
+    for metric, entries in (details or {}).items():
+        latest = {}
+        for e in entries or []:
+            key = (e.get("start"), e.get("end"))
+            if key not in latest or e.get("filed", "") >= latest[key].get("filed", ""):
+                latest[key] = e
+        out[metric] = sorted(latest.values(), key=lambda e: (e.get("end") or "", e.get("start") or ""), reverse=True)
+    return out
+
+
+def format_value(val) -> str:
+    if isinstance(val, (int, float)) and not isinstance(val, bool):
+        if abs(val) >= 1000:
+            return f"{val:,.0f}"
+        return f"{val:g}"
+    return str(val)
+
+
+# -------------------------------------------------------
+# 2. Budgeted table rendering
+# -------------------------------------------------------
+def render_table(header: list, rows: list, token_budget: int) -> tuple:
+    """Render rows until the budget runs out. Returns (text, tokens_used)."""
+    lines = [" | ".join(header)]
+    used = approx_tokens(lines[0])
+    for i, row in enumerate(rows):
+        line = " | ".join(str(c) for c in row)
+        cost = approx_tokens(line)
+        if used + cost > token_budget:
+            lines.append(f"... ({len(rows) - i} more rows omitted)")
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines), used
+
+
+def _interleave(per_metric: dict) -> list:
+    """Round-robin rows across metrics: every metric's newest period comes first."""
+    rows, depth = [], 0
+    columns = {m: entries for m, entries in per_metric.items() if entries}
+    while columns:
+        for metric in list(columns):
+            entries = columns[metric]
+            if depth >= len(entries):
+                del columns[metric]
+                continue
+            e = entries[depth]
+            rows.append([metric, period_label(e), format_value(e.get("val")), e.get("form", "")])
+        depth += 1
+    return rows
+
+
+def render_facts(facts: dict, token_budget: int) -> tuple:
+    lines = []
+    if facts.get("cik"):
+        lines.append(f"cik: {facts['cik']}  year: {facts.get('year')}  quarter: {facts.get('quarter')}")
+    missing = [m for m, v in (facts.get("summary") or {}).items() if v is None]
+
+    details = facts.get("details")
+    if details:
+        table, _ = render_table(["metric", "period", "value", "form"],
+                                _interleave(dedupe_facts(details)), token_budget)
+    else:
+        rows = [[m, format_value(v)] for m, v in (facts.get("summary") or {}).items() if v is not None]
+        table, _ = render_table(["metric", "latest value"], rows, token_budget)
+    lines.append(table)
+    if missing:
+        lines.append(f"not reported: {', '.join(missing)}")
+    text = "\n".join(lines)
+    return text, approx_tokens(text)
+
+
+# -------------------------------------------------------
+# 3. Derived metrics: one row per period
+# -------------------------------------------------------
+DERIVED_COLUMNS = ["revenue", "gross_profit", "operating_income", "net_income", "free_cash_flow",
+                   "gross_margin", "operating_margin", "net_margin", "fcf_margin", "current_ratio",
+                   "revenue_yoy", "revenue_qoq", "net_income_yoy", "free_cash_flow_yoy"]
+RATIO_COLUMNS = {"current_ratio", "debt_to_equity"}
+
+
+def format_derived(name: str, val) -> str:
+    if val is None:
+        return "-"
+    if name in RATIO_COLUMNS:
+        return f"{val:.2f}"
+    if name.endswith(("_margin", "_intensity", "_yoy", "_qoq")):
+        return f"{val * 100:.1f}%"
+    return format_value(val)
+
+
+def render_derived(derived: dict, token_budget: int) -> tuple:
+    values = {**(derived.get("series") or {}), **(derived.get("derived") or {})}
+    columns = [c for c in DERIVED_COLUMNS if any(v is not None for v in values.get(c) or [])]
+    labels = derived.get("labels") or []
+    rows = [[labels[i]] + [format_derived(c, values[c][i]) for c in columns]
+            for i in reversed(range(len(labels)))]
+    table, _ = render_table(["period"] + columns, rows, token_budget)
+    text = f"cik: {derived.get('cik')}  {derived.get('period')}  (USD; growth vs prior period)\n{table}"
+    return text, approx_tokens(text)
+
+
+def render_screen(screen: dict, token_budget: int) -> tuple:
+    metric = screen.get("metric", "")
+    lines = [f"{metric} | {screen.get('period')} | {screen.get('matched')} of {screen.get('universe')} companies match"
+             f" | order: {screen.get('order')}"]
+    dist = screen.get("distribution") or {}
+    if dist:
+        lines.append("distribution: " + ", ".join(f"{k} {format_derived(metric, v)}" for k, v in dist.items()))
+    company = screen.get("company")
+    if company:
+        where = (f"rank {company['rank']} of {company.get('of')}, percentile {company['percentile']}, "
+                 f"value {format_derived(metric, company['value'])}"
+                 + ("" if company.get("passes_filters", True) else " (does not pass the filters)")
+                 if company.get("value") is not None else "not reported")
+        lines.append(f"{company.get('ticker') or company.get('cik')}: {where}")
+    rows = [[r.get("rank"), r.get("ticker") or "-", r.get("name"), format_derived(metric, r.get("value")),
+             r.get("percentile")] for r in screen.get("results", [])]
+    table, _ = render_table(["rank", "ticker", "company", metric, "percentile"], rows, token_budget)
+    lines.append(table)
+    text = "\n".join(lines)
+    return text, approx_tokens(text)
+
+
+# -------------------------------------------------------
+# 4. Whole dispatch output
+# -------------------------------------------------------
+def compact_dispatch(dispatch_output: dict, token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """Render every known result block compactly; unknown blocks as minified JSON."""
+    results = (dispatch_output or {}).get("results", dispatch_output or {})
+    blocks, remaining = [], token_budget
+
+    for key, value in results.items():
+        if remaining <= 0:
+            blocks.append(f"[{key}] omitted (token budget reached)")
+            continue
+
+        if key == "cik":
+            text = f"[cik] {value}"
+        elif key == "company_info" and isinstance(value, dict):
+            text = "[company_info]\n" + "\n".join(f"{k}: {v}" for k, v in value.items() if v is not None)
+        elif key == "facts" and isinstance(value, dict) and "error" not in value:
+            body, _ = render_facts(value, remaining)
+            text = "[facts]\n" + body
+        elif key == "derived_metrics" and isinstance(value, dict) and "error" not in value:
+            body, _ = render_derived(value, remaining)
+            text = "[derived_metrics]\n" + body
+        elif key == "screen" and isinstance(value, dict):
+            body, _ = render_screen(value, remaining)
+            text = "[screen]\n" + body
+        elif key == "filings" and isinstance(value, list):
+            rows = [[f.get("form"), f.get("filing_date"), f.get("report_date"), f.get("accession_number")] for f in value]
+            body, _ = render_table(["form", "filed", "period", "accession"], rows, remaining)
+            text = "[filings]\n" + body
+        elif key == "filings_summary" and isinstance(value, dict):
+            rows = [[f.get("form"), f.get("filing_date"), f.get("filing_url")] for f in value.get("filings", [])]
+            body, _ = render_table(["form", "filed", "url"], rows, remaining)
+            text = "[filings_summary]\n" + body
+        else:
+            raw = json.dumps(value, separators=(",", ":"), default=str)
+            limit = remaining * 4
+            text = f"[{key}] " + (raw if len(raw) <= limit else raw[:limit] + "...")
+
+        blocks.append(text)
+        remaining -= approx_tokens(text)
+
+    return "\n\n".join(blocks)
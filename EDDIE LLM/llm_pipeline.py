@@ -16,7 +16,10 @@ if str(WORK_DIR) not in sys.path:
     sys.path.insert(0, str(WORK_DIR))
 
 # sys.path.append("RAG")   # to import from parent dir
-from RAG.rag_engine import ingest_filing,rag_pipeline
+from RAG.rag_engine import rag_pipeline,ingest_filing_async,ingest_sections,items_for_query,is_indexed,jobs,prefetch_filing,table_answer,fact_answer,change_answer
+from RAG.tracing import Trace, span, start_trace, approx_tokens
+from RAG.logs import get_logger, brief
+from RAG.llm_client import llm
 from rich.console import Console
 # import google.generativeai as genai
 import os
@@ -27,14 +30,11 @@ from dotenv import load_dotenv
 #from summarizer import get_filing_summary
 load_dotenv()
 console = Console()
+log = get_logger("pipeline")
 # -----------------------------------------
 # CONFIG
 # -----------------------------------------
 
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-if not OPENROUTER_API_KEY:
-    raise Exception("❌ Missing OPENROUTER_API_KEY environment variable")
-
 # GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 # if not GEMINI_API_KEY:
 #     console.print("[bold red]CRITICAL: GEMINI_API_KEY not found in .env[/bold red]")
@@ -44,23 +44,26 @@ if not OPENROUTER_API_KEY:
 # genai.configure(api_key=GEMINI_API_KEY)
 # MODEL = genai.GenerativeModel("gemini-2.5-flash-lite")
 
-LLM_URL = os.getenv("LLM_URL")
-DISPATCH_URL = "http://localhost:8000/dispatch"   # FastAPI service
+# Models, API keys (OPENROUTER_API_KEY / GEMINI_API_KEY), deadlines and fallbacks
+# live in RAG/llm_client.py; call sites only pick a route.
+DISPATCH_URL = os.getenv("DISPATCH_URL", "http://localhost:8000/dispatch")   # FastAPI service
 # DISPATCH_URL = "https://eddie-backend-production.up.railway.app/dispatch" 
 
-HEADERS = {
-    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-    "Content-Type": "application/json"
-}
+# One pooled session per process: keep-alive connections to /dispatch
+http = requests.Session()
+
+# How long a query waits for a background ingestion before answering another way
+INGEST_WAIT_SECONDS = float(os.getenv("EDDIE_INGEST_WAIT", "3"))
 #Prompt modifications required heavily based on the model used. The current prompt is optimized for openrouter models.
 
 # -----------------------------------------
 # 1) LLM converts natural language → JSON
 # -----------------------------------------
 
-def llm_generate_json(user_query: str) -> dict:
+def llm_generate_json(user_query: str, context_hint: str = "") -> dict:
     """
     Convert natural language query → JSON for /dispatch.
+    `context_hint` is the compact conversation state (ticker, year, form).
     """
 
     prompt = prompt = f"""
@@ -84,7 +87,9 @@ JSON MUST include:
         - get_company_info  
         - get_company_submissions  
         - get_company_facts  
+        - get_derived_metrics
         - get_filings_10k_8k
+        - screen
 
 3. form_type  
    - Required only when user explicitly asks for 10-K or 8-K  
@@ -98,6 +103,20 @@ JSON MUST include:
 
 7. cik (optional) — only when user gives a CIK instead of a stock ticker.
 
+8. period (optional) — "annual" (default) or "quarterly", only for get_derived_metrics.
+
+9. screen fields — only for the "screen" action (ranking / filtering many companies at once):
+   - metrics: exactly one metric to rank by, from: revenue, gross_profit, operating_income,
+     net_income, operating_cash_flow, capex, free_cash_flow, rd_expense, sga_expense,
+     total_assets, total_liabilities, equity, cash, long_term_debt, current_ratio,
+     gross_margin, operating_margin, net_margin, fcf_margin, debt_to_equity, rd_intensity
+     (append "_yoy" for year-over-year growth, e.g. "revenue_yoy")
+   - filters (optional): [{{"metric": ..., "op": ">" | ">=" | "<" | "<=" | "pct>=" | "pct<=", "value": number}}]
+     ("pct" ops compare percentiles 0-100; money values are in USD, margins / growth as fractions)
+   - order (optional): "desc" (default, highest first) or "asc"
+   - limit (optional): number of companies, default 20
+   - ticker: "" unless the user asks where a specific company ranks
+
 ---------------------------------------
 Rules
 ---------------------------------------
@@ -108,6 +127,11 @@ Rules
     • “Company info for MSFT” → ["get_company_info"]  
     • “Give me 2023 10-K for AAPL” → ["get_filings_10k_8k"]  
     • “Fetch revenue of AMZN for 2022” → ["get_company_facts"]
+    • “NVDA's gross margin and revenue growth by quarter” → ["get_derived_metrics"], "period": "quarterly"
+      (margins, YoY / QoQ growth, current ratio, free cash flow — already computed by the backend)
+    • “Top 20 companies by R&D expense in 2023” → ["screen"], "ticker": "", "metrics": ["rd_expense"], "limit": 20
+    • “Where does MSFT rank in net margin among companies with revenue over $10B?” →
+      ["screen"], "ticker": "MSFT", "metrics": ["net_margin"], "filters": [{{"metric": "revenue", "op": ">", "value": 10000000000}}]
 
 - If user gives a CIK directly, skip resolving ticker.
 
@@ -124,30 +148,25 @@ Output:
 }}
 
 ---------------------------------------
+Previous conversation context: {context_hint or "none"}
+
 Now convert the following user request:
 "{user_query}"
 """
 
 
-    payload = {
-        "model": "openai/gpt-oss-120b:free",        # or "deepseek/deepseek-chat", "google/gemini-2.0-pro-exp"
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.2,
-        "max_tokens": 500
-    }
-    print(payload)
-    response = requests.post(LLM_URL, headers=HEADERS, json=payload)
+    # openai/gpt-oss-120b:free via OpenRouter first, with deadline/retry/hedging (RAG/llm_client.py)
+    log.debug("LLM request: %s", brief(prompt))
+    with span("nl_to_json", bytes=len(prompt), tokens=approx_tokens(prompt)) as s:
+        res = llm.complete(prompt, route="nl_to_json", max_tokens=500, temperature=0.2)
+        s["provider"], s["hedged"] = res["provider"], res["hedged"]
     # print("[yellow]3. Asking Gemini to convert query to JSON...[/yellow]")
     # print(prompt)
     # print("-----------------")
     # response = MODEL.generate_content(prompt)
-    print("LLM Response:")
-    print(response)
-    data = response.json()
-    print(data)
-    print("-----------------")
+    log.debug("LLM response [%s]: %s", res["provider"], brief(res["text"]))
 
-    raw_output = data["choices"][0]["message"]["content"]
+    raw_output = res["text"]
 
     # Extract strict JSON
     match = re.search(r"\{.*\}", raw_output, re.S)
@@ -168,7 +187,10 @@ def call_dispatch(json_payload: dict) -> dict:
     Sends the JSON payload to FastAPI /dispatch.
     """
 
-    response = requests.post(DISPATCH_URL, json=json_payload)
+    with span("dispatch", actions=",".join(json_payload.get("actions") or [])) as s:
+        response = http.post(DISPATCH_URL, json=json_payload)
+        s["bytes"] = len(response.content)
+        s["status"] = response.status_code
 
     if response.status_code != 200:
         raise Exception(f"❌ Dispatch API failed: {response.text}")
@@ -261,12 +283,145 @@ def call_dispatch(json_payload: dict) -> dict:
 
 #     return final_answer
 from test import test_extract_filing_url
+from conversation import ConversationContext
+
+# "How much was total net sales", "What was the amount of operating expenses", ...
+NUMERIC_QUESTION = re.compile(r"\b(how much|how many|(?:dollar )?amount of|value of)\b", re.IGNORECASE)
+# ... unless it also asks for reasons / context ("How much did margins fall and why?")
+NARRATIVE_QUESTION = re.compile(
+    r"\b(why|explain|describe|discuss|drivers?|driven|factors?|risks?|impact(?:ed)?|affect(?:ed)?|outlook|strategy)\b",
+    re.IGNORECASE)
+
+# "What changed in risk factors vs last year", "new risks compared to the prior year", ...
+CHANGE_QUESTION = re.compile(
+    r"\b(what(?:'s| has| have)? changed|changes? (?:in|to|from)|new (?:risks?|disclosures?)|"
+    r"(?:vs\.?|versus|compared (?:to|with)|from) (?:the )?(?:last|prior|previous) (?:year|10-?k))\b",
+    re.IGNORECASE)
+# ... and it is about the filing's text, not a number: "vs last year's 10-K", "new disclosures"
+FILING_COMPARISON = re.compile(
+    r"\b((?:vs\.?|versus|compared (?:to|with)|from|than) (?:the )?(?:last|prior|previous) "
+    r"(?:year'?s? )?(?:10-?k|filing|annual report)|new (?:risk factors?|risks?|disclosures?)|"
+    r"(?:disclosures?|language|wording) changed)\b",
+    re.IGNORECASE)
+
+
+def is_change_question(user_query: str) -> bool:
+    """A request for the paragraph diff: change wording plus an Item / section or explicit filing comparison."""
+    if not CHANGE_QUESTION.search(user_query) or NUMERIC_QUESTION.search(user_query):
+        return False
+    return bool(items_for_query(user_query)) or FILING_COMPARISON.search(user_query) is not None
+
+
+def answer_changes(user_query: str, ticker: str, year, filing_url: str) -> str | None:
+    """
+    "What changed vs last year?": make sure this filing and the previous
+    year's 10-K are fingerprinted (download + parse only, no embedding) and
+    answer from the precomputed paragraph delta. None → answer as usual.
+    """
+    try:
+        prev_year = int(year) - 1
+    except (TypeError, ValueError):
+        return None
+    items = items_for_query(user_query) or None
+    if not prefetch_filing(ticker, year, filing_url):
+        return None
+    answer = change_answer(user_query, ticker, year, items)
+    if answer is not None:
+        return answer
+
+    log.info("🔍 Looking up %s's %s 10-K to diff against...", ticker, prev_year)
+    previous = call_dispatch({"ticker": ticker, "actions": ["get_filings_10k_8k"],
+                              "form_type": "10-K", "year": prev_year})
+    prev_url = test_extract_filing_url(previous)
+    if not prev_url or not prefetch_filing(ticker, prev_year, prev_url):
+        return None
+    return change_answer(user_query, ticker, year, items)
+
+
+def answer_from_filing(user_query: str, ticker: str, year, filing_url: str,
+                       context: ConversationContext | None = None) -> str:
+    """
+    Answer a question about a filing without waiting for the whole 10-K to embed:
+    - "what changed vs last year"  → answer from the precomputed paragraph delta
+    - follow-up on the same filing → answer from the chunks retrieved last time
+    - numeric question on a filing not indexed yet, matching a tagged XBRL
+      fact or a table row      → answer from the fact / table store
+    - purely quantitative question matching a tagged XBRL fact
+                               → the fact, even when the filing is indexed
+    - already indexed          → RAG (fast path)
+    - question names a section → index just those Items now, answer from them,
+                                 queue the rest of the filing in the background
+    - otherwise                → queue background ingestion and wait briefly
+                                 (EDDIE_INGEST_WAIT); still building after that →
+                                 map-reduce summarizer, the next question gets RAG
+    """
+    retrieved = {}
+
+    def rag(**kwargs) -> str:
+        answer = rag_pipeline(user_query, ticker, year, retrieved=retrieved, **kwargs)
+        if context is not None and retrieved.get("chunk_ids"):
+            context.remember_retrieval(ticker, year, filing_url, retrieved["chunk_ids"])
+        return answer
+
+    if is_change_question(user_query):
+        answer = answer_changes(user_query, ticker, year, filing_url)
+        if answer:
+            return answer
+
+    reuse = context.reusable_chunks(ticker, year, filing_url) if context else []
+    if reuse:
+        return rag(chunk_ids=reuse)
+
+    indexed = is_indexed(ticker, year, filing_url)
+    numeric = NUMERIC_QUESTION.search(user_query) is not None
+    quantitative = numeric and not NARRATIVE_QUESTION.search(user_query)
+    if quantitative and indexed:
+        answer = fact_answer(user_query, ticker, year)
+        if answer:
+            return answer
+    elif numeric and not indexed:
+        # Facts and tables are parsed at download time, no embedding needed
+        if prefetch_filing(ticker, year, filing_url):
+            answer = fact_answer(user_query, ticker, year) or table_answer(user_query, ticker, year)
+            if answer:
+                ingest_filing_async(ticker, year, filing_url)
+                return answer
+
+    if indexed:
+        return rag()
+
+    items = items_for_query(user_query)
+    ready = ingest_sections(ticker, year, filing_url, items) if items else []
+
+    # The rest of the filing is embedded by the background workers
+    log.info("Ingesting filing %s %s in the background: %s", ticker, year, filing_url)
+    job_id = ingest_filing_async(ticker, year, filing_url)
+    if ready:
+        log.info("Answering from Item(s) %s while the rest is indexed", ", ".join(ready))
+        return rag(items=ready)
+
+    if jobs.wait(job_id, timeout=INGEST_WAIT_SECONDS) and is_indexed(ticker, year, filing_url):
+        return rag()
+
+    try:
+        from summarizer import get_filing_summary
+        answer = get_filing_summary(user_query, filing_url)
+    except Exception as e:
+        log.warning("Summarizer fallback failed (%s)", e)
+        return ("This filing is still being indexed and could not be summarized right now; "
+                "please ask again in a moment.")
+    return answer + "\n\n_(This filing is still being indexed; follow-up questions will be faster.)_"
+
+from dispatch_format import compact_dispatch
+from templated_answers import answer_from_dispatch
 
 def llm_summarize(
     dispatch_output: dict,
     user_query: str,
     year: int | None = None,
-    ticker: str | None = None
+    ticker: str | None = None,
+    json_query: dict | None = None,
+    context: ConversationContext | None = None
 ) -> str:
     ...
 
@@ -278,7 +433,6 @@ def llm_summarize(
     # 🔥 NEW: Detect if user wants FILING TEXT (10-K / 8-K)
     # ----------------------------------------------------
     user_lower = user_query.lower()
-    print(user_lower)
 
     wants_filing_text = any(keyword in user_lower for keyword in [
         "10-k", "10k",
@@ -296,23 +450,25 @@ def llm_summarize(
 
             # filing_url = test_extract_filing_url(filings)
             # print(filing_url)
-            print("-----------------")
-            print("this is the dispatch output",dispatch_output)
-            print("🔍 User requests detailed filing text. Extracting filing URL...")
+            log.debug("Dispatch output: %s", brief(dispatch_output))
+            log.info("🔍 User requests detailed filing text. Extracting filing URL...")
             filing_url = test_extract_filing_url(dispatch_output)
-            print("Filing URL extracted for detailed summary:", filing_url)
-            print("Ingesting filing URL:", filing_url)
-            print(ticker, year, filing_url)
-            print("Ingesting filing...")
-            ingest_filing(ticker, year, filing_url)
-
-            return rag_pipeline(user_query, ticker, year)
+            return answer_from_filing(user_query, ticker, year, filing_url, context)
 
             #return get_filing_summary(user_query, filing_url) # Get detailed summary from filing URL replace the previous function call with rag ??
 
         except Exception as e:
             return f"[ERROR processing filing text]: {str(e)}"
 
+    # ----------------------------------------------------
+    # ⚡ Unambiguous structured result → deterministic template, no LLM call
+    # ----------------------------------------------------
+    with span("generate", provider="template") as s:
+        templated = answer_from_dispatch(dispatch_output, user_query, json_query)
+        s["hit"] = templated is not None
+    if templated is not None:
+        return templated
+
     # ----------------------------------------------------
     # ❗ DEFAULT: Your OLD JSON-only summarizer (unchanged)
     # ----------------------------------------------------
@@ -333,32 +489,21 @@ STRICT RULES:
 • If data is missing → respond EXACTLY:
   "The requested information is not available in the retrieved EDGAR data."
 
-Dispatch JSON:
-{json.dumps(dispatch_output, indent=2)}
+Dispatch data (deduplicated, compact):
+{compact_dispatch(dispatch_output)}
 
 User Request:
 \"\"\"{user_query}\"\"\" 
 """
 
-    payload = {
-        "model": "openai/gpt-oss-120b:free",
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.5,
-        "max_tokens": 1500
-    }
-
-    response = requests.post(LLM_URL, headers=HEADERS, json=payload)
-    # response = MODEL.generate_content(prompt)
-    data = response.json()
-    print(data)
-
-    if "error" in data:
-        raise Exception(f"❌ LLM Error: {data['error']}")
+    with span("generate", bytes=len(prompt), tokens=approx_tokens(prompt)) as s:
+        res = llm.complete(prompt, route="summarize", max_tokens=1500, temperature=0.5)
+        # response = MODEL.generate_content(prompt)
+        s["provider"], s["hedged"] = res["provider"], res["hedged"]
+        s["completion_tokens"] = res["completion_tokens"]
+    log.debug("LLM response [%s]: %s", res["provider"], brief(res["text"]))
 
-    if "choices" not in data:
-        raise Exception(f"❌ Unexpected LLM response: {data}")
-
-    final_answer = data["choices"][0]["message"]["content"]
+    final_answer = res["text"]
 
     return final_answer
 
@@ -368,7 +513,8 @@ User Request:
 # 4) MAIN PIPELINE FUNCTION
 # -----------------------------------------
 
-def process_user_query(user_query: str) -> str:
+def process_user_query(user_query: str, trace: Trace | None = None,
+                       context: ConversationContext | None = None) -> str:
     """
     Entire pipeline:
         → user text
@@ -376,13 +522,28 @@ def process_user_query(user_query: str) -> str:
         → dispatch call
         → LLM summarization
         → final natural language answer
-    """
 
-    print("🔍 Step 1 → Converting query to JSON...")
-    print(user_query)
-    print("---------------------")
-    json_query = llm_generate_json(user_query)
-    print(f"Generated JSON:{json_query}")
+    Pass a `Trace` to get per-stage timings back (see RAG/tracing.py), and
+    the session's `ConversationContext` so follow-ups ("and for 2022?")
+    are resolved locally.
+    """
+    with start_trace("query", trace=trace, query=user_query):
+        return _run_query(user_query, context)
+
+
+def _run_query(user_query: str, context: ConversationContext | None = None) -> str:
+    resolved = context.resolve(user_query) if context else None
+    if resolved:
+        json_query, effective_query = resolved
+        with span("nl_to_json", provider="context"):
+            log.info("🔁 Follow-up resolved from context: %s → %s", user_query, effective_query)
+        user_query = effective_query
+    else:
+        log.info("🔍 Step 1 → Converting query to JSON: %s", user_query)
+        json_query = llm_generate_json(user_query, context.hint() if context else "")
+        if context:
+            context.fill_missing(json_query)
+    log.info("Generated JSON: %s", brief(json_query))
     report = json_query
     year = report.get("year") # Extract year and ticker for later use this is the latest change
     if year is None:
@@ -391,20 +552,27 @@ def process_user_query(user_query: str) -> str:
     if ticker is None:
         ticker = None
 
-    print(f"Generated JSON: {json.dumps(json_query, indent=2)}")
-    print("---------------------")
-
-    print("📡 Step 2 → Sending JSON to /dispatch...")
-    dispatch_result = call_dispatch(json_query)
-    print(dispatch_result)
-    print("---------------------")
-
-    print("🧠 Step 3 → Summarizing dispatch output...")
-    summary = llm_summarize(dispatch_result, user_query, year, ticker)
-    print(summary)
-    print("---------------------")
-    print("✅ Pipeline complete.")
-    print("-------------------------------------------------------------------")
+    # Ask the backend for period-deduplicated, projected facts instead of every raw entry
+    if "get_company_facts" in (json_query.get("actions") or []):
+        json_query.setdefault("verbosity", "compact")
+
+    dispatch_result = context.cached_dispatch(json_query) if context else None
+    if dispatch_result is None:
+        log.info("📡 Step 2 → Sending JSON to /dispatch...")
+        dispatch_result = call_dispatch(json_query)
+        if context:
+            context.store_dispatch(json_query, dispatch_result)
+    else:
+        with span("dispatch", cache="hit"):
+            log.info("📡 Step 2 → Reusing dispatch result from this conversation")
+    log.debug("Dispatch result: %s", brief(dispatch_result))
+    if context:
+        context.remember(json_query, context.topic if context.elaborating else user_query)
+
+    log.info("🧠 Step 3 → Summarizing dispatch output...")
+    summary = llm_summarize(dispatch_result, user_query, year, ticker, json_query, context)
+    log.debug("Summary: %s", brief(summary))
+    log.info("✅ Pipeline complete.")
 
     return summary
 
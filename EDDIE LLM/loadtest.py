@@ -0,0 +1,369 @@
+# loadtest.py
+"""
+Concurrent load-test harness for EDDIE.
+
+Replays a corpus of realistic user queries against
+1. the backend's FastAPI /dispatch   (--target dispatch)
+2. the whole pipeline                (--target pipeline, process_user_query in threads)
+at increasing load, and reports throughput, p50/p95/p99 and error rate per
+step plus the saturation point (the last step that still met the SLO), and
+how many requests reached the SEC stub (upstream traffic) per step.
+
+- Closed loop (--concurrency 1,2,4,8): N users, each sending its next
+  request as soon as the previous one answered.
+- Open loop (--rates 2,5,10,20): Poisson arrivals at a fixed rate whether or
+  not earlier requests finished; latency is measured from the scheduled
+  arrival, so queueing inside the server is counted (no coordinated omission).
+
+SEC, OpenRouter and Gemini are the stub servers of stub_servers.py (latency
+set with --sec-latency / --llm-latency). With --backend-dir the real backend
+is started under uvicorn (--workers N) with SEC_DATA_URL / SEC_WWW_URL
+pointing at the SEC stub; otherwise the pipeline talks to the dispatch stub.
+
+    python loadtest.py --target dispatch --backend-dir ../EDDIE-Backend-main --concurrency 1,2,4,8,16,32
+    python loadtest.py --target pipeline --backend-dir ../EDDIE-Backend-main --rates 1,2,5,10 --duration 20
+    python loadtest.py --target dispatch --dispatch-url http://localhost:8000/dispatch   # a running backend
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+# Same path trick as llm_pipeline: make the repo root importable for RAG.*
+WORK_DIR = Path(__file__).resolve().parent.parent
+if str(WORK_DIR) not in sys.path:
+    sys.path.insert(0, str(WORK_DIR))
+
+import stub_servers
+from benchmark import git_commit, percentile
+
+LOAD_QUERIES = [
+    "What is the CIK of AAPL?",
+    "Company info for MSFT",
+    "Company info for NVDA",
+    "Fetch revenue of AMZN for 2022",
+    "What was the net income of GOOGL in 2023?",
+    "Show total assets and cash for JPM in 2021",
+    "Fetch revenue of TSLA for 2024",
+    "Give me the 2023 10-K for META",
+    "List the 8-K filings of NFLX for 2020",
+    "Get the 2019 10-K for IBM",
+    "Summarize the risk factors in the 2023 10-K for TSLA",
+    "What did NFLX say about liquidity in its 2022 10-K?",
+    "What changed in the risk factors of AAPL's 2024 10-K vs last year?",
+    "CIK of KO",
+    "Company info for XOM",
+]
+
+
+# -------------------------------------------------------
+# Helpers
+# -------------------------------------------------------
+def load_corpus(path: str | None) -> list:
+    """One query per line (blank lines and #comments skipped), or the built-in corpus."""
+    if not path:
+        return list(LOAD_QUERIES)
+    lines = Path(path).read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_backend(backend_dir: str, env: dict, workers: int, timeout: float = 60.0) -> tuple:
+    """Run the backend under uvicorn → (Popen, dispatch_url). Waits until it answers."""
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=backend_dir, env={**os.environ, **env}, stdout=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"❌ Backend exited with code {proc.returncode}")
+        try:
+            if requests.get(f"{base}/stats/sec", timeout=1).status_code == 200:
+                return proc, f"{base}/dispatch"
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"❌ Backend did not start within {timeout:.0f}s")
+
+
+def dispatch_caller(url: str):
+    """One pooled session per thread, like a real client population."""
+    local = threading.local()
+
+    def call(payload: dict):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        res = session.post(url, json=payload, timeout=60)
+        if res.status_code != 200:
+            raise RuntimeError(f"HTTP {res.status_code}")
+        res.json()
+
+    return call
+
+
+def pipeline_caller():
+    from llm_pipeline import process_user_query
+
+    def call(query: str):
+        answer = process_user_query(query)
+        # the pipeline reports some failures in the answer text instead of raising
+        if answer.startswith(("[ERROR", "LLM Error")):
+            raise RuntimeError(answer[:80])
+
+    return call
+
+
+# -------------------------------------------------------
+# Load generators
+# -------------------------------------------------------
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies, self.errors = [], {}
+
+    def run(self, call, item, started: float):
+        try:
+            call(item)
+        except Exception as e:
+            with self.lock:
+                key = f"{type(e).__name__}: {str(e)[:80]}"
+                self.errors[key] = self.errors.get(key, 0) + 1
+            return
+        latency = time.perf_counter() - started
+        with self.lock:
+            self.latencies.append(latency)
+
+
+def run_closed(call, items: list, concurrency: int, duration: float, seed: int) -> tuple:
+    """`concurrency` users back to back for `duration` seconds → (Recorder, elapsed)."""
+    rec = Recorder()
+    stop = time.perf_counter() + duration
+
+    def user(n: int):
+        rng = random.Random(seed + n)
+        while time.perf_counter() < stop:
+            rec.run(call, rng.choice(items), time.perf_counter())
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(n,), daemon=True) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return rec, time.perf_counter() - t0
+
+
+def run_open(call, items: list, rate: float, duration: float, max_inflight: int, seed: int) -> tuple:
+    """Poisson arrivals at `rate`/s for `duration` seconds → (Recorder, elapsed)."""
+    rec = Recorder()
+    rng = random.Random(seed)
+    pool = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="load")
+    t0 = time.perf_counter()
+    at = t0
+    futures = []
+    while True:
+        at += rng.expovariate(rate)
+        if at - t0 >= duration:
+            break
+        delay = at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        # latency counts from the scheduled arrival, including time queued for a worker
+        futures.append(pool.submit(rec.run, call, rng.choice(items), at))
+    for f in futures:
+        f.result()
+    pool.shutdown()
+    return rec, time.perf_counter() - t0
+
+
+def step_stats(rec: Recorder, elapsed: float, offered: float | None = None) -> dict:
+    ms = [s * 1000 for s in rec.latencies]
+    errors = sum(rec.errors.values())
+    total = len(ms) + errors
+    out = {
+        "requests": total,
+        "ok": len(ms),
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(len(ms) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(ms, 50), 1),
+        "p95_ms": round(percentile(ms, 95), 1),
+        "p99_ms": round(percentile(ms, 99), 1),
+        "max_ms": round(max(ms), 1) if ms else 0.0,
+        "error_kinds": dict(sorted(rec.errors.items(), key=lambda kv: -kv[1])[:5]),
+    }
+    if offered is not None:
+        out["offered_rps"] = offered
+    return out
+
+
+def find_saturation(steps: list, slo_ms: float, max_error_rate: float, min_gain: float = 0.10) -> dict:
+    """
+    The last step that still met the SLO (p99 ≤ slo_ms, error rate ≤
+    max_error_rate) before throughput stopped growing: in a closed loop
+    by less than `min_gain` over the previous step, in an open loop by
+    falling below 90% of the offered rate.
+    """
+    best, reason = None, "not reached"
+    for step in steps:
+        s = step["stats"]
+        if s["p99_ms"] > slo_ms:
+            reason = f"p99 {s['p99_ms']} ms > SLO {slo_ms} ms at {step['load']}"
+            break
+        if s["error_rate"] > max_error_rate:
+            reason = f"error rate {s['error_rate']:.1%} at {step['load']}"
+            break
+        if "offered_rps" in s and s["throughput_rps"] < 0.9 * s["offered_rps"]:
+            reason = f"served {s['throughput_rps']} of {s['offered_rps']} req/s at {step['load']}"
+            break
+        if best is not None and "offered_rps" not in s and \
+                s["throughput_rps"] < best["stats"]["throughput_rps"] * (1 + min_gain):
+            reason = f"throughput flat ({s['throughput_rps']} req/s) at {step['load']}"
+            break
+        best = step
+    return {
+        "load": best["load"] if best else None,
+        "throughput_rps": best["stats"]["throughput_rps"] if best else 0.0,
+        "p99_ms": best["stats"]["p99_ms"] if best else None,
+        "reason": reason,
+    }
+
+
+# -------------------------------------------------------
+# MAIN
+# -------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="EDDIE concurrent load test")
+    parser.add_argument("--target", choices=["dispatch", "pipeline"], default="dispatch")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="closed-loop users per step")
+    parser.add_argument("--rates", default=None, help="open-loop arrival rates (req/s) per step; replaces --concurrency")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per step")
+    parser.add_argument("--queries", default=None, help="query corpus, one per line (default: built-in)")
+    parser.add_argument("--backend-dir", default=None, help="start this backend checkout under uvicorn")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for --backend-dir")
+    parser.add_argument("--dispatch-url", default=None, help="use an already running /dispatch")
+    parser.add_argument("--sec-rps", type=float, default=1000.0,
+                        help="backend SEC_MAX_RPS (the real SEC limit is ~10/s and would cap everything)")
+    parser.add_argument("--sec-latency", type=float, default=0.05, help="SEC stub latency (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="LLM stub latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random stub latency (s)")
+    parser.add_argument("--max-inflight", type=int, default=256, help="open-loop client threads")
+    parser.add_argument("--slo-ms", type=float, default=5000.0, help="p99 latency objective")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--no-warmup", action="store_true", help="skip one untimed pass over the corpus")
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    queries = load_corpus(args.queries)
+    workdir = tempfile.mkdtemp(prefix="eddie_load_")
+    servers = stub_servers.start_all(llm_latency=args.llm_latency, sec_latency=args.sec_latency,
+                                     jitter=args.jitter)
+    env = stub_servers.stub_env(servers)
+    backend = None
+    try:
+        dispatch_url = args.dispatch_url
+        if args.backend_dir:
+            print(f"🚀 Starting backend ({args.workers} worker(s)) against the SEC stub...")
+            # Stub SEC data must never land in the backend's real cache / screening index
+            backend_env = {**env, "SEC_MAX_RPS": str(args.sec_rps),
+                           "SEC_CACHE_DIR": os.path.join(workdir, "sec_cache"),
+                           "SCREEN_INDEX_DIR": os.path.join(workdir, "screen_index")}
+            backend, dispatch_url = start_backend(args.backend_dir, backend_env, args.workers)
+        if args.target == "dispatch":
+            if not dispatch_url:
+                parser.error("--target dispatch needs --backend-dir or --dispatch-url")
+            call = dispatch_caller(dispatch_url)
+            items = [stub_servers.fake_dispatch_json(q) for q in queries]
+        else:
+            os.environ.update(env)
+            os.environ["CHROMA_DB_DIR"] = os.path.join(workdir, "pipeline_db")
+            os.environ.setdefault("EDDIE_LOG_LEVEL", "WARNING")
+            if dispatch_url:
+                os.environ["DISPATCH_URL"] = dispatch_url
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                call = pipeline_caller()
+            items = queries
+
+        if not args.no_warmup:
+            print("🔥 Warm-up pass...")
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                for item in items:
+                    Recorder().run(call, item, time.perf_counter())
+
+        open_loop = bool(args.rates)
+        loads = [float(r) for r in args.rates.split(",")] if open_loop else \
+                [int(c) for c in args.concurrency.split(",")]
+        steps = []
+        for load in loads:
+            label = f"{load:g} req/s" if open_loop else f"{load} users"
+            sec_before = servers["sec"].requests
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                if open_loop:
+                    rec, elapsed = run_open(call, items, load, args.duration, args.max_inflight, args.seed)
+                else:
+                    rec, elapsed = run_closed(call, items, load, args.duration, args.seed)
+            stats = step_stats(rec, elapsed, load if open_loop else None)
+            stats["sec_requests"] = servers["sec"].requests - sec_before
+            steps.append({"load": label, "stats": stats})
+            print(f"   {label:>12}: {stats['throughput_rps']:8.2f} req/s  p50 {stats['p50_ms']:8.1f} ms  "
+                  f"p95 {stats['p95_ms']:8.1f} ms  p99 {stats['p99_ms']:8.1f} ms  errors {stats['error_rate']:.1%}  "
+                  f"SEC requests {stats['sec_requests']}")
+
+        saturation = find_saturation(steps, args.slo_ms, args.max_error_rate)
+        print(f"📈 Saturation: {saturation['load']} at {saturation['throughput_rps']} req/s "
+              f"(stopped: {saturation['reason']})")
+    finally:
+        if backend is not None:
+            backend.terminate()
+            backend.wait(timeout=30)
+        for s in servers.values():
+            s.stop()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "steps": steps,
+        "saturation": saturation,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text, encoding="utf-8")
+        print(f"📄 Results written to {args.out}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
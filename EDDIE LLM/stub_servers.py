@@ -0,0 +1,453 @@
+# stub_servers.py
+"""
+Local stub servers for offline benchmarking / load testing.
+
+Replaces every network dependency of the pipeline with a tiny HTTP server
+running in a background thread:
+1. OpenRouter chat completions  (LLM_URL)
+2. Gemini generateContent       (GEMINI_API_ENDPOINT)
+3. FastAPI /dispatch            (DISPATCH_URL)
+4. SEC                         (filing documents, plus the data.sec.gov JSON the
+                                 backend reads: company_tickers, submissions,
+                                 companyfacts → SEC_WWW_URL / SEC_DATA_URL)
+
+Each server takes a fixed `latency` (seconds) plus optional `jitter` so the
+numbers we measure are dominated by OUR code, not the stub.
+"""
+
+import gzip
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+DOCS_DIR = Path(__file__).resolve().parent / "docs"
+
+# Tickers the SEC stub knows (company_tickers.json)
+STUB_TICKERS = ["AAPL", "MSFT", "AMZN", "TSLA", "NFLX", "GOOGL", "META", "NVDA", "JPM", "XOM",
+                "WMT", "KO", "PFE", "INTC", "ORCL", "IBM", "DIS", "NKE", "BA", "CSCO"]
+STUB_YEARS = range(2015, 2026)
+STUB_METRICS = ["Revenues", "CostOfRevenue", "GrossProfit", "OperatingIncomeLoss", "NetIncomeLoss",
+                "Assets", "CurrentAssets", "Liabilities", "CurrentLiabilities", "StockholdersEquity",
+                "CashAndCashEquivalentsAtCarryingValue", "NetCashProvidedByUsedInOperatingActivities",
+                "PaymentsToAcquirePropertyPlantAndEquipment", "ResearchAndDevelopmentExpense"]
+
+STUB_ANSWER = (
+    "The filing describes the company's principal risks, including competition, "
+    "supply chain disruption, regulatory changes and macroeconomic conditions."
+)
+
+
+# -------------------------------------------------------
+# Helpers
+# -------------------------------------------------------
+def load_docs() -> dict:
+    """Return {filename: text} for the bundled 10-K text files."""
+    return {p.name: p.read_text(encoding="utf-8") for p in sorted(DOCS_DIR.glob("UNKNOWN_*_10-K.txt"))}
+
+
+def stub_cik(ticker: str) -> str:
+    """Deterministic fake 10-digit CIK for a ticker (same in every stub)."""
+    return str(zlib.crc32(ticker.upper().encode()) % 10**7).zfill(10)
+
+
+def stub_doc(doc_names: list, ticker: str, year) -> str:
+    """Which bundled document stands in for a ticker's filing of a given year."""
+    return doc_names[zlib.crc32(f"{ticker}{year}".encode()) % len(doc_names)]
+
+
+def fake_submissions(ticker: str, doc_names: list) -> dict:
+    """submissions/CIK##########.json: one 10-K, three 10-Qs and a few 8-Ks per year."""
+    rng = random.Random(ticker)
+    cik = stub_cik(ticker)
+    rows = []
+    for year in STUB_YEARS:
+        doc = stub_doc(doc_names, ticker, year)
+        rows.append((f"{year}-02-01", "10-K", f"{year - 1}-12-31", doc))
+        for q, month in ((1, 5), (2, 8), (3, 11)):
+            rows.append((f"{year}-{month:02d}-01", "10-Q", f"{year}-{3 * q:02d}-30", doc))
+        for _ in range(rng.randint(2, 6)):
+            rows.append((f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", "8-K", "", doc))
+    rows.sort(reverse=True)
+    recent = {"accessionNumber": [], "filingDate": [], "reportDate": [], "form": [], "primaryDocument": []}
+    for n, (filed, form, report, doc) in enumerate(rows):
+        recent["accessionNumber"].append(f"{cik}-{filed[2:4]}-{n:06d}")
+        recent["filingDate"].append(filed)
+        recent["reportDate"].append(report)
+        recent["form"].append(form)
+        recent["primaryDocument"].append(doc)
+    return {
+        "cik": cik, "name": f"{ticker} INC", "tickers": [ticker],
+        "sicDescription": "Services-Prepackaged Software", "stateOfIncorporation": "DE",
+        "filings": {"recent": recent, "files": []},
+    }
+
+
+def fake_company_facts(ticker: str) -> dict:
+    """
+    api/xbrl/companyfacts/CIK##########.json: annual + quarterly USD values
+    per metric, each period re-reported by the next year's 10-K (as SEC does).
+    """
+    rng = random.Random(f"facts{ticker}")
+    facts = {}
+    for metric in STUB_METRICS:
+        base = rng.uniform(1e9, 1e11)
+        entries = []
+        for year in STUB_YEARS:
+            val = round(base * (1 + 0.08 * (year - STUB_YEARS[0])) * rng.uniform(0.9, 1.1))
+            annual = {"start": f"{year}-01-01", "end": f"{year}-12-31", "val": val, "fy": year, "fp": "FY",
+                      "form": "10-K", "filed": f"{year + 1}-02-01", "frame": f"CY{year}"}
+            entries += [annual, {**annual, "fy": year + 1, "filed": f"{year + 2}-02-01"}]
+            for q in (1, 2, 3):
+                entries.append({"start": f"{year}-{3 * q - 2:02d}-01", "end": f"{year}-{3 * q:02d}-30",
+                                "val": round(val / 4 * rng.uniform(0.9, 1.1)), "fy": year, "fp": f"Q{q}",
+                                "form": "10-Q", "filed": f"{year}-{3 * q + 2:02d}-01", "frame": f"CY{year}Q{q}"})
+        facts[metric] = {"label": metric, "units": {"USD": entries}}
+    return {"cik": int(stub_cik(ticker)), "entityName": f"{ticker} INC", "facts": {"us-gaap": facts}}
+
+
+def fake_frame(concept: str, frame: str) -> dict | None:
+    """
+    api/xbrl/frames/us-gaap/<concept>/USD/<frame>.json: every stub filer's
+    value for one period. The stub has no instants, so CY2023Q4I reads the
+    CY2023 value (and CY2023Q2I the CY2023Q2 one).
+    """
+    lookup = frame[:-1].replace("Q4", "") if frame.endswith("I") else frame
+    data = []
+    for ticker in STUB_TICKERS:
+        facts = fake_company_facts(ticker)
+        for e in facts["facts"]["us-gaap"].get(concept, {}).get("units", {}).get("USD", []):
+            if e.get("frame") == lookup:
+                data.append({"accn": f"{stub_cik(ticker)}-00-000001", "cik": facts["cik"],
+                             "entityName": facts["entityName"], "loc": "US-DE", "end": e["end"], "val": e["val"]})
+                break
+    if not data:
+        return None
+    return {"taxonomy": "us-gaap", "tag": concept, "ccp": frame, "uom": "USD", "pts": len(data), "data": data}
+
+
+def text_to_html(text: str) -> str:
+    """Wrap plain filing text into a minimal HTML document (one <p> per line)."""
+    body = "\n".join(f"<p>{line}</p>" for line in text.splitlines())
+    return f"<html><head><title>10-K</title></head><body>{body}</body></html>"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Base handler: JSON helpers + simulated latency. Silences request logs."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def parse_request(self):
+        with self.server.count_lock:
+            self.server.requests += 1      # upstream traffic seen by this stub
+        return super().parse_request()
+
+    def _delay(self):
+        latency = self.server.latency
+        if self.server.jitter:
+            latency += random.uniform(0, self.server.jitter)
+        if latency > 0:
+            time.sleep(latency)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        return json.loads(raw or b"{}")
+
+    def _send(self, status: int, body: bytes, content_type: str, gzip_ok: bool = False):
+        if gzip_ok and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            body = gzip.compress(body)
+            encoding = "gzip"
+        else:
+            encoding = None
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, payload, status: int = 200):
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+
+# -------------------------------------------------------
+# 1. OpenRouter stub
+# -------------------------------------------------------
+def fake_dispatch_json(user_request: str) -> dict:
+    """Cheap rule-based stand-in for the NL → dispatch JSON conversion."""
+    q = user_request.lower()
+    tickers = re.findall(r"\b[A-Z]{2,5}\b", user_request)
+    ticker = next((t for t in tickers if t not in {"CIK", "MD", "JSON"}), "AAPL")
+    year = re.search(r"\b(20\d{2})\b", user_request)
+
+    if "cik" in q:
+        actions = ["get_cik"]
+    elif "info" in q:
+        actions = ["get_company_info"]
+    elif any(k in q for k in ["top ", "rank", "highest", "lowest", "percentile", "companies"]):
+        actions = ["screen"]
+    elif any(k in q for k in ["margin", "growth", "ratio", "free cash flow"]):
+        actions = ["get_derived_metrics"]
+    elif any(k in q for k in ["revenue", "income", "assets", "cash"]):
+        actions = ["get_company_facts"]
+    else:
+        actions = ["get_filings_10k_8k"]
+
+    out = {"ticker": ticker, "actions": actions}
+    if actions == ["get_filings_10k_8k"]:
+        out["form_type"] = "8-K" if "8-k" in q else "10-K"
+    if actions == ["screen"]:
+        out["ticker"] = ticker if ticker in user_request.split() else ""
+        out["metrics"] = ["rd_expense" if "r&d" in q or "research" in q else
+                          "net_margin" if "margin" in q else "revenue"]
+        out["order"] = "asc" if "lowest" in q else "desc"
+    if actions == ["get_derived_metrics"] and "quarter" in q:
+        out["period"] = "quarterly"
+    if year:
+        out["year"] = int(year.group(1))
+    return out
+
+
+def fake_completion(prompt: str) -> str:
+    """What either LLM stub answers: dispatch JSON for the NL → JSON prompt, a fixed answer otherwise."""
+    if "EDGAR Dispatch JSON Converter" in prompt:
+        quoted = re.findall(r'"([^"\n]*)"', prompt)
+        return json.dumps(fake_dispatch_json(quoted[-1] if quoted else ""))
+    return STUB_ANSWER
+
+
+class OpenRouterHandler(_StubHandler):
+    def do_POST(self):
+        body = self._read_json()
+        self._delay()
+        status = self.server.state.get("status", 200)       # e.g. 503 to test retries / fallback
+        if status != 200:
+            self._send_json({"error": {"code": status, "message": "stub error"}}, status=status)
+            return
+        messages = body.get("messages") or [{"content": ""}]
+        prompt = messages[-1].get("content", "")
+        content = fake_completion(prompt)
+
+        self._send_json({
+            "id": "stub",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4},
+        })
+
+
+# -------------------------------------------------------
+# 2. Gemini stub (REST transport: POST /v1beta/models/<m>:generateContent)
+# -------------------------------------------------------
+class GeminiHandler(_StubHandler):
+    def do_POST(self):
+        body = self._read_json()
+        self._delay()
+        # Routes fall back / hedge across providers, so Gemini gets NL → JSON prompts too
+        prompt = "".join(p.get("text", "") for c in body.get("contents") or [] for p in c.get("parts") or [])
+        self._send_json({
+            "candidates": [{
+                "content": {"parts": [{"text": fake_completion(prompt)}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {"promptTokenCount": len(json.dumps(body)) // 4},
+        })
+
+
+# -------------------------------------------------------
+# 3. Dispatch stub
+# -------------------------------------------------------
+class DispatchHandler(_StubHandler):
+    def do_POST(self):
+        req = self._read_json()
+        self._delay()
+        ticker = (req.get("ticker") or "AAPL").upper()
+        year = req.get("year") or 2023
+        cik = stub_cik(ticker)
+        results = {}
+
+        for action in req.get("actions", []):
+            if action == "get_cik":
+                results["cik"] = cik
+            elif action == "get_company_info":
+                results["company_info"] = {
+                    "name": f"{ticker} INC", "cik": cik,
+                    "sic_description": "Services-Prepackaged Software",
+                    "state": "DE", "filings_count": 1000,
+                }
+            elif action == "get_company_submissions":
+                results["filings"] = [{
+                    "accession_number": f"{cik}-{year % 100}-000001",
+                    "filing_date": f"{year}-02-01", "form": "10-K",
+                    "report_date": f"{year - 1}-12-31",
+                }]
+            elif action == "get_company_facts":
+                metrics = req.get("metrics") or ["Revenues", "NetIncomeLoss"]
+                details = {
+                    m: [{"end": f"{year}-12-31", "val": 1_000_000 * (i + 1), "fy": year,
+                         "fp": "FY", "form": "10-K"}]
+                    for i, m in enumerate(metrics)
+                }
+                results["facts"] = {
+                    "cik": cik, "year": year, "quarter": req.get("quarter"),
+                    "summary": {m: v[-1]["val"] for m, v in details.items()},
+                    "details": details,
+                }
+            elif action == "get_derived_metrics":
+                years = [year - 1, year]
+                revenue = [1_000_000, 1_100_000]
+                results["derived_metrics"] = {
+                    "cik": cik, "year": req.get("year"), "period": req.get("period") or "annual",
+                    "count": 2, "periods": [f"{y}-12-31" for y in years],
+                    "labels": [f"FY{y}" for y in years], "fiscal_years": years,
+                    "series": {"revenue": revenue, "net_income": [v // 10 for v in revenue]},
+                    "derived": {"net_margin": [0.1, 0.1], "revenue_yoy": [None, 0.1]},
+                }
+            elif action == "screen":
+                metric = (req.get("metrics") or ["revenue"])[0]
+                results["screen"] = {
+                    "metric": metric, "period": f"CY{year}", "year": year, "quarter": req.get("quarter"),
+                    "order": req.get("order") or "desc", "universe": len(STUB_TICKERS), "matched": 3,
+                    "distribution": {"p10": 1e9, "p50": 5e9, "p90": 2e10},
+                    "results": [{"rank": n + 1, "cik": stub_cik(t), "ticker": t, "name": f"{t} INC",
+                                 "value": 3e10 / (n + 1), "percentile": 100.0 - 5 * (n + 1)}
+                                for n, t in enumerate(STUB_TICKERS[:3])],
+                }
+            elif action == "get_filings_10k_8k":
+                doc = stub_doc(self.server.state["doc_names"], ticker, year)
+                results["filings_summary"] = {"count": 1, "filings": [{
+                    "form": req.get("form_type") or "10-K",
+                    "filing_date": f"{year}-02-01",
+                    "accession_number": f"{cik}-{year % 100}-000001",
+                    "filing_url": f"{self.server.state['sec_url']}/Archives/edgar/data/{int(cik)}/{doc}",
+                }]}
+            else:
+                self._send_json({"detail": f"Unknown action: {action}"}, status=400)
+                return
+
+        self._send_json({"status": "success", "results": results})
+
+
+# -------------------------------------------------------
+# 4. SEC archive stub
+# -------------------------------------------------------
+class SecHandler(_StubHandler):
+    def do_GET(self):
+        self._delay()
+        state = self.server.state
+        path = self.path.split("?", 1)[0].rstrip("/")
+        name = path.rsplit("/", 1)[-1]
+
+        # data.sec.gov / www.sec.gov JSON read by the backend (built once per path)
+        body = state["json"].get(path)
+        if body is None:
+            payload = None
+            match = re.fullmatch(r"/(submissions|api/xbrl/companyfacts)/CIK(\d{10})\.json", path)
+            frame = re.fullmatch(r"/api/xbrl/frames/us-gaap/(\w+)/USD/(CY\d{4}(?:Q[1-4])?I?)\.json", path)
+            if path == "/files/company_tickers.json":
+                payload = {str(i): {"cik_str": int(stub_cik(t)), "ticker": t, "title": f"{t} INC"}
+                           for i, t in enumerate(STUB_TICKERS)}
+            elif match and match.group(2) in state["tickers"]:
+                ticker = state["tickers"][match.group(2)]
+                payload = (fake_submissions(ticker, state["doc_names"]) if match.group(1) == "submissions"
+                           else fake_company_facts(ticker))
+            elif frame:
+                payload = fake_frame(frame.group(1), frame.group(2))
+            if payload is not None:
+                body = state["json"].setdefault(path, json.dumps(payload).encode("utf-8"))
+        if body is not None:
+            self._send(200, body, "application/json", gzip_ok=True)
+            return
+
+        html = state["html"].get(name)
+        if html is None:
+            self._send_json({"error": "not found"}, status=404)
+            return
+        self._send(200, html, "text/html; charset=utf-8", gzip_ok=True)
+
+
+# -------------------------------------------------------
+# Server wrapper
+# -------------------------------------------------------
+class StubServer:
+    """A ThreadingHTTPServer on 127.0.0.1:<random port> in a daemon thread."""
+
+    def __init__(self, handler, latency: float = 0.0, jitter: float = 0.0, state: dict | None = None):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.jitter = jitter
+        self.httpd.state = state if state is not None else {}
+        self.httpd.requests = 0
+        self.httpd.count_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> int:
+        return self.httpd.requests
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def start_all(llm_latency: float = 0.0, dispatch_latency: float = 0.0,
+              sec_latency: float = 0.0, jitter: float = 0.0) -> dict:
+    """
+    Start all four stubs and return {"openrouter", "gemini", "dispatch", "sec"} → StubServer.
+    Caller is responsible for .stop()-ing them.
+    """
+    docs = load_docs()
+    sec = StubServer(SecHandler, sec_latency, jitter, state={
+        "html": {name: text_to_html(text).encode("utf-8") for name, text in docs.items()},
+        "doc_names": sorted(docs),
+        "tickers": {stub_cik(t): t for t in STUB_TICKERS},
+        "json": {},
+    }).start()
+    dispatch = StubServer(DispatchHandler, dispatch_latency, jitter, state={
+        "doc_names": sorted(docs), "sec_url": sec.url,
+    }).start()
+    return {
+        "openrouter": StubServer(OpenRouterHandler, llm_latency, jitter).start(),
+        "gemini": StubServer(GeminiHandler, llm_latency, jitter).start(),
+        "dispatch": dispatch,
+        "sec": sec,
+    }
+
+
+def stub_env(servers: dict) -> dict:
+    """Environment variables that point the pipeline at the stub servers."""
+    return {
+        "LLM_URL": f"{servers['openrouter'].url}/api/v1/chat/completions",
+        "OPENROUTER_API_KEY": "stub",
+        "OPENROUTERAPIKEY": "stub",
+        "GEMINI_API_KEY": "stub",
+        "GEMINI_API_ENDPOINT": servers["gemini"].url,
+        "DISPATCH_URL": f"{servers['dispatch'].url}/dispatch",
+        # read by the backend (tools.py / filing_index.py) when it is started against the stubs
+        "SEC_DATA_URL": servers["sec"].url,
+        "SEC_WWW_URL": servers["sec"].url,
+    }
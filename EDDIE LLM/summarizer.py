@@ -246,19 +246,25 @@ Flow:
 
 import os
 import re
-import requests
-import httpx
-from bs4 import BeautifulSoup
+import sys
+from pathlib import Path
 import tiktoken
 from dotenv import load_dotenv
 
-load_dotenv()
+# Same as llm_pipeline: make the repo root importable for RAG.*
+WORK_DIR = Path(__file__).resolve().parent.parent
+if str(WORK_DIR) not in sys.path:
+    sys.path.insert(0, str(WORK_DIR))
+
+from RAG.logs import get_logger
+from RAG.sec_scheduler import sec_get
+from RAG.html_text import clean_html
+from RAG.llm_client import llm
 
-OPENROUTER_API_KEY = os.getenv("OPENROUTERAPIKEY")
-if not OPENROUTER_API_KEY:
-    raise Exception("❌ Missing OPENROUTER_APIKEY")
+load_dotenv()
+log = get_logger("summarizer")
 
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+# Model, API keys and fallbacks live in RAG/llm_client.py (route "summarizer")
 
 
 # -------------------------------------------------------
@@ -273,20 +279,13 @@ def fetch_and_clean_filing(url: str) -> str:
     "Host": "www.sec.gov"
     }
 
-        res = requests.get(url, headers=headers, timeout=30)
+        res = sec_get(url, headers=headers, timeout=30)
         res.raise_for_status()
     except Exception as e:
         return f"[ERROR fetching filing: {str(e)}]"
 
-    soup = BeautifulSoup(res.text, "html.parser")
-
-    # Remove unnecessary HTML
-    for tag in soup(["script", "style", "table", "img", "nav", "header", "footer"]):
-        tag.decompose()
-
-    text = soup.get_text(" ")
-    clean_text = " ".join(text.split())  # normalize whitespace
-    return clean_text
+    # Tables are kept, one "Label | 2024 | 2023" line per row
+    return clean_html(res.content)
 
 
 # -------------------------------------------------------
@@ -388,19 +387,9 @@ Rules:
 """
 
     try:
-        res = httpx.post(
-            OPENROUTER_URL,
-            headers={"Authorization": f"Bearer {OPENROUTER_API_KEY}"},
-            json={
-                "model": "openai/gpt-oss-20b:free",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.1,
-            },
-            timeout=60,
-        )
-
-        data = res.json()
-        return data["choices"][0]["message"]["content"].strip()
+        # openai/gpt-oss-20b:free first, falls back / hedges to the other providers
+        res = llm.complete(prompt, route="summarizer", temperature=0.1, deadline=60)
+        return res["text"].strip()
 
     except Exception as e:
         return f"[ERROR chunk summary: {str(e)}]"
@@ -431,19 +420,8 @@ Rules:
 """
 
     try:
-        res = httpx.post(
-            OPENROUTER_URL,
-            headers={"Authorization": f"Bearer {OPENROUTER_API_KEY}"},
-            json={
-                "model": "openai/gpt-oss-20b:free",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.1,
-            },
-            timeout=60,
-        )
-
-        data = res.json()
-        return data["choices"][0]["message"]["content"].strip()
+        res = llm.complete(prompt, route="summarizer", temperature=0.1, deadline=60)
+        return res["text"].strip()
 
     except Exception as e:
         return f"[ERROR merging: {str(e)}]"
@@ -456,8 +434,7 @@ def get_filing_summary(user_query: str, filing_url: str) -> str:
     """
     Main entry point used in llm_pipeline
     """
-    print("📥 Downloading filing...")
-    print(filing_url)
+    log.info("📥 Downloading filing: %s", filing_url)
     text = fetch_and_clean_filing(filing_url)
 
     # Extract ticker/year/form from URL if possible original
@@ -531,18 +508,18 @@ def get_filing_summary(user_query: str, filing_url: str) -> str:
     # Save cleaned text
     save_txt(cik, year, form_type, text)
 
-    print("🔍 Extracting relevant sections...")
+    log.info("🔍 Extracting relevant sections...")
     sections = extract_relevant_sections(text, user_query)
 
-    print("✂️ Chunking...")
+    log.info("✂️ Chunking...")
     chunks = []
     for sec in sections:
         chunks.extend(chunk_text(sec))
 
-    print(f"📝 Summarizing {len(chunks)} chunks...")
+    log.info("📝 Summarizing %d chunks...", len(chunks))
     chunk_summaries = [summarize_chunk(c, user_query) for c in chunks]
 
-    print("📚 Merging summaries...")
+    log.info("📚 Merging summaries...")
     final_summary = merge_summaries(chunk_summaries, user_query)
 
     return final_summary
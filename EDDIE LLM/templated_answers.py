@@ -0,0 +1,167 @@
+# templated_answers.py
+"""
+Deterministic answers for structured-fact questions.
+
+When /dispatch already returned the exact answer (a CIK, the company info
+block, or a handful of metric values for a specific period) there is nothing
+for an LLM to do except format it. answer_from_dispatch() formats it
+directly in a few microseconds, and returns None whenever the result is
+ambiguous or the question is narrative, so the caller falls back to the LLM.
+"""
+
+import re
+from datetime import date
+
+from dispatch_format import dedupe_facts
+
+# Questions asking for explanation/analysis always go to the LLM
+NARRATIVE_WORDS = [
+    "why", "explain", "analy", "compare", "trend", "impact", "discuss",
+    "summar", "describe", "outlook", "risk", "should", "opinion",
+]
+
+MAX_TABLE_METRICS = 6
+
+FRIENDLY_NAMES = {
+    "Revenues": "Revenue",
+    "NetIncomeLoss": "Net income",
+    "OperatingIncomeLoss": "Operating income",
+    "GrossProfit": "Gross profit",
+    "CostOfRevenue": "Cost of revenue",
+    "Assets": "Total assets",
+    "Liabilities": "Total liabilities",
+    "StockholdersEquity": "Stockholders' equity",
+    "CashAndCashEquivalentsAtCarryingValue": "Cash and cash equivalents",
+    "NetCashProvidedByUsedInOperatingActivities": "Operating cash flow",
+    "ResearchAndDevelopmentExpense": "R&D expense",
+}
+
+
+# -------------------------------------------------------
+# Formatting helpers
+# -------------------------------------------------------
+def metric_name(tag: str) -> str:
+    if tag in FRIENDLY_NAMES:
+        return FRIENDLY_NAMES[tag]
+    words = re.sub(r"(?<=[a-z])(?=[A-Z])", " ", tag).split()
+    return " ".join([words[0]] + [w.lower() for w in words[1:]]) if words else tag
+
+
+def money(val) -> str:
+    if not isinstance(val, (int, float)):
+        return str(val)
+    sign = "-" if val < 0 else ""
+    a = abs(val)
+    for div, suffix in [(1e12, "T"), (1e9, "B"), (1e6, "M")]:
+        if a >= div:
+            return f"{sign}${a / div:,.2f}{suffix} ({sign}${a:,.0f})"
+    return f"{sign}${a:,.0f}" if a >= 1 else f"{sign}${a:g}"
+
+
+def _days(entry: dict) -> int | None:
+    try:
+        return (date.fromisoformat(entry["end"]) - date.fromisoformat(entry["start"])).days
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _period_text(entry: dict) -> str:
+    if entry.get("start"):
+        return f"{entry['start']} to {entry['end']}"
+    return f"as of {entry.get('end')}"
+
+
+# -------------------------------------------------------
+# Facts: pick the single value for the requested period
+# -------------------------------------------------------
+def _matching_entries(entries: list, year: int | None, quarter: int | None) -> list:
+    """Keep entries for the requested period: annual durations (or instants) unless a quarter is asked."""
+    keep = []
+    for e in entries:
+        days = _days(e)
+        if year and not str(e.get("end", "")).startswith(str(year)):
+            continue
+        if quarter:
+            if days is not None and not 80 <= days <= 100:
+                continue
+        elif days is not None and not 330 <= days <= 400:
+            continue
+        keep.append(e)
+    return keep
+
+
+def _facts_answer(facts: dict, json_query: dict, label: str) -> str | None:
+    metrics = json_query.get("metrics") or []
+    year, quarter = json_query.get("year"), json_query.get("quarter")
+    if not metrics or len(metrics) > MAX_TABLE_METRICS:
+        return None    # default 40-metric dump → narrative question, let the LLM pick
+
+    details = dedupe_facts(facts.get("details") or {})
+    rows, missing = [], []
+    for metric in metrics:
+        entries = _matching_entries(details.get(metric, []), year, quarter)
+        if not entries:
+            if facts.get("summary", {}).get(metric) is None:
+                missing.append(metric)
+                continue
+            return None    # summary-only response: period can't be verified
+        if year and len({e.get("val") for e in entries}) > 1:
+            return None    # several different values for the asked period → ambiguous
+        rows.append((metric, entries[0]))    # newest matching period
+
+    if not rows:
+        return None
+
+    when = f"{'Q' + str(quarter) + ' ' if quarter else ''}{year}" if year else "the latest reported period"
+    if len(rows) == 1:
+        metric, e = rows[0]
+        text = (f"{label}'s {metric_name(metric).lower()} for {when} was {money(e.get('val'))} "
+                f"({_period_text(e)}, reported in {e.get('form', 'a filing')}).")
+    else:
+        lines = [f"{label} — reported values for {when}:", "", "| Metric | Period | Value | Form |", "|---|---|---|---|"]
+        for metric, e in rows:
+            lines.append(f"| {metric_name(metric)} | {_period_text(e)} | {money(e.get('val'))} | {e.get('form', '')} |")
+        text = "\n".join(lines)
+
+    if missing:
+        text += "\n\nNot reported in EDGAR data: " + ", ".join(metric_name(m) for m in missing) + "."
+    return text
+
+
+# -------------------------------------------------------
+# MAIN ENTRY
+# -------------------------------------------------------
+def answer_from_dispatch(dispatch_output: dict, user_query: str, json_query: dict | None) -> str | None:
+    """Return a finished answer, or None if the LLM should handle it."""
+    json_query = json_query or {}
+    q = user_query.lower()
+    if any(w in q for w in NARRATIVE_WORDS):
+        return None
+
+    results = (dispatch_output or {}).get("results") or {}
+    ticker = (json_query.get("ticker") or "").upper()
+    label = ticker or "The company"
+    keys = set(results)
+
+    if keys == {"cik"}:
+        return f"The SEC CIK for {label} is {results['cik']}."
+
+    if keys <= {"cik", "company_info"} and isinstance(results.get("company_info"), dict):
+        info = results["company_info"]
+        if "error" in info:
+            return None
+        name = info.get("name") or label
+        lines = [f"**{name}**" + (f" ({ticker})" if ticker else "")]
+        for key, title in [("cik", "CIK"), ("sic_description", "Industry (SIC)"),
+                           ("state", "State of incorporation"), ("filings_count", "Recent filings on EDGAR")]:
+            if info.get(key) not in (None, ""):
+                lines.append(f"- {title}: {info[key]}")
+        return "\n".join(lines)
+
+    if keys <= {"cik", "facts"} and isinstance(results.get("facts"), dict):
+        facts = results["facts"]
+        if "error" in facts:
+            return None
+        return _facts_answer(facts, json_query, label)
+
+    return None
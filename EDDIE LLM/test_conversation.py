@@ -0,0 +1,131 @@
+# test_conversation.py
+"""
+Tests for conversation.py (no LLM, no network). From the EDDIE LLM folder:
+
+    python -m unittest test_conversation
+"""
+
+import unittest
+
+from conversation import MAX_DISPATCH_CACHE, ConversationContext
+
+TOPIC = "Summarize the risk factors in TSLA's 2023 10-K"
+REQUEST = {"ticker": "TSLA", "year": 2023, "form_type": "10-K", "actions": ["get_filings_10k_8k"]}
+URL = "https://www.sec.gov/Archives/edgar/data/1318605/000162828024002390/tsla-20231231.htm"
+
+
+def context() -> ConversationContext:
+    ctx = ConversationContext()
+    ctx.remember(dict(REQUEST), TOPIC)
+    return ctx
+
+
+class ResolveTest(unittest.TestCase):
+    def test_nothing_to_follow_up_on(self):
+        self.assertIsNone(ConversationContext().resolve("and for 2022?"))
+
+    def test_follow_up_inherits_ticker_and_form(self):
+        json_query, query = context().resolve("and for 2022?")
+        self.assertEqual(json_query, {**REQUEST, "year": 2022})
+        self.assertEqual(query, "Summarize the risk factors in TSLA's 2022 10-K")
+
+    def test_new_ticker_overrides_and_keeps_year(self):
+        json_query, query = context().resolve("what about MSFT?")
+        self.assertEqual(json_query, {**REQUEST, "ticker": "MSFT"})
+        self.assertEqual(query, "Summarize the risk factors in MSFT's 2023 10-K")
+
+    def test_new_ticker_and_year(self):
+        json_query, _ = context().resolve("same for AAPL in 2021")
+        self.assertEqual((json_query["ticker"], json_query["year"]), ("AAPL", 2021))
+
+    def test_new_question_is_not_a_substitution(self):
+        ctx = context()
+        self.assertIsNone(ctx.resolve("what about its debt?"))
+        self.assertIsNone(ctx.resolve("How much cash does Apple have?"))
+        self.assertFalse(ctx.elaborating)
+
+    def test_remembered_request_is_not_mutated(self):
+        ctx = context()
+        json_query, _ = ctx.resolve("and for 2022?")
+        json_query["actions"].append("get_company_facts")
+        self.assertEqual(ctx.json_query, REQUEST)
+
+
+class FillMissingTest(unittest.TestCase):
+    def test_request_without_ticker_inherits_company_year_and_form(self):
+        filled = context().fill_missing({"ticker": "", "actions": ["get_company_facts"]})
+        self.assertEqual(filled, {"ticker": "TSLA", "year": 2023, "form_type": "10-K",
+                                  "actions": ["get_company_facts"]})
+
+    def test_explicit_ticker_overrides(self):
+        request = {"ticker": "MSFT", "actions": ["get_company_facts"]}
+        self.assertEqual(context().fill_missing(dict(request)), request)
+
+    def test_explicit_year_is_kept(self):
+        filled = context().fill_missing({"ticker": None, "year": 2019, "actions": ["get_company_facts"]})
+        self.assertEqual((filled["ticker"], filled["year"]), ("TSLA", 2019))
+
+    def test_screen_does_not_inherit(self):
+        screen = {"ticker": "", "year": 2023, "actions": ["screen"], "metrics": ["revenue"]}
+        self.assertEqual(context().fill_missing(dict(screen)), screen)
+
+    def test_remember_keeps_company_across_a_screen(self):
+        ctx = context()
+        ctx.remember({"ticker": "", "year": 2022, "actions": ["screen"]}, "top companies by revenue")
+        self.assertEqual((ctx.ticker, ctx.year), ("TSLA", 2022))
+
+
+class ReusableChunksTest(unittest.TestCase):
+    def setUp(self):
+        self.ctx = context()
+        self.ctx.remember_retrieval("TSLA", 2023, URL, ["TSLA_2023_1A_3", "TSLA_2023_1A_7"])
+
+    def test_elaboration_reuses_chunks_of_the_same_filing(self):
+        json_query, query = self.ctx.resolve("tell me more")
+        self.assertEqual(json_query, REQUEST)
+        self.assertEqual(query, f"{TOPIC} — tell me more")
+        self.assertEqual(self.ctx.reusable_chunks("TSLA", "2023", URL), ["TSLA_2023_1A_3", "TSLA_2023_1A_7"])
+
+    def test_other_filing_or_no_elaboration_retrieves_again(self):
+        self.ctx.resolve("why?")
+        self.assertEqual(self.ctx.reusable_chunks("TSLA", 2022, URL), [])
+        self.ctx.resolve("and for 2022?")
+        self.assertEqual(self.ctx.reusable_chunks("TSLA", 2023, URL), [])
+
+    def test_long_question_is_not_an_elaboration(self):
+        self.assertIsNone(self.ctx.resolve("tell me more about the battery supply agreements with Panasonic and CATL"))
+        self.assertEqual(self.ctx.reusable_chunks("TSLA", 2023, URL), [])
+
+
+class DispatchCacheTest(unittest.TestCase):
+    @staticmethod
+    def request(year: int) -> dict:
+        return {**REQUEST, "year": year}
+
+    def test_hit_ignores_key_order(self):
+        ctx = ConversationContext()
+        ctx.store_dispatch(self.request(2023), {"status": "success"})
+        self.assertEqual(ctx.cached_dispatch(dict(reversed(list(self.request(2023).items())))), {"status": "success"})
+
+    def test_lru_eviction(self):
+        self.assertEqual(MAX_DISPATCH_CACHE, 4)
+        ctx = ConversationContext()
+        for year in range(2020, 2024):
+            ctx.store_dispatch(self.request(year), {"year": year})
+        ctx.cached_dispatch(self.request(2020))                     # 2020 is now the most recent
+        ctx.store_dispatch(self.request(2024), {"year": 2024})      # evicts 2021, the least recent
+        self.assertIsNone(ctx.cached_dispatch(self.request(2021)))
+        for year in (2020, 2022, 2023, 2024):
+            self.assertEqual(ctx.cached_dispatch(self.request(year)), {"year": year})
+        self.assertEqual(len(ctx._dispatch), MAX_DISPATCH_CACHE)
+
+    def test_screens_are_never_cached(self):
+        ctx = ConversationContext()
+        screen = {"ticker": "", "year": 2023, "actions": ["screen"], "metrics": ["revenue"]}
+        ctx.store_dispatch(screen, {"status": "success"})
+        self.assertIsNone(ctx.cached_dispatch(screen))
+        self.assertEqual(len(ctx._dispatch), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
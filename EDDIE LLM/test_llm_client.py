@@ -0,0 +1,108 @@
+# test_llm_client.py
+"""
+Tests for RAG/llm_client.py against local OpenRouter stubs (stub_servers.py),
+no API keys or network needed. From the EDDIE LLM folder:
+
+    python -m unittest test_llm_client
+"""
+
+import sys
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+WORK_DIR = Path(__file__).resolve().parent.parent
+if str(WORK_DIR) not in sys.path:
+    sys.path.insert(0, str(WORK_DIR))
+
+from RAG import llm_client
+from RAG.llm_client import LLMClient, LLMError, OpenRouterProvider
+from stub_servers import STUB_ANSWER, OpenRouterHandler, StubServer
+
+
+class LLMClientTest(unittest.TestCase):
+    def setUp(self):
+        self.servers = {}
+        patches = [mock.patch.object(llm_client, "HEDGE_AFTER", 0.2), mock.patch.object(llm_client, "BACKOFF", 0.01)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        for server in self.servers.values():
+            server.stop()
+
+    def stub(self, name: str, latency: float = 0.0, status: int = 200) -> OpenRouterProvider:
+        server = self.servers[name] = StubServer(OpenRouterHandler, latency, state={"status": status}).start()
+        return OpenRouterProvider(f"stub/{name}", url=f"{server.url}/api/v1/chat/completions", api_key="stub")
+
+    def client(self, providers: dict, **kwargs) -> LLMClient:
+        client = LLMClient(providers, {"test": list(providers)}, **kwargs)
+        self.addCleanup(client.pool.shutdown, wait=False)
+        return client
+
+    def test_primary_answers(self):
+        client = self.client({"primary": self.stub("primary"), "fallback": self.stub("fallback")})
+        res = client.complete("hello", route="test")
+        self.assertEqual((res["text"], res["provider"], res["attempts"], res["hedged"]),
+                         (STUB_ANSWER, "primary", 1, False))
+        self.assertEqual(self.servers["fallback"].requests, 0)
+
+    def test_slow_primary_is_hedged_and_the_hedge_wins(self):
+        client = self.client({"primary": self.stub("primary", latency=2.0), "fallback": self.stub("fallback")})
+        t0 = time.monotonic()
+        res = client.complete("hello", route="test")
+        self.assertLess(time.monotonic() - t0, 1.5)
+        self.assertEqual((res["provider"], res["hedged"], res["attempts"]), ("fallback", True, 2))
+        stats = client.stats()
+        self.assertEqual((stats["fallback"]["hedges"], stats["fallback"]["wins"]), (1, 1))
+
+    def test_hedge_waits_for_the_primary_p90(self):
+        client = self.client({"primary": self.stub("primary", latency=0.3), "fallback": self.stub("fallback")})
+        self.assertEqual(client.hedge_delay("primary"), 0.2)            # no samples yet: HEDGE_AFTER
+        for _ in range(llm_client.MIN_SAMPLES):
+            client._record("primary", 1.0, ok=True)
+            client._record("fallback", 1.0, ok=True)        # same p50: the route order decides
+        self.assertEqual(client.hedge_delay("primary"), 1.0)
+        res = client.complete("hello", route="test")
+        self.assertEqual((res["provider"], res["hedged"]), ("primary", False))
+
+    def test_primary_5xx_retries_on_the_fallback(self):
+        client = self.client({"primary": self.stub("primary", status=503), "fallback": self.stub("fallback")},
+                             hedge=False, retries=2)
+        res = client.complete("hello", route="test")
+        self.assertEqual((res["provider"], res["attempts"], res["hedged"]), ("fallback", 2, False))
+        self.assertEqual(self.servers["primary"].requests, 1)
+        self.assertEqual(client.stats()["primary"]["errors"], 1)
+
+    def test_mostly_failing_provider_is_ranked_last(self):
+        client = self.client({"primary": self.stub("primary", status=503), "fallback": self.stub("fallback")},
+                             hedge=False)
+        for _ in range(3):
+            client.complete("hello", route="test")
+        self.assertEqual(client.rank("test"), ["fallback", "primary"])
+
+    def test_every_attempt_failing_raises(self):
+        client = self.client({"primary": self.stub("primary", status=500), "fallback": self.stub("fallback", status=502)},
+                             hedge=False, retries=2)
+        with self.assertRaises(LLMError) as e:
+            client.complete("hello", route="test")
+        self.assertIn("after 3 attempt(s)", str(e.exception))
+
+    def test_deadline_exceeded_raises(self):
+        client = self.client({"primary": self.stub("primary", latency=2.0)}, hedge=False)
+        t0 = time.monotonic()
+        with self.assertRaises(LLMError):
+            client.complete("hello", route="test", deadline=0.3)
+        self.assertLess(time.monotonic() - t0, 1.0)
+
+    def test_no_configured_provider_raises(self):
+        client = self.client({"primary": OpenRouterProvider("stub/none", url="http://127.0.0.1:9", api_key=None)})
+        with self.assertRaises(LLMError) as e:
+            client.complete("hello", route="test")
+        self.assertIn("OPENROUTER_API_KEY", str(e.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,310 @@
+"""
+Eddie Section Diffs - what changed in an Item between consecutive 10-Ks
+-----------------------------------------------------------------------
+"What changed in risk factors vs last year?" used to mean two full Item 1A
+sections in one prompt. Instead, every ingested filing has its paragraphs
+fingerprinted per Item (exact digest + 64-bit SimHash) in
+<db_dir>/diffs.sqlite3, and as soon as two consecutive years of the same
+company are both fingerprinted the delta between them is precomputed:
+
+    diffs.replace_filing("AAPL", "2024", url, split_items(text))
+    diffs.build("AAPL", "2024", "2023")      # done automatically at ingest
+    diffs.delta("AAPL", "2024", items=["1A"])
+    → {"base_year": "2023", "items": {"1A": {"added": [...], "removed": [...],
+                                            "modified": [(old, new), ...], "unchanged": 212}}}
+
+- Identical paragraphs (same digest) are unchanged, wherever they moved to.
+- The rest are paired greedily by SimHash Hamming distance; pairs within
+  MODIFIED_BITS are "modified" (reworded), the leftovers added / removed.
+- Short lines (headings, page numbers) and table rows are not fingerprinted:
+  tables change every year and are answered by the table / fact stores.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+
+import numpy as np
+
+MIN_PARAGRAPH = 80      # characters; shorter lines are headings, captions, page numbers
+MAX_PARAGRAPH = 3000    # longer lines are split into sentences
+MODIFIED_BITS = 12      # SimHash distance (of 64) up to which two paragraphs are the same one, reworded
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z\u201c\"(])")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS paragraphs (
+    company  TEXT NOT NULL,
+    year     TEXT NOT NULL,
+    url      TEXT NOT NULL,
+    item     TEXT NOT NULL,
+    pos      INTEGER NOT NULL,         -- order within the Item
+    simhash  INTEGER NOT NULL,         -- signed 64-bit
+    digest   TEXT NOT NULL,            -- of the normalised text
+    text     TEXT NOT NULL,
+    PRIMARY KEY (company, year, item, pos)
+);
+CREATE TABLE IF NOT EXISTS changes (
+    company    TEXT NOT NULL,
+    year       TEXT NOT NULL,
+    base_year  TEXT NOT NULL,
+    item       TEXT NOT NULL,
+    kind       TEXT NOT NULL,          -- added | removed | modified
+    pos        INTEGER,                -- position in `year` (removed: in `base_year`)
+    text       TEXT,                   -- new text (removed: old text)
+    base_text  TEXT,                   -- modified: old text
+    distance   INTEGER                 -- modified: SimHash distance
+);
+CREATE INDEX IF NOT EXISTS changes_pair ON changes(company, year, base_year, item);
+CREATE TABLE IF NOT EXISTS diff_pairs (
+    company    TEXT NOT NULL,
+    year       TEXT NOT NULL,
+    base_year  TEXT NOT NULL,
+    item       TEXT NOT NULL,
+    added      INTEGER,
+    removed    INTEGER,
+    modified   INTEGER,
+    unchanged  INTEGER,
+    built      REAL,
+    PRIMARY KEY (company, year, base_year, item)
+);
+"""
+
+
+def _normalise(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _sentences(line: str) -> list:
+    """Split an over-long line into sentence runs of at least MIN_PARAGRAPH characters."""
+    out, run = [], ""
+    for sentence in SENTENCE_END.split(line):
+        run = f"{run} {sentence}".strip()
+        if len(run) >= MIN_PARAGRAPH:
+            out.append(run)
+            run = ""
+    if run and out:
+        out[-1] += " " + run
+    return out or [line]
+
+
+def paragraphs(body: str) -> list:
+    """
+    Fingerprintable paragraphs of one section: long prose lines, no table
+    rows. Text flattened onto a few huge lines (older caches) is cut at
+    sentence ends, so one inserted sentence does not shift every unit after it.
+    """
+    out = []
+    for line in body.split("\n"):
+        line = line.strip()
+        for unit in _sentences(line) if len(line) > MAX_PARAGRAPH else [line]:
+            if len(unit) >= MIN_PARAGRAPH and " | " not in unit:
+                out.append(unit)
+    return out
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word unigrams + bigrams (unsigned)."""
+    words = _normalise(text).split()
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not features:
+        return 0
+    hashes = np.array([int.from_bytes(hashlib.blake2b(f.encode(), digest_size=8).digest(), "little")
+                       for f in features], dtype=np.uint64)
+    bits = (hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    votes = bits.sum(axis=0) * 2 > len(features)
+    return sum(1 << int(i) for i in np.flatnonzero(votes))
+
+
+def _signed(h: int) -> int:
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+
+def _hamming(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise Hamming distances between two uint64 vectors → int [len(a), len(b)]."""
+    x = a[:, None] ^ b[None, :]
+    return np.unpackbits(x.view(np.uint8).reshape(*x.shape, 8), axis=-1).sum(axis=-1)
+
+
+def compare(old: list, new: list) -> dict:
+    """
+    Diff two fingerprinted paragraph lists [(pos, simhash, digest, text), ...]
+    → {"added", "removed", "modified", "unchanged"}.
+    """
+    old_digests = {p[2] for p in old}
+    new_digests = {p[2] for p in new}
+    rest_old = [p for p in old if p[2] not in new_digests]
+    rest_new = [p for p in new if p[2] not in old_digests]
+    unchanged = len(new) - len(rest_new)
+
+    modified, used_old, used_new = [], set(), set()
+    if rest_old and rest_new:
+        dist = _hamming(np.array([p[1] & (2**64 - 1) for p in rest_old], dtype=np.uint64),
+                        np.array([p[1] & (2**64 - 1) for p in rest_new], dtype=np.uint64))
+        # Greedy: closest pairs first, each paragraph used once
+        for flat in np.argsort(dist, axis=None, kind="stable"):
+            i, j = divmod(int(flat), dist.shape[1])
+            if dist[i, j] > MODIFIED_BITS:
+                break
+            if i in used_old or j in used_new:
+                continue
+            used_old.add(i)
+            used_new.add(j)
+            modified.append((rest_old[i], rest_new[j], int(dist[i, j])))
+    modified.sort(key=lambda m: m[1][0])
+    return {
+        "added": [p for j, p in enumerate(rest_new) if j not in used_new],
+        "removed": [p for i, p in enumerate(rest_old) if i not in used_old],
+        "modified": modified,
+        "unchanged": unchanged,
+    }
+
+
+class DiffStore:
+    def __init__(self, db_dir: str):
+        os.makedirs(db_dir, exist_ok=True)
+        self.path = os.path.join(db_dir, "diffs.sqlite3")
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # ---- fingerprints --------------------------------------------------
+    def delete_filing(self, company: str, year):
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            conn.execute("DELETE FROM paragraphs WHERE company=? AND year=?", (company, str(year)))
+            for table in ("changes", "diff_pairs"):
+                conn.execute(f"DELETE FROM {table} WHERE company=? AND (year=? OR base_year=?)",
+                             (company, str(year), str(year)))
+            conn.execute("COMMIT")
+
+    def replace_filing(self, company: str, year, url: str, sections: list) -> int:
+        """Fingerprint [(item, text), ...] of a filing (replacing any previous copy). Returns paragraphs stored."""
+        rows = []
+        for item, body in sections:
+            for pos, para in enumerate(paragraphs(body)):
+                digest = hashlib.blake2b(_normalise(para).encode(), digest_size=16).hexdigest()
+                rows.append((company, str(year), url, item, pos, _signed(simhash(para)), digest, para))
+        self.delete_filing(company, year)
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO paragraphs (company, year, url, item, pos, simhash, digest, text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        return len(rows)
+
+    def has_filing(self, company: str, year, url: str) -> bool:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT 1 FROM paragraphs WHERE company=? AND year=? AND url=? LIMIT 1",
+                               (company, str(year), url)).fetchone()
+        return row is not None
+
+    def _paragraphs(self, conn, company: str, year) -> dict:
+        out = {}
+        for r in conn.execute("SELECT item, pos, simhash, digest, text FROM paragraphs "
+                              "WHERE company=? AND year=? ORDER BY item, pos", (company, str(year))):
+            out.setdefault(r["item"], []).append((r["pos"], r["simhash"], r["digest"], r["text"]))
+        return out
+
+    # ---- diffs ---------------------------------------------------------
+    def build(self, company: str, year, base_year) -> dict:
+        """
+        Precompute the per-Item delta of `year` against `base_year`.
+        → {item: {"added": n, "removed": n, "modified": n, "unchanged": n}}; {} if either is missing.
+        """
+        year, base_year = str(year), str(base_year)
+        with closing(self._connect()) as conn:
+            new, old = self._paragraphs(conn, company, year), self._paragraphs(conn, company, base_year)
+            if not new or not old:
+                return {}
+            summary, rows = {}, []
+            for item in sorted(set(new) | set(old)):
+                d = compare(old.get(item, []), new.get(item, []))
+                rows += [(company, year, base_year, item, "added", p[0], p[3], None, None) for p in d["added"]]
+                rows += [(company, year, base_year, item, "removed", p[0], p[3], None, None) for p in d["removed"]]
+                rows += [(company, year, base_year, item, "modified", n[0], n[3], o[3], dist)
+                         for o, n, dist in d["modified"]]
+                summary[item] = {"added": len(d["added"]), "removed": len(d["removed"]),
+                                 "modified": len(d["modified"]), "unchanged": d["unchanged"]}
+
+            conn.execute("BEGIN")
+            conn.execute("DELETE FROM changes WHERE company=? AND year=? AND base_year=?", (company, year, base_year))
+            conn.execute("DELETE FROM diff_pairs WHERE company=? AND year=? AND base_year=?", (company, year, base_year))
+            conn.executemany(
+                "INSERT INTO changes (company, year, base_year, item, kind, pos, text, base_text, distance) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany(
+                "INSERT INTO diff_pairs (company, year, base_year, item, added, removed, modified, unchanged, built) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(company, year, base_year, item, s["added"], s["removed"], s["modified"], s["unchanged"], time.time())
+                 for item, s in summary.items()])
+            conn.execute("COMMIT")
+        return summary
+
+    def link(self, company: str, year) -> list:
+        """Build the diffs between `year` and its fingerprinted neighbours (year-1, year+1). Returns pairs built."""
+        try:
+            y = int(year)
+        except (TypeError, ValueError):
+            return []
+        built = []
+        for new, old in ((y, y - 1), (y + 1, y)):
+            if self.build(company, new, old):
+                built.append((str(new), str(old)))
+        return built
+
+    def delta(self, company: str, year, base_year=None, items: list | None = None) -> dict | None:
+        """
+        The precomputed changes of `year` vs `base_year` (default: the year
+        before), optionally only for some Items. None if no diff was built.
+        """
+        year = str(year)
+        if base_year is None:
+            try:
+                base_year = str(int(year) - 1)
+            except ValueError:
+                return None
+        base_year = str(base_year)
+        with closing(self._connect()) as conn:
+            pairs = conn.execute("SELECT * FROM diff_pairs WHERE company=? AND year=? AND base_year=?",
+                                 (company, year, base_year)).fetchall()
+            if not pairs:
+                return None
+            wanted = {p["item"] for p in pairs if not items or p["item"] in items}
+            out = {item: {"added": [], "removed": [], "modified": []} for item in sorted(wanted)}
+            for p in pairs:
+                if p["item"] in out:
+                    out[p["item"]]["unchanged"] = p["unchanged"]
+            for r in conn.execute("SELECT item, kind, text, base_text FROM changes "
+                                  "WHERE company=? AND year=? AND base_year=? ORDER BY item, kind, pos",
+                                  (company, year, base_year)):
+                if r["item"] in out:
+                    value = (r["base_text"], r["text"]) if r["kind"] == "modified" else r["text"]
+                    out[r["item"]][r["kind"]].append(value)
+        return {"company": company, "year": year, "base_year": base_year, "items": out}
+
+
+def format_delta(delta: dict, max_chars: int) -> str:
+    """The delta as prompt context: one block per Item, cut at max_chars."""
+    parts, size = [], 0
+    for item, d in delta["items"].items():
+        lines = [f"### Item {item} ({len(d['added'])} added, {len(d['removed'])} removed, "
+                 f"{len(d['modified'])} modified, {d.get('unchanged', 0)} unchanged paragraphs)"]
+        lines += [f"[ADDED] {t}" for t in d["added"]]
+        lines += [f"[REMOVED] {t}" for t in d["removed"]]
+        lines += [f"[MODIFIED]\n  {delta['base_year']}: {old}\n  {delta['year']}: {new}" for old, new in d["modified"]]
+        for line in lines:
+            if size + len(line) > max_chars:
+                parts.append("[... further changes omitted ...]")
+                return "\n".join(parts)
+            parts.append(line)
+            size += len(line) + 1
+    return "\n".join(parts)
@@ -0,0 +1,70 @@
+"""
+Eddie FileLock - tiny cross-process lock
+----------------------------------------
+Exclusive lock on a lock file: fcntl.flock on POSIX, msvcrt.locking on
+Windows. Works across processes and across threads (each FileLock object
+holds its own file descriptor). No third-party dependency.
+
+Named eddie_lock, not filelock, so it never shadows the PyPI `filelock`
+package (a common transitive dependency). RAG/eddie_lock.py and the
+backend's eddie_lock.py are deliberate identical copies, like
+sec_scheduler.py: the backend deploys on its own, without the RAG package.
+
+    with FileLock("./chroma_db_local/.ingest_AAPL_2023.lock"):
+        ...
+"""
+
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:      # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    def __init__(self, path: str, poll: float = 0.05):
+        self.path = path
+        self.poll = poll
+        self._fd = None
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        """Block until locked (or until `timeout` seconds pass → False)."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX | (fcntl.LOCK_NB if deadline is not None else 0))
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                self._fd = fd
+                return True
+            except OSError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    os.close(fd)
+                    return False
+                time.sleep(self.poll)
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,203 @@
+"""
+Eddie Fact Store - inline-XBRL facts parsed out of filings
+----------------------------------------------------------
+Every ix:nonFraction / short ix:nonNumeric fact of an ingested filing is kept
+in <db_dir>/facts.sqlite3 with its resolved period, unit and dimensions:
+
+    facts.replace_filing("AAPL", "2024", url, doc.facts)     # doc = HtmlText
+    facts.lookup("AAPL", "2024", "What was Apple's revenue?")
+    → {"concept": "us-gaap:RevenueFromContract...", "facts": [{"value": 391035000000.0, ...}]}
+
+Numbers in the filing the user asked about are then answered from the tags
+themselves: no companyfacts download, no embedding, no LLM.
+"""
+
+import os
+import re
+import sqlite3
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS facts (
+    company   TEXT NOT NULL,
+    year      TEXT NOT NULL,
+    url       TEXT NOT NULL,
+    concept   TEXT NOT NULL,          -- e.g. us-gaap:NetIncomeLoss
+    value     REAL,                   -- ix:nonFraction (scaled, signed)
+    text      TEXT,                   -- short ix:nonNumeric
+    unit      TEXT,                   -- USD, shares, USD/shares, pure, ...
+    decimals  TEXT,
+    period_start TEXT,                -- NULL for instants
+    period_end   TEXT,
+    dims      TEXT                    -- "axis=member;..." ('' = no dimensions)
+);
+CREATE INDEX IF NOT EXISTS facts_filing ON facts(company, year, concept);
+"""
+
+# Question wording → concepts, in order of preference
+ALIASES = {
+    "revenue": ["Revenues", "RevenueFromContractWithCustomerExcludingAssessedTax", "SalesRevenueNet"],
+    "net sales": ["RevenueFromContractWithCustomerExcludingAssessedTax", "Revenues", "SalesRevenueNet"],
+    "cost of revenue": ["CostOfRevenue", "CostOfGoodsAndServicesSold"],
+    "cost of sales": ["CostOfGoodsAndServicesSold", "CostOfRevenue"],
+    "gross profit": ["GrossProfit"],
+    "gross margin": ["GrossProfit"],
+    "operating income": ["OperatingIncomeLoss"],
+    "operating expenses": ["OperatingExpenses"],
+    "net income": ["NetIncomeLoss"],
+    "net loss": ["NetIncomeLoss"],
+    "earnings per share": ["EarningsPerShareDiluted", "EarningsPerShareBasic"],
+    "eps": ["EarningsPerShareDiluted", "EarningsPerShareBasic"],
+    "research and development": ["ResearchAndDevelopmentExpense"],
+    "r&d": ["ResearchAndDevelopmentExpense"],
+    "income tax": ["IncomeTaxExpenseBenefit"],
+    "total assets": ["Assets"],
+    "total liabilities": ["Liabilities"],
+    "shareholders equity": ["StockholdersEquity"],
+    "stockholders equity": ["StockholdersEquity"],
+    "cash and cash equivalents": ["CashAndCashEquivalentsAtCarryingValue"],
+    "long-term debt": ["LongTermDebtNoncurrent", "LongTermDebt"],
+    "long term debt": ["LongTermDebtNoncurrent", "LongTermDebt"],
+    "operating cash flow": ["NetCashProvidedByUsedInOperatingActivities"],
+    "cash from operations": ["NetCashProvidedByUsedInOperatingActivities"],
+    "investing activities": ["NetCashProvidedByUsedInInvestingActivities"],
+    "financing activities": ["NetCashProvidedByUsedInFinancingActivities"],
+    "capital expenditures": ["PaymentsToAcquirePropertyPlantAndEquipment"],
+    "capex": ["PaymentsToAcquirePropertyPlantAndEquipment"],
+    "dividends": ["PaymentsOfDividends"],
+    "buybacks": ["PaymentsForRepurchaseOfCommonStock"],
+    "share repurchases": ["PaymentsForRepurchaseOfCommonStock"],
+    "shares outstanding": ["EntityCommonStockSharesOutstanding", "CommonStockSharesOutstanding"],
+}
+MIN_CONCEPT_WORDS = 2
+MAX_PERIODS = 4
+
+
+def _words(text: str) -> list:
+    words = re.findall(r"[a-z0-9&]+", text.lower())
+    return [w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words]
+
+
+def concept_words(concept: str) -> list:
+    """'us-gaap:NetIncomeLoss' → ['net', 'income', 'los']  (same normalisation as queries)."""
+    local = concept.split(":")[-1]
+    return _words(" ".join(re.findall(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+", local)))
+
+
+class FactStore:
+    def __init__(self, db_dir: str):
+        os.makedirs(db_dir, exist_ok=True)
+        self.path = os.path.join(db_dir, "facts.sqlite3")
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def delete_filing(self, company: str, year):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM facts WHERE company=? AND year=?", (company, str(year)))
+
+    def replace_filing(self, company: str, year, url: str, facts: list) -> int:
+        """Store a filing's facts (replacing any previous copy). Returns facts stored."""
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            conn.execute("DELETE FROM facts WHERE company=? AND year=?", (company, str(year)))
+            conn.executemany(
+                "INSERT INTO facts (company, year, url, concept, value, text, unit, decimals, period_start, period_end, dims) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(company, str(year), url, f["concept"], f.get("value"), f.get("text"), f.get("unit"),
+                  f.get("decimals"), f.get("start"), f.get("end"), f.get("dims") or "") for f in facts],
+            )
+            conn.execute("COMMIT")
+        return len(facts)
+
+    def has_filing(self, company: str, year, url: str) -> bool:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT 1 FROM facts WHERE company=? AND year=? AND url=? LIMIT 1",
+                               (company, str(year), url)).fetchone()
+        return row is not None
+
+    def concept_for(self, company: str, year, query: str) -> str | None:
+        """
+        The filing's concept the query asks about: the longest matching
+        multi-word alias, else a concept whose name words all appear in the
+        query, else a single-word alias (revenue, eps, capex, ...).
+        """
+        with closing(self._connect()) as conn:
+            concepts = [r["concept"] for r in conn.execute(
+                "SELECT DISTINCT concept FROM facts WHERE company=? AND year=? AND value IS NOT NULL",
+                (company, str(year)))]
+        by_local = {c.split(":")[-1]: c for c in concepts}
+
+        q = f" {' '.join(_words(query))} "
+
+        def alias(phrases) -> str | None:
+            for phrase in sorted(phrases, key=len, reverse=True):
+                if f" {' '.join(_words(phrase))} " in q:
+                    for local in ALIASES[phrase]:
+                        if local in by_local:
+                            return by_local[local]
+            return None
+
+        hit = alias([p for p in ALIASES if len(_words(p)) > 1])
+        if hit:
+            return hit
+
+        qwords = set(q.split())
+        best = None
+        for c in concepts:
+            words = concept_words(c)
+            if len(words) >= MIN_CONCEPT_WORDS and all(w in qwords for w in words):
+                if best is None or len(words) > len(concept_words(best)):
+                    best = c
+        return best or alias([p for p in ALIASES if len(_words(p)) == 1])
+
+    def lookup(self, company: str, year, query: str, limit: int = MAX_PERIODS) -> dict | None:
+        """Latest periods of the matched concept, facts without dimensions first."""
+        concept = self.concept_for(company, year, query)
+        if concept is None:
+            return None
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT value, unit, decimals, period_start, period_end, dims FROM facts "
+                "WHERE company=? AND year=? AND concept=? AND value IS NOT NULL "
+                "ORDER BY dims != '', period_end DESC, period_start DESC LIMIT ?",
+                (company, str(year), concept, limit),
+            ).fetchall()
+        return {
+            "concept": concept,
+            "facts": [{"value": r["value"], "unit": r["unit"], "decimals": r["decimals"],
+                       "start": r["period_start"], "end": r["period_end"], "dims": r["dims"]} for r in rows],
+        }
+
+
+def format_value(value: float, unit: str | None) -> str:
+    sign = "-" if value < 0 else ""
+    if unit == "USD":
+        v = abs(value)
+        if v >= 1e6:
+            return f"{sign}${v / 1e6:,.0f} million" if v >= 1e8 else f"{sign}${v / 1e6:,.1f} million"
+        return f"{sign}${v:,.0f}"
+    if unit and unit.startswith("USD/"):
+        return f"{sign}${abs(value):,.2f} per {unit.split('/', 1)[1].rstrip('s')}"
+    if unit == "shares":
+        return f"{value:,.0f} shares"
+    if unit == "pure":
+        return f"{value:g}"
+    return f"{value:,g} {unit or ''}".strip()
+
+
+def format_facts(hit: dict) -> str:
+    """Markdown answer: concept name, then one line per period."""
+    prefix, _, local = hit["concept"].rpartition(":")
+    label = " ".join(re.findall(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+", local)) or local
+    lines = [f"**{label}** ({prefix or 'xbrl'}, tagged in the filing)"]
+    for f in hit["facts"]:
+        period = f"{f['start']} → {f['end']}" if f["start"] else f"as of {f['end']}"
+        dims = f" [{f['dims'].replace(';', ', ')}]" if f["dims"] else ""
+        lines.append(f"- {period}{dims}: {format_value(f['value'], f['unit'])}")
+    return "\n".join(lines)
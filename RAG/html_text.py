@@ -0,0 +1,314 @@
+"""
+Eddie HTML → Text - incremental filing parser
+---------------------------------------------
+One lxml parser shared by ingestion (rag_engine) and the summarizer:
+
+    doc = HtmlText()
+    for chunk in response.iter_content(65536):
+        doc.feed(chunk)              # parse while downloading
+    text = doc.close()               # visible text, one line per text node
+    doc.tables                       # [{"caption", "rows", "text"}, ...]
+    doc.facts                        # [{"concept", "value", "unit", "start", "end", ...}, ...]
+
+Tables are not flattened into one cell per line any more: each row becomes a
+single "Label | 2024 | 2023" line (so chunking does not split rows), and the
+structured rows are kept in `doc.tables` for the table store.
+
+Inline-XBRL filings tag their numbers (ix:nonFraction / ix:nonNumeric) and
+define contexts and units in a hidden ix:header. The header never reaches
+the text, but the facts are collected in the same pass, resolved against
+their contexts/units, and kept in `doc.facts` for the facts store.
+"""
+
+import re
+
+from lxml import etree
+
+SKIP_TAGS = {"script", "style", "noscript", "xbrl", "header", "footer", "ix:header"}
+CELL_TAGS = {"td", "th"}
+
+# SEC tables put "$", ")" and "%" in cells of their own
+_PREFIX_CELLS = {"$", "(", "($"}
+_SUFFIX_CELLS = {")", "%", ")%", "%)"}
+
+
+# Text facts longer than this are prose (policies, notes) - already in the text
+MAX_TEXT_FACT = 200
+_XBRL_PREFIXES = ("ix:", "xbrli:", "xbrldi:")
+_ZERO_TEXT = {"-", "—", "–", "no", "none", "nil"}
+
+
+def _clean_lines(text: str) -> str:
+    return "\n".join([t.strip() for t in text.splitlines() if t.strip()])
+
+
+def _merge_cells(cells: list) -> list:
+    out = []
+    pending = ""
+    for cell in cells:
+        if not cell:
+            continue
+        if cell in _PREFIX_CELLS:
+            pending += cell.replace("$", "")
+            continue
+        if cell in _SUFFIX_CELLS and out:
+            out[-1] += cell
+            continue
+        out.append(pending + cell)
+        pending = ""
+    return out
+
+
+def _measure(text: str) -> str:
+    """'iso4217:USD' → 'USD', 'xbrli:shares' → 'shares'."""
+    return text.strip().split(":")[-1]
+
+
+def parse_ix_number(text: str, fmt: str = "", scale: str = "", sign: str = "") -> float | None:
+    """Value of an ix:nonFraction as displayed ("391,035", scale 6) → 391035000000.0."""
+    raw = " ".join(text.split())
+    fmt = (fmt or "").lower()
+    if raw.lower() in _ZERO_TEXT or "zero" in fmt or "dash" in fmt:
+        value = 0.0
+    else:
+        if "comma-decimal" in fmt or "numcommadecimal" in fmt:
+            raw = raw.replace(".", "").replace(" ", "").replace(",", ".")
+        else:
+            raw = raw.replace(",", "").replace(" ", "")
+        try:
+            value = float(raw.strip("()$"))
+        except ValueError:
+            return None
+    if scale:
+        try:
+            value *= 10 ** int(scale)
+        except ValueError:
+            pass
+    return -value if sign == "-" else value
+
+
+class _InlineXbrl:
+    """Collects ix:nonFraction / ix:nonNumeric facts and the xbrli contexts and units they point at."""
+
+    def __init__(self):
+        self.contexts = {}      # id → {"start", "end", "dims"}
+        self.units = {}         # id → "USD", "USD/shares", ...
+        self.raw = []           # facts in document order: (tag, attrib, text)
+        self.open = []          # facts being read: [tag, attrib, pieces, length, keep_text]
+        self.context = None     # xbrli:context being read
+        self.unit = None        # xbrli:unit being read
+        self.buf = None         # text of the context/unit child being read
+
+    def start(self, tag, attrib):
+        if tag in ("ix:nonfraction", "ix:nonnumeric"):
+            keep = tag == "ix:nonfraction" or not attrib.get("name", "").endswith("TextBlock")
+            self.open.append([tag, dict(attrib), [], 0, keep])
+        elif tag == "xbrli:context":
+            self.context = {"id": attrib.get("id"), "start": None, "end": None, "dims": []}
+        elif tag == "xbrli:unit":
+            self.unit = {"id": attrib.get("id"), "part": "measures", "measures": [], "num": [], "den": []}
+        elif tag == "xbrli:unitnumerator" and self.unit:
+            self.unit["part"] = "num"
+        elif tag == "xbrli:unitdenominator" and self.unit:
+            self.unit["part"] = "den"
+        elif tag in ("xbrli:startdate", "xbrli:enddate", "xbrli:instant", "xbrli:measure"):
+            self.buf = []
+        elif tag in ("xbrldi:explicitmember", "xbrldi:typedmember") and self.context:
+            self.buf = []
+            self.context["dim"] = attrib.get("dimension", "")
+
+    def data(self, data):
+        if self.buf is not None:
+            self.buf.append(data)
+        for f in self.open:
+            if f[4] and f[3] <= MAX_TEXT_FACT:
+                f[2].append(data)
+                f[3] += len(data)
+
+    def end(self, tag):
+        if tag in ("ix:nonfraction", "ix:nonnumeric") and self.open:
+            name, attrib, pieces, length, keep = self.open.pop()
+            self.raw.append((name, attrib, " ".join("".join(pieces).split()) if keep else None))
+            return
+        text = "".join(self.buf).strip() if self.buf is not None else ""
+        if tag in ("xbrli:startdate", "xbrli:enddate", "xbrli:instant") and self.context:
+            self.context["start" if tag == "xbrli:startdate" else "end"] = text
+        elif tag in ("xbrldi:explicitmember", "xbrldi:typedmember") and self.context:
+            self.context["dims"].append(f"{self.context.pop('dim', '')}={' '.join(text.split())}")
+        elif tag == "xbrli:measure" and self.unit:
+            self.unit[self.unit["part"]].append(_measure(text))
+        elif tag == "xbrli:context" and self.context:
+            ctx = self.context
+            self.contexts[ctx["id"]] = {"start": ctx["start"], "end": ctx["end"], "dims": ";".join(sorted(ctx["dims"]))}
+            self.context = None
+        elif tag == "xbrli:unit" and self.unit:
+            u = self.unit
+            self.units[u["id"]] = ("*".join(u["num"]) + "/" + "*".join(u["den"])) if u["den"] else "*".join(u["measures"])
+            self.unit = None
+        if tag in ("xbrli:startdate", "xbrli:enddate", "xbrli:instant", "xbrli:measure",
+                   "xbrldi:explicitmember", "xbrldi:typedmember"):
+            self.buf = None
+
+    def facts(self) -> list:
+        """Facts resolved against contexts/units, one per (concept, context, unit)."""
+        out, seen = [], set()
+        for tag, attrib, text in self.raw:
+            concept, ctx_id, unit_id = attrib.get("name"), attrib.get("contextref"), attrib.get("unitref")
+            if not concept or (concept, ctx_id, unit_id) in seen:
+                continue
+            seen.add((concept, ctx_id, unit_id))
+            ctx = self.contexts.get(ctx_id) or {"start": None, "end": None, "dims": ""}
+            fact = {
+                "concept": concept, "value": None, "text": None,
+                "unit": self.units.get(unit_id, unit_id), "decimals": attrib.get("decimals"),
+                "start": ctx["start"], "end": ctx["end"], "dims": ctx["dims"],
+            }
+            if attrib.get("xsi:nil") == "true":
+                pass
+            elif tag == "ix:nonfraction":
+                fact["value"] = parse_ix_number(text or "", attrib.get("format"), attrib.get("scale"), attrib.get("sign"))
+            elif text is not None and len(text) <= MAX_TEXT_FACT:
+                fact["text"] = text
+            else:
+                continue
+            out.append(fact)
+        return out
+
+
+class _TextTarget:
+    """lxml parser target: visible text (like get_text("\\n")) plus tables as rows."""
+
+    def __init__(self):
+        self.xbrl = _InlineXbrl()
+        self.in_xbrl = 0        # depth of open ix:/xbrli: elements (only then is data forwarded)
+        self.parts = []
+        self.skip = 0           # depth inside a SKIP_TAGS element
+        self.table_depth = 0
+        self.rows = None        # rows of the outermost open table
+        self.cell = None        # text pieces of the open cell
+        self.caption = ""
+        self.tables = []
+
+    def start(self, tag, attrib):
+        if tag.startswith(_XBRL_PREFIXES):
+            self.in_xbrl += 1
+            self.xbrl.start(tag, attrib)
+        if self.skip or tag in SKIP_TAGS:
+            self.skip += 1
+            return
+        if tag == "table":
+            self.table_depth += 1
+            if self.table_depth == 1:
+                self.rows, self.caption = [], self._caption_guess()
+            return
+        if self.table_depth:
+            # Nested tables just contribute text to the outer cell
+            if self.table_depth == 1:
+                if tag == "tr":
+                    self.rows.append([])
+                elif tag in CELL_TAGS or tag == "caption":
+                    self.cell = []
+            elif self.cell is not None:
+                self.cell.append(" ")
+            return
+        self.parts.append("\n")
+
+    def end(self, tag):
+        if tag.startswith(_XBRL_PREFIXES) and self.in_xbrl:
+            self.in_xbrl -= 1
+            self.xbrl.end(tag)
+        if self.skip:
+            self.skip -= 1
+            if not self.skip and not self.table_depth:
+                self.parts.append("\n")
+            return
+        if self.table_depth:
+            if self.table_depth > 1:
+                if tag == "table":
+                    self.table_depth -= 1
+                elif self.cell is not None:
+                    self.cell.append(" ")
+            elif tag in CELL_TAGS and self.cell is not None:
+                if not self.rows:
+                    self.rows.append([])
+                self.rows[-1].append(" ".join("".join(self.cell).split()))
+                self.cell = None
+            elif tag == "caption" and self.cell is not None:
+                self.caption = " ".join("".join(self.cell).split())
+                self.cell = None
+            elif tag == "table":
+                self.table_depth -= 1
+                if self.table_depth == 0:
+                    self._close_table()
+            return
+        self.parts.append("\n")
+
+    def data(self, data):
+        if self.in_xbrl:
+            self.xbrl.data(data)
+        if self.skip:
+            return
+        if self.table_depth:
+            if self.cell is not None:
+                self.cell.append(data)
+            return
+        self.parts.append(data)
+
+    def _caption_guess(self) -> str:
+        """Caption guess: the (up to two) short lines right before the table."""
+        lines = _clean_lines("".join(self.parts[-40:])).split("\n")[-2:]
+        return " ".join(l for l in lines if len(l) <= 200)
+
+    def _close_table(self):
+        rows = [r for r in (_merge_cells(r) for r in self.rows) if r]
+        self.rows = None
+        if not rows:
+            return
+        text = "\n".join(" | ".join(r) for r in rows)
+        self.parts.append("\n" + text + "\n")
+        self.tables.append({"caption": self.caption, "rows": rows, "text": _clean_lines(text)})
+
+    def close(self) -> str:
+        text = "".join(self.parts)
+        self.parts = []
+        return _clean_lines(text)
+
+
+class HtmlText:
+    """Incremental HTML → text. feed(bytes) as data arrives, close() → text; tables in .tables, facts in .facts."""
+
+    def __init__(self, encoding: str = "utf-8"):
+        self.target = _TextTarget()
+        self.parser = etree.HTMLParser(target=self.target, encoding=encoding)
+        self.text = None
+        self.facts = []
+
+    def feed(self, data: bytes):
+        self.parser.feed(data)
+
+    def close(self) -> str:
+        self.text = self.parser.close()
+        self.facts = self.target.xbrl.facts()
+        # Where each table's rows landed in the final text (tables are in document order)
+        pos = 0
+        for t in self.target.tables:
+            found = self.text.find(t["text"], pos)
+            t["offset"] = found
+            if found >= 0:
+                pos = found + len(t["text"])
+        return self.text
+
+    @property
+    def tables(self) -> list:
+        return self.target.tables
+
+
+def clean_html(html) -> str:
+    doc = HtmlText()
+    doc.feed(html.encode("utf-8") if isinstance(html, str) else html)
+    return doc.close()
+
+
+def charset_of(content_type: str, default: str = "utf-8") -> str:
+    m = re.search(r"charset=([\w-]+)", content_type or "")
+    return m.group(1) if m else default
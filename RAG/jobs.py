@@ -0,0 +1,209 @@
+"""
+Eddie Jobs - SQLite-backed background job queue
+-----------------------------------------------
+Ingestion (fetch + embed a whole 10-K) is far too slow to run inside a
+user's request. Instead it is submitted here and executed by a small local
+worker pool:
+
+    job_id = jobs.submit("ingest", {"company": "AAPL", ...}, key="AAPL_2023")
+    jobs.status(job_id)        # {"status": "running", "progress": 0.4, ...}
+    jobs.wait(job_id, 5)       # True if finished within 5s
+
+- The queue lives in <db_dir>/jobs.sqlite3, so it survives restarts and can
+  be shared by several processes (claims are atomic).
+- Submitting a key that is already queued/running returns the existing job.
+- Handlers get a progress(fraction, message) callback; every update is
+  written to the row and pushed to in-process listeners (on_progress()).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from .logs import get_logger
+
+log = get_logger("jobs")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind      TEXT NOT NULL,
+    key       TEXT,
+    payload   TEXT NOT NULL,
+    priority  INTEGER DEFAULT 0,
+    status    TEXT NOT NULL,           -- queued | running | done | failed
+    progress  REAL DEFAULT 0,
+    message   TEXT,
+    error     TEXT,
+    pid       INTEGER,
+    created   REAL,
+    updated   REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, priority, id);
+CREATE INDEX IF NOT EXISTS jobs_key ON jobs(key, status);
+"""
+
+ACTIVE = ("queued", "running")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class JobQueue:
+    def __init__(self, db_dir: str, handlers: dict, workers: int = 2, poll: float = 1.0):
+        os.makedirs(db_dir, exist_ok=True)
+        self.path = os.path.join(db_dir, "jobs.sqlite3")
+        self.handlers = handlers
+        self.n_workers = workers
+        self.poll = poll
+        self.listeners = []
+        self.wakeup = threading.Condition()
+        self.threads = []
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # ---- producer side -------------------------------------------------
+    def submit(self, kind: str, payload: dict, key: str | None = None, priority: int = 0) -> int:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if key:
+                    row = conn.execute(
+                        "SELECT id FROM jobs WHERE key=? AND status IN (?, ?) ORDER BY id LIMIT 1",
+                        (key, *ACTIVE),
+                    ).fetchone()
+                    if row:
+                        conn.execute("COMMIT")
+                        return row["id"]
+                cur = conn.execute(
+                    "INSERT INTO jobs (kind, key, payload, priority, status, created, updated) "
+                    "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                    (kind, key, json.dumps(payload), priority, now, now),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        self.start()
+        with self.wakeup:
+            self.wakeup.notify()
+        log.info("Queued %s job #%d (%s)", kind, cur.lastrowid, key)
+        return cur.lastrowid
+
+    def status(self, job_id: int) -> dict | None:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT id, kind, key, status, progress, message, error, created, updated FROM jobs WHERE id=?",
+                (job_id,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def active(self) -> list:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT id, kind, key, status, progress, message FROM jobs WHERE status IN (?, ?) ORDER BY id",
+                ACTIVE,
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def wait(self, job_id: int, timeout: float | None = None, interval: float = 0.2) -> bool:
+        """Poll until the job is done/failed. True if it finished within `timeout`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            st = self.status(job_id)
+            if st is None or st["status"] not in ACTIVE:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+
+    def on_progress(self, callback):
+        """callback(job_id, progress, message) for every progress event in this process."""
+        self.listeners.append(callback)
+
+    # ---- worker side ---------------------------------------------------
+    def start(self):
+        if self.threads:
+            return
+        self._requeue_orphans()
+        for i in range(self.n_workers):
+            t = threading.Thread(target=self._worker, name=f"eddie-job-{i}", daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def _requeue_orphans(self):
+        """Jobs left 'running' by a process that no longer exists go back to the queue."""
+        with closing(self._connect()) as conn:
+            for row in conn.execute("SELECT id, pid FROM jobs WHERE status='running'").fetchall():
+                if not row["pid"] or (row["pid"] != os.getpid() and not _pid_alive(row["pid"])):
+                    conn.execute("UPDATE jobs SET status='queued', pid=NULL WHERE id=?", (row["id"],))
+
+    def _claim(self) -> sqlite3.Row | None:
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status='queued' ORDER BY priority, id LIMIT 1"
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE jobs SET status='running', pid=?, updated=? WHERE id=?",
+                             (os.getpid(), time.time(), row["id"]))
+            conn.execute("COMMIT")
+        return row
+
+    def _update(self, job_id: int, **fields):
+        fields["updated"] = time.time()
+        cols = ", ".join(f"{k}=?" for k in fields)
+        with closing(self._connect()) as conn:
+            conn.execute(f"UPDATE jobs SET {cols} WHERE id=?", (*fields.values(), job_id))
+
+    def _worker(self):
+        while True:
+            row = self._claim()
+            if row is None:
+                with self.wakeup:
+                    self.wakeup.wait(timeout=self.poll)
+                continue
+            self._run(row)
+
+    def _emit(self, job_id: int, fraction: float, message: str):
+        for cb in self.listeners:
+            try:
+                cb(job_id, fraction, message)
+            except Exception as e:
+                log.warning("Progress listener failed: %s", e)
+
+    def _run(self, row):
+        job_id = row["id"]
+
+        def progress(fraction: float, message: str = ""):
+            self._update(job_id, progress=round(float(fraction), 4), message=message)
+            self._emit(job_id, fraction, message)
+
+        try:
+            self.handlers[row["kind"]](json.loads(row["payload"]), progress)
+            self._update(job_id, status="done", progress=1.0, message="done")
+            self._emit(job_id, 1.0, "done")
+            log.info("Job #%d (%s) done", job_id, row["key"])
+        except Exception as e:
+            self._update(job_id, status="failed", error=repr(e))
+            self._emit(job_id, -1.0, f"failed: {e}")
+            log.error("Job #%d (%s) failed: %s", job_id, row["key"], e)
@@ -0,0 +1,304 @@
+"""
+Eddie LLM Client - one entry point for every LLM call
+-----------------------------------------------------
+Free-tier providers are slow and flaky, so no call goes to a single
+hard-coded model any more:
+
+    from RAG.llm_client import llm
+    res = llm.complete(prompt, route="rag", max_tokens=800)
+    res["text"], res["provider"], res["ms"]
+
+1. Routes: each call site names a route ("nl_to_json", "summarize", "rag",
+   "summarizer"); a route is an ordered list of providers
+   (override with EDDIE_LLM_ROUTE_<ROUTE>="gemini-flash-lite,openrouter-120b").
+2. Deadline: the whole call, retries included, finishes within
+   EDDIE_LLM_DEADLINE seconds (default 45) or raises LLMError.
+3. Retry: a failed attempt moves to the next provider after a jittered
+   exponential backoff (EDDIE_LLM_RETRIES, default 2).
+4. Hedging: if the first provider has not answered by its own p90 latency
+   (EDDIE_HEDGE_AFTER seconds until there are enough samples), the same
+   prompt is sent to the next provider; the first answer wins.
+5. Stats: per-provider latency p50/p90 and error rate, used to order the
+   providers of a route; llm.stats() reports them.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from dotenv import load_dotenv
+
+from .logs import get_logger
+
+load_dotenv()
+log = get_logger("llm")
+
+DEADLINE = float(os.getenv("EDDIE_LLM_DEADLINE", "45"))
+RETRIES = int(os.getenv("EDDIE_LLM_RETRIES", "2"))
+HEDGE = os.getenv("EDDIE_LLM_HEDGE", "1") != "0"
+HEDGE_AFTER = float(os.getenv("EDDIE_HEDGE_AFTER", "5"))     # seconds, until p90 is known
+BACKOFF = 0.5                                                 # seconds, doubled per attempt
+MIN_SAMPLES = 5
+WINDOW = 200
+
+OPENROUTER_URL = os.getenv("LLM_URL") or "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY") or os.getenv("OPENROUTERAPIKEY")
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")       # stub server in benchmarks/tests
+
+
+class LLMError(Exception):
+    pass
+
+
+if not GEMINI_API_KEY and not OPENROUTER_API_KEY:
+    log.warning("Neither GEMINI_API_KEY nor OPENROUTER_API_KEY is set: LLM calls will fail")
+
+
+# ------------------------------------------------------
+# Providers
+# ------------------------------------------------------
+
+class OpenRouterProvider:
+    def __init__(self, model: str, url: str = OPENROUTER_URL, api_key: str | None = OPENROUTER_API_KEY):
+        self.model, self.url, self.api_key = model, url, api_key
+        self.session = requests.Session()
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key and self.url)
+
+    def complete(self, prompt: str, max_tokens: int, temperature: float, timeout: float) -> dict:
+        res = self.session.post(
+            self.url,
+            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            json={
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            },
+            timeout=(min(5.0, timeout), timeout),
+        )
+        data = res.json()
+        if "error" in data:
+            raise LLMError(f"OpenRouter error: {data['error']}")
+        if "choices" not in data:
+            raise LLMError(f"Unexpected OpenRouter response: {data}")
+        return {
+            "text": data["choices"][0]["message"]["content"],
+            "completion_tokens": (data.get("usage") or {}).get("completion_tokens"),
+        }
+
+
+class GeminiProvider:
+    _configured = False
+    _configure_lock = threading.Lock()
+
+    def __init__(self, model: str, api_key: str | None = GEMINI_API_KEY):
+        self.model_name, self.api_key = model, api_key
+        self.model = None
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def _model(self):
+        if self.model is None:
+            import google.generativeai as genai
+            with GeminiProvider._configure_lock:
+                if not GeminiProvider._configured:
+                    if GEMINI_API_ENDPOINT:
+                        genai.configure(api_key=self.api_key, transport="rest",
+                                        client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+                    else:
+                        genai.configure(api_key=self.api_key)
+                    GeminiProvider._configured = True
+            self.model = genai.GenerativeModel(self.model_name)
+        return self.model
+
+    def complete(self, prompt: str, max_tokens: int, temperature: float, timeout: float) -> dict:
+        response = self._model().generate_content(
+            prompt,
+            generation_config={"max_output_tokens": max_tokens, "temperature": temperature},
+            request_options={"timeout": timeout},
+        )
+        return {"text": response.text, "completion_tokens": None}
+
+
+PROVIDERS = {
+    "openrouter-120b": OpenRouterProvider("openai/gpt-oss-120b:free"),
+    "openrouter-20b": OpenRouterProvider("openai/gpt-oss-20b:free"),
+    "gemini-flash-lite": GeminiProvider("gemini-2.5-flash-lite"),
+}
+
+ROUTES = {
+    "nl_to_json": ["openrouter-120b", "gemini-flash-lite"],
+    "summarize": ["openrouter-120b", "gemini-flash-lite"],
+    "rag": ["gemini-flash-lite", "openrouter-120b"],
+    "summarizer": ["openrouter-20b", "gemini-flash-lite", "openrouter-120b"],
+}
+
+
+def _route_from_env(route: str, default: list) -> list:
+    value = os.getenv(f"EDDIE_LLM_ROUTE_{route.upper()}")
+    return [p.strip() for p in value.split(",") if p.strip()] if value else default
+
+
+# ------------------------------------------------------
+# Client
+# ------------------------------------------------------
+
+class LLMClient:
+    def __init__(self, providers: dict, routes: dict, deadline: float = DEADLINE,
+                 retries: int = RETRIES, hedge: bool = HEDGE, workers: int = 8):
+        self.providers = providers
+        self.routes = {name: _route_from_env(name, names) for name, names in routes.items()}
+        self.deadline, self.retries, self.hedge = deadline, retries, hedge
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="eddie-llm")
+        self.lock = threading.Lock()
+        self.latencies = {name: deque(maxlen=WINDOW) for name in providers}
+        self.outcomes = {name: deque(maxlen=WINDOW) for name in providers}    # True = ok
+        self.counts = {name: {"calls": 0, "errors": 0, "hedges": 0, "wins": 0} for name in providers}
+
+    # ---- stats ---------------------------------------------------------
+    def _record(self, name: str, seconds: float | None, ok: bool):
+        with self.lock:
+            self.counts[name]["calls"] += 1
+            self.outcomes[name].append(ok)
+            if ok:
+                self.latencies[name].append(seconds)
+            else:
+                self.counts[name]["errors"] += 1
+
+    def percentile(self, name: str, p: float) -> float | None:
+        with self.lock:
+            samples = sorted(self.latencies[name])
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(p / 100 * len(samples)))]
+
+    def error_rate(self, name: str) -> float:
+        with self.lock:
+            outcomes = list(self.outcomes[name])
+        return outcomes.count(False) / len(outcomes) if outcomes else 0.0
+
+    def hedge_delay(self, name: str) -> float:
+        p90 = self.percentile(name, 90)
+        return HEDGE_AFTER if p90 is None else p90
+
+    def rank(self, route: str) -> list:
+        """
+        Providers of a route, best first: mostly-failing ones last, then by
+        p50 latency weighted by the configured preference order.
+        """
+        names = [n for n in self.routes.get(route, []) if n in self.providers and self.providers[n].available]
+
+        def score(i_name):
+            i, name = i_name
+            p50 = self.percentile(name, 50)
+            return (self.error_rate(name) > 0.5, (HEDGE_AFTER if p50 is None else p50) * (1 + 0.5 * i))
+
+        return [name for _, name in sorted(enumerate(names), key=score)]
+
+    def stats(self) -> dict:
+        out = {}
+        for name in self.providers:
+            p50, p90 = self.percentile(name, 50), self.percentile(name, 90)
+            out[name] = {
+                **self.counts[name],
+                "error_rate": round(self.error_rate(name), 3),
+                "p50_ms": None if p50 is None else round(p50 * 1000, 1),
+                "p90_ms": None if p90 is None else round(p90 * 1000, 1),
+            }
+        return out
+
+    # ---- calls ---------------------------------------------------------
+    def _call(self, name: str, prompt: str, max_tokens: int, temperature: float, timeout: float) -> dict:
+        t0 = time.monotonic()
+        try:
+            result = self.providers[name].complete(prompt, max_tokens, temperature, timeout)
+        except Exception:
+            self._record(name, None, ok=False)
+            raise
+        elapsed = time.monotonic() - t0
+        self._record(name, elapsed, ok=True)
+        return {**result, "provider": name, "ms": round(elapsed * 1000, 1)}
+
+    def complete(self, prompt: str, route: str = "rag", max_tokens: int = 1024,
+                 temperature: float = 0.3, deadline: float | None = None, hedge: bool | None = None) -> dict:
+        """
+        → {"text", "provider", "ms", "completion_tokens", "attempts", "hedged"}.
+        Raises LLMError when every attempt failed or the deadline passed.
+        """
+        names = self.rank(route)
+        if not names:
+            if not any(p.available for p in self.providers.values()):
+                raise LLMError("❌ No LLM API key configured: set GEMINI_API_KEY or OPENROUTER_API_KEY in .env")
+            raise LLMError(f"❌ No LLM provider configured for route '{route}'")
+        hedge = self.hedge if hedge is None else hedge
+        end = time.monotonic() + (deadline or self.deadline)
+        pending, errors = {}, []
+        state = {"attempts": 0, "next": 0, "hedged": False, "primary_started": 0.0}
+
+        def launch(is_hedge: bool = False):
+            name = names[state["next"] % len(names)]
+            state["next"] += 1
+            state["attempts"] += 1
+            if is_hedge:
+                state["hedged"] = True
+                with self.lock:
+                    self.counts[name]["hedges"] += 1
+            else:
+                state["primary_started"] = time.monotonic()
+            timeout = max(0.1, end - time.monotonic())
+            pending[self.pool.submit(self._call, name, prompt, max_tokens, temperature, timeout)] = name
+
+        launch()
+        while pending:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            can_hedge = hedge and not state["hedged"] and len(names) > 1 and len(pending) == 1
+            wait_for = remaining
+            if can_hedge:
+                primary = names[(state["next"] - 1) % len(names)]
+                due = state["primary_started"] + self.hedge_delay(primary)
+                wait_for = max(0.0, min(remaining, due - time.monotonic()))
+
+            done, _ = wait(list(pending), timeout=wait_for, return_when=FIRST_COMPLETED)
+            if not done:
+                if can_hedge:
+                    log.info("LLM %s slower than its p90, hedging to %s",
+                             list(pending.values())[0], names[state["next"] % len(names)])
+                    launch(is_hedge=True)
+                continue
+
+            for fut in done:
+                name = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    errors.append(f"{name}: {e}")
+                    log.warning("LLM %s failed: %s", name, e)
+                    continue
+                with self.lock:
+                    self.counts[name]["wins"] += 1
+                return {**result, "attempts": state["attempts"], "hedged": state["hedged"]}
+
+            if not pending and state["attempts"] <= self.retries:
+                backoff = BACKOFF * 2 ** (state["attempts"] - 1) * random.uniform(0.5, 1.5)
+                time.sleep(max(0.0, min(backoff, end - time.monotonic())))
+                if time.monotonic() < end:
+                    launch()
+
+        raise LLMError(f"❌ LLM route '{route}' failed after {state['attempts']} attempt(s): "
+                       + ("; ".join(errors) or "deadline exceeded"))
+
+
+# Process-wide default client
+llm = LLMClient(PROVIDERS, ROUTES)
@@ -0,0 +1,97 @@
+"""
+Eddie Logging - leveled, lazy logging
+-------------------------------------
+Replaces the debug print() calls of the pipeline.
+
+- EDDIE_LOG_LEVEL=DEBUG|INFO|WARNING|ERROR   (default: INFO)
+- EDDIE_LOG_PAYLOAD_CHARS=500                 (max chars logged per payload)
+
+Always log with %-style args, never f-strings, and wrap big objects in
+brief(): nothing is serialized unless the record is actually emitted, and
+even then serialization stops once the size limit is reached.
+
+    log = get_logger("pipeline")
+    log.debug("Dispatch result: %s", brief(dispatch_result))
+"""
+
+import logging
+import os
+
+LOG_LEVEL = os.getenv("EDDIE_LOG_LEVEL", "INFO").upper()
+PAYLOAD_CHARS = int(os.getenv("EDDIE_LOG_PAYLOAD_CHARS", "500"))
+
+_root = logging.getLogger("eddie")
+if not _root.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S"))
+    _root.addHandler(_handler)
+    _root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    _root.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"eddie.{name}")
+
+
+class _Budget(Exception):
+    """Raised internally once the output limit is hit."""
+
+
+def _walk(obj, out: list, budget: list):
+    def emit(s: str):
+        out.append(s)
+        budget[0] -= len(s)
+        if budget[0] <= 0:
+            raise _Budget
+
+    if isinstance(obj, dict):
+        emit("{")
+        for i, (k, v) in enumerate(obj.items()):
+            emit(f"{', ' if i else ''}{k!r}: ")
+            _walk(v, out, budget)
+        emit("}")
+    elif isinstance(obj, (list, tuple)):
+        emit("[")
+        for i, v in enumerate(obj):
+            if i:
+                emit(", ")
+            _walk(v, out, budget)
+        emit("]")
+    elif isinstance(obj, (str, bytes)):
+        emit(repr(obj[: budget[0] + 1]))    # never repr() a megabyte string
+    else:
+        emit(repr(obj))
+
+
+class brief:
+    """
+    Lazy, size-bounded rendering of a (possibly huge) object for log messages.
+    Only __str__ does any work, and it stops walking the object at `limit` chars.
+    """
+
+    __slots__ = ("obj", "limit")
+
+    def __init__(self, obj, limit: int = PAYLOAD_CHARS):
+        self.obj = obj
+        self.limit = limit
+
+    def __str__(self) -> str:
+        out, budget = [], [self.limit]
+        try:
+            _walk(self.obj, out, budget)
+        except _Budget:
+            text = "".join(out)[: self.limit]
+            return f"{text}… [{_size_hint(self.obj)}]"
+        return "".join(out)
+
+    __repr__ = __str__
+
+
+def _size_hint(obj) -> str:
+    if isinstance(obj, dict):
+        return f"dict, {len(obj)} keys: {', '.join(map(str, list(obj)[:8]))}"
+    if isinstance(obj, (list, tuple)):
+        return f"{type(obj).__name__}, {len(obj)} items"
+    if isinstance(obj, (str, bytes)):
+        return f"{len(obj)} chars"
+    return type(obj).__name__
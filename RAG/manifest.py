@@ -0,0 +1,105 @@
+"""
+Eddie Ingest Manifest - what is already in ./chroma_db_local
+------------------------------------------------------------
+One SQLite file next to the Chroma DB, shared by every thread and process
+using that DB. A filing is identified by (company, year, url); it only
+counts as indexed once its status is "done", so a crashed or in-progress
+ingestion is never mistaken for a complete one.
+
+Filings are indexed section by section (10-K Items: 1A, 7, 8, ...), so the
+`sections` table records which Items of a filing are already queryable
+while the rest is still being embedded.
+"""
+
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS filings (
+    company   TEXT NOT NULL,
+    year      TEXT NOT NULL,
+    url       TEXT NOT NULL,
+    status    TEXT NOT NULL,          -- partial | running | done | failed
+    chunks    INTEGER DEFAULT 0,
+    started   REAL,
+    finished  REAL,
+    PRIMARY KEY (company, year)
+);
+CREATE TABLE IF NOT EXISTS sections (
+    company   TEXT NOT NULL,
+    year      TEXT NOT NULL,
+    url       TEXT NOT NULL,
+    item      TEXT NOT NULL,          -- "1A", "7", ... ("all" if no Items were found)
+    chunks    INTEGER DEFAULT 0,
+    finished  REAL,
+    PRIMARY KEY (company, year, item)
+);
+"""
+
+
+class Manifest:
+    def __init__(self, db_dir: str):
+        os.makedirs(db_dir, exist_ok=True)
+        self.path = os.path.join(db_dir, "ingest_manifest.sqlite3")
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def get(self, company: str, year) -> dict | None:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM filings WHERE company=? AND year=?",
+                               (company, str(year))).fetchone()
+        return dict(row) if row else None
+
+    def is_done(self, company: str, year, url: str) -> bool:
+        row = self.get(company, year)
+        return bool(row) and row["status"] == "done" and row["url"] == url
+
+    def mark(self, company: str, year, url: str, status: str, chunks: int = 0):
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                """
+                INSERT INTO filings (company, year, url, status, chunks, started, finished)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(company, year) DO UPDATE SET
+                    url=excluded.url, status=excluded.status, chunks=excluded.chunks,
+                    started=CASE WHEN excluded.status='running' THEN excluded.started ELSE filings.started END,
+                    finished=excluded.finished
+                """,
+                (company, str(year), url, status, chunks, now, None if status == "running" else now),
+            )
+
+    # ---- per-section completeness ---------------------------------------
+    def sections_done(self, company: str, year, url: str) -> set:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT item FROM sections WHERE company=? AND year=? AND url=?",
+                                (company, str(year), url)).fetchall()
+        return {r["item"] for r in rows}
+
+    def mark_section(self, company: str, year, url: str, item: str, chunks: int):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sections (company, year, url, item, chunks, finished) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (company, str(year), url, item, chunks, time.time()),
+            )
+
+    def section_chunks(self, company: str, year, url: str) -> int:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT COALESCE(SUM(chunks), 0) AS n FROM sections "
+                               "WHERE company=? AND year=? AND url=?", (company, str(year), url)).fetchone()
+        return row["n"]
+
+    def reset(self, company: str, year):
+        """Forget a filing and its sections (e.g. the {company, year} now points at a new URL)."""
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM sections WHERE company=? AND year=?", (company, str(year)))
+            conn.execute("DELETE FROM filings WHERE company=? AND year=?", (company, str(year)))
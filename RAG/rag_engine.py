@@ -7,33 +7,36 @@ Eddie RAG Engine - Free Tier Optimized
 
 import os
 import re
-import time
-import requests
-from bs4 import BeautifulSoup
+import threading
+from contextlib import contextmanager
 import chromadb
 from chromadb.utils import embedding_functions
-import google.generativeai as genai
 from dotenv import load_dotenv
-from rich.console import Console
+from .tracing import span, approx_tokens
+from .logs import get_logger
+from .sec_scheduler import sec_get, use_priority, BACKFILL
+from .eddie_lock import FileLock
+from .manifest import Manifest
+from .jobs import JobQueue
+from .llm_client import llm, LLMError
+from .html_text import HtmlText, charset_of, clean_html
+from .tables import TableStore, format_row
+from .facts import FactStore, format_facts
+from .vectors import VectorStore
+from .diffs import DiffStore, format_delta
 
 # Load environment variables
 load_dotenv()
-console = Console()
+log = get_logger("rag")
 
 # ------------------------------------------------------
 # CONFIG
 # ------------------------------------------------------
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    console.print("[bold red]CRITICAL: GEMINI_API_KEY not found in .env[/bold red]")
-    exit()
+# Answers go through RAG/llm_client.py: Gemini first, OpenRouter as fallback/hedge.
+# Missing API keys surface there as an LLMError per call, not at import.
 
-# We use 1.5 Flash because it is the most stable free-tier model currently
-genai.configure(api_key=GEMINI_API_KEY)
-MODEL = genai.GenerativeModel("gemini-2.5-flash-lite")
-
-CHROMA_DB_DIR = "./chroma_db_local"
+CHROMA_DB_DIR = os.getenv("CHROMA_DB_DIR", "./chroma_db_local")
 
 # ------------------------------------------------------
 # 1. SETUP DATABASE (LOCAL EMBEDDINGS)
@@ -53,96 +56,516 @@ collection = chroma_client.get_or_create_collection(
     embedding_function=local_ef  # <--- WE USE LOCAL FUNCTION NOW
 )
 
+# Which filings are fully indexed (shared by every process using CHROMA_DB_DIR)
+manifest = Manifest(CHROMA_DB_DIR)
+
+# Financial tables parsed from ingested filings (row-level lookups)
+tables = TableStore(CHROMA_DB_DIR)
+
+# Inline-XBRL facts tagged in ingested filings (exact numbers, no companyfacts download)
+facts = FactStore(CHROMA_DB_DIR)
+
+# Per-section embedding matrices: exact search for filing-scoped queries
+vectors = VectorStore(CHROMA_DB_DIR)
+EXACT_SEARCH = os.getenv("EDDIE_EXACT_SEARCH", "1") != "0"
+
+# Paragraph fingerprints per Item + precomputed year-over-year deltas
+diffs = DiffStore(CHROMA_DB_DIR)
+MAX_DELTA_CHARS = int(os.getenv("EDDIE_MAX_DELTA_CHARS", "24000"))
+
 # ------------------------------------------------------
 # 2. FETCH & CLEAN
 # ------------------------------------------------------
 
-def fetch_html(url: str) -> str:
-    try:
-        headers = {
-            "User-Agent": "EddieTest/2.0 (student_project@example.com)",
-            "Accept-Encoding": "gzip, deflate",
-            "Host": "www.sec.gov",
-        }
-        r = requests.get(url, headers=headers, timeout=20)
-        r.raise_for_status()
-        time.sleep(0.2) 
-        return r.text
-    except Exception as e:
-        console.print(f"[red]Fetch Error:[/red] {e}")
-        return ""
-
-def clean_html(html: str) -> str:
-    soup = BeautifulSoup(html, "lxml")
-    for tag in soup(["script", "style", "noscript", "xbrl", "header", "footer"]):
-        tag.decompose()
-    text = soup.get_text(separator="\n")
-    return "\n".join([t.strip() for t in text.splitlines() if t.strip()])
+# Filings are streamed: gzip is decoded chunk by chunk and each chunk goes
+# straight into the HTML → text parser, so download and parse overlap and
+# memory follows the extracted text, not the raw (often 10s of MB) HTML.
+MAX_FILING_BYTES = int(float(os.getenv("EDDIE_MAX_FILING_MB", "64")) * 1024 * 1024)
+READ_TIMEOUT = float(os.getenv("EDDIE_READ_TIMEOUT", "20"))     # seconds per socket read
+STREAM_CHUNK = 64 * 1024
+
+
+class FilingTooLarge(Exception):
+    pass
+
+
+def fetch_text(url: str, priority: int | None = None) -> tuple:
+    """
+    Stream a filing → (cleaned text, tables, inline-XBRL facts), all from one parse.
+    ("", [], []) on error or if the filing is over EDDIE_MAX_FILING_MB.
+    """
+    headers = {
+        "User-Agent": "EddieTest/2.0 (student_project@example.com)",
+        "Accept-Encoding": "gzip, deflate",
+        "Host": "www.sec.gov",
+    }
+    with span("fetch", url=url, streamed=True) as s:
+        try:
+            # Global SEC rate limit; the read timeout applies to every chunk, not the whole body
+            r = sec_get(url, priority=priority, headers=headers, timeout=(10, READ_TIMEOUT), stream=True)
+            with r:
+                r.raise_for_status()
+                if int(r.headers.get("Content-Length") or 0) > MAX_FILING_BYTES:
+                    raise FilingTooLarge(f"{r.headers['Content-Length']} bytes > EDDIE_MAX_FILING_MB")
+
+                doc = HtmlText(charset_of(r.headers.get("Content-Type")))
+                size = 0
+                for chunk in r.iter_content(STREAM_CHUNK):     # gzip decoded incrementally
+                    size += len(chunk)
+                    if size > MAX_FILING_BYTES:
+                        raise FilingTooLarge(f"more than {MAX_FILING_BYTES} bytes after decompression")
+                    doc.feed(chunk)
+                text = doc.close()
+                s["bytes"] = size
+                s["bytes_wire"] = r.raw.tell()
+                s["text_bytes"] = len(text)
+                s["tables"] = len(doc.tables)
+                s["facts"] = len(doc.facts)
+                return text, doc.tables, doc.facts
+        except Exception as e:
+            s["error"] = repr(e)
+            log.error("Fetch Error: %s", e)
+            return "", [], []
 
 # ------------------------------------------------------
 # 3. CHUNK & INGEST (NO API LIMITS!)
 # ------------------------------------------------------
 
-def chunk_text_simple(text: str, chunk_size=1000, overlap=200):
-    """Simple character-based chunking to avoid token API limits."""
-    chunks = []
+def chunk_spans(text: str, chunk_size=1000, overlap=200) -> list:
+    """
+    (start, end) of each chunk. A chunk ends at the last line break in its
+    final fifth when there is one, so table rows ("Label | 2024 | 2023") stay whole.
+    """
+    spans = []
     start = 0
     while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start += (chunk_size - overlap)
-    return chunks
-
-def ingest_filing(company: str, year: str, url: str):
-    console.print(f"[yellow]1. Fetching {company} 10-K...[/yellow]")
-    html = fetch_html(url)
-    if not html: return
-
-    console.print("[yellow]2. Cleaning text...[/yellow]")
-    text = clean_html(html)
-
-    # Simple split by "Item" to get context headers (Rough heuristic)
-    # We treat the whole text as a stream for simplicity in this robust version
-    chunks = chunk_text_simple(text)
-    
-    console.print(f"[yellow]3. Embedding {len(chunks)} chunks locally... (This uses CPU, not API)[/yellow]")
-    
-    # Clean old data
-    collection.delete(where={"$and": [{"company": company}, {"year": year}]})
-
-    # Batch process to be safe
-    batch_size = 100
-    for i in range(0, len(chunks), batch_size):
-        batch = chunks[i : i + batch_size]
-        ids = [f"{company}_{year}_{i+j}" for j in range(len(batch))]
-        metas = [{"company": company, "year": year} for _ in batch]
-        
-        # .add() automatically calls the local embedding model
-        collection.add(
-            ids=ids,
-            documents=batch,
-            metadatas=metas
-        )
-        print(f".", end="", flush=True)
-
-    console.print(f"\n[green]✔ Successfully indexed {company}.[/green]")
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            cut = text.rfind("\n", end - chunk_size // 5, end)
+            if cut > start:
+                end = cut + 1
+        spans.append((start, end))
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return spans
+
+
+def chunk_text_simple(text: str, chunk_size=1000, overlap=200):
+    """Simple character-based chunking to avoid token API limits."""
+    return [text[a:b] for a, b in chunk_spans(text, chunk_size, overlap)]
+
+# ------------------------------------------------------
+# 3a. SECTIONS (10-K Items)
+# ------------------------------------------------------
+
+# "Item 1A. Risk Factors" is a heading; "see Item 1A of this Form 10-K" is not
+ITEM_HEADING = re.compile(r"\b(?i:item)\s+(\d{1,2}[A-Ca-c]?)\s*[.:\u2014-]?\s+(?=[A-Z\[\u201c\"])")
+
+# Query words → the Items that answer them. Specific phrases come first and are
+# struck from the query once matched ("market risk" must not also hit 1A).
+QUERY_ITEMS = [
+    ("7A", ["market risk", "interest rate risk", "foreign currency risk"]),
+    ("1A", ["risk"]),
+    ("7", ["md&a", "management's discussion", "management discussion", "results of operations", "liquidity"]),
+    ("8", ["financial statements", "balance sheet", "cash flow statement", "notes to"]),
+    ("3", ["legal proceedings", "litigation", "lawsuit"]),
+    ("1C", ["cybersecurity"]),
+    ("1", ["business overview", "products", "competition", "employees", "human capital"]),
+    ("2", ["properties"]),
+    ("5", ["dividend", "repurchase", "buyback"]),
+]
+
+
+def section_spans(text: str) -> list:
+    """
+    [(item, start, end), ...] of a cleaned 10-K in document order.
+    The table of contents repeats every heading, so for each Item we keep
+    the occurrence followed by the longest section. Text before the first
+    Item is "cover"; a document without Items is one section, "all".
+    """
+    marks = [(m.start(), m.group(1).upper()) for m in ITEM_HEADING.finditer(text)]
+    if not marks:
+        return [("all", 0, len(text))]
+
+    best = {}
+    for i, (pos, item) in enumerate(marks):
+        length = (marks[i + 1][0] if i + 1 < len(marks) else len(text)) - pos
+        if item not in best or length > best[item][1]:
+            best[item] = (pos, length)
+
+    starts = sorted((pos, item) for item, (pos, _) in best.items())
+    spans = [("cover", 0, starts[0][0])] if starts[0][0] > 0 else []
+    for i, (pos, item) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(text)
+        spans.append((item, pos, end))
+    return [(item, a, b) for item, a, b in spans if text[a:b].strip()]
+
+
+def split_items(text: str) -> list:
+    """Split a cleaned 10-K into [(item, text), ...] in document order."""
+    return [(item, text[a:b]) for item, a, b in section_spans(text)]
+
+
+def items_for_query(query: str) -> list:
+    """Items a question is about, e.g. "What are the risk factors?" → ["1A"]."""
+    q = query.lower()
+    items = [m.upper() for m in re.findall(r"\bitem\s+(\d{1,2}[a-c]?)\b", q)]
+    for item, words in QUERY_ITEMS:
+        hits = [w for w in words if w in q]
+        if hits and item not in items:
+            items.append(item)
+        for w in hits:
+            q = q.replace(w, " ")
+    return items
+
+
+# ------------------------------------------------------
+# 3b. INGEST (single-flight per filing section)
+# ------------------------------------------------------
+
+_key_locks = {}
+_key_locks_guard = threading.Lock()
+
+
+def _key_lock(key: str) -> threading.Lock:
+    with _key_locks_guard:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def _lock_path(key: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+    return os.path.join(CHROMA_DB_DIR, "locks", f"{safe}.lock")
+
+
+@contextmanager
+def _single_flight(key: str):
+    """Thread lock + cross-process file lock: one holder per key across the whole machine."""
+    with _key_lock(key), FileLock(_lock_path(key)):
+        yield
+
+
+def _filing_sections(company: str, year: str, url: str) -> list:
+    """
+    Fetch + clean + split one filing, once: the cleaned text is cached next to
+    the DB so the background pass does not download the 10-K a second time.
+    If {company, year} used to point at another URL, its old chunks are dropped.
+    """
+    key = f"{company}_{year}"
+    cache = os.path.join(CHROMA_DB_DIR, "text", re.sub(r"[^A-Za-z0-9_.-]", "_", key) + ".txt")
+    with _single_flight(f"fetch_{key}"):
+        row = manifest.get(company, year)
+        if row and row["url"] != url:
+            log.info("%s %s now points at a new filing; dropping old chunks.", company, year)
+            collection.delete(where={"$and": [{"company": company}, {"year": year}]})
+            manifest.reset(company, year)
+            tables.delete_filing(company, year)
+            facts.delete_filing(company, year)
+            vectors.delete_filing(company, year)
+            diffs.delete_filing(company, year)
+            row = None
+            if os.path.exists(cache):
+                os.remove(cache)
+        if row is None:
+            manifest.mark(company, year, url, "partial")
+
+        text = None
+        if os.path.exists(cache):
+            with open(cache, "r", encoding="utf-8") as f:
+                text = f.read()
+        if not text:
+            log.info("1. Fetching + cleaning %s 10-K (streamed)...", company)
+            text, parsed, tagged = fetch_text(url)
+            if not text:
+                return []
+            _store_tables(company, year, url, text, parsed)
+            n = facts.replace_filing(company, year, url, tagged)
+            log.info("Stored %d inline-XBRL facts for %s %s", n, company, year)
+            os.makedirs(os.path.dirname(cache), exist_ok=True)
+            with open(cache, "w", encoding="utf-8") as f:
+                f.write(text)
+
+    with span("chunk") as s:
+        sections = split_items(text)
+        s["sections"] = len(sections)
+
+    if not diffs.has_filing(company, year, url):
+        with _single_flight(f"diff_{key}"), span("diff") as s:
+            if not diffs.has_filing(company, year, url):
+                s["paragraphs"] = diffs.replace_filing(company, year, url, sections)
+                s["pairs"] = len(diffs.link(company, year))
+    return sections
+
+
+def prefetch_filing(company: str, year: str, url: str) -> bool:
+    """Download + parse a filing (text cache, table and fact stores) without embedding anything."""
+    return bool(_filing_sections(company, year, url))
+
+
+def _store_tables(company: str, year: str, url: str, text: str, parsed: list):
+    """Tag each parsed table with its Item and the chunk ids it will be embedded in."""
+    spans = section_spans(text)
+    for t in parsed:
+        t["item"], t["chunk_ids"] = None, []
+        for item, a, b in spans:
+            if a <= t["offset"] < b:
+                start, end = t["offset"] - a, t["offset"] - a + len(t["text"])
+                t["item"] = item
+                t["chunk_ids"] = [f"{company}_{year}_{item}_{j}"
+                                  for j, (ca, cb) in enumerate(chunk_spans(text[a:b]))
+                                  if ca < end and cb > start]
+                break
+    n = tables.replace_filing(company, year, url, [t for t in parsed if t["offset"] >= 0])
+    log.info("Stored %d tables (%d rows) for %s %s", len(parsed), n, company, year)
+
+
+def _ingest_section(company: str, year: str, url: str, item: str, body: str) -> int:
+    """Chunk + embed one section unless another caller already did. Returns chunks added."""
+    with _single_flight(f"{company}_{year}_{item}"):
+        if item in manifest.sections_done(company, year, url):
+            return 0
+        chunks = chunk_text_simple(body)
+        log.info("3. Embedding %s Item %s: %d chunks locally...", company, item, len(chunks))
+        with span("embed", section=item, chunks=len(chunks), bytes=len(body),
+                  tokens=approx_tokens(body), cache="miss"):
+            # Clean old data for this section (e.g. a crashed earlier run)
+            collection.delete(where={"$and": [{"company": company}, {"year": year}, {"item": item}]})
+
+            # Batch process to be safe
+            batch_size = 100
+            all_ids, all_embeddings = [], []
+            for i in range(0, len(chunks), batch_size):
+                batch = chunks[i : i + batch_size]
+                ids = [f"{company}_{year}_{item}_{i+j}" for j in range(len(batch))]
+                metas = [{"company": company, "year": year, "item": item} for _ in batch]
+
+                # Embed once with the local model: the same vectors go to Chroma and the .npy file
+                embeddings = local_ef(batch)
+                collection.add(
+                    ids=ids,
+                    documents=batch,
+                    metadatas=metas,
+                    embeddings=embeddings
+                )
+                all_ids += ids
+                all_embeddings += list(embeddings)
+                log.debug("Embedded %d/%d chunks of Item %s", i + len(batch), len(chunks), item)
+            if all_ids:
+                vectors.write_section(company, year, item, all_ids, all_embeddings)
+        manifest.mark_section(company, year, url, item, len(chunks))
+        return len(chunks)
+
+
+def ingest_sections(company: str, year: str, url: str, items: list) -> list:
+    """
+    Index only the requested Items of a filing (what the current question
+    needs), so they are queryable in time proportional to their size.
+    Returns the requested Items that are now indexed.
+    """
+    wanted = [i.upper() for i in items]
+    done = manifest.sections_done(company, year, url)
+    if manifest.is_done(company, year, url) or all(i in done for i in wanted):
+        with span("embed", cache="hit", sections=",".join(wanted)):
+            return [i for i in wanted if i in done] or wanted
+
+    for item, body in _filing_sections(company, year, url):
+        if item in wanted:
+            _ingest_section(company, year, url, item, body)
+    done = manifest.sections_done(company, year, url)
+    return [i for i in wanted if i in done]
+
+
+def ingest_filing(company: str, year: str, url: str, progress=None):
+    """
+    Index every section of a filing (sections indexed earlier are skipped).
+    Safe to call concurrently from threads or processes sharing CHROMA_DB_DIR:
+    each section is embedded exactly once.
+    """
+    if manifest.is_done(company, year, url):
+        with span("embed", cache="hit"):
+            log.info("✔ %s %s already indexed.", company, year)
+        return
+
+    progress = progress or (lambda fraction, message="": None)
+    try:
+        sections = _filing_sections(company, year, url)
+        if not sections:
+            manifest.mark(company, year, url, "failed")
+            return
+        manifest.mark(company, year, url, "running")
+        progress(0.15, f"embedding {len(sections)} sections")
+        for n, (item, body) in enumerate(sections, 1):
+            _ingest_section(company, year, url, item, body)
+            progress(0.15 + 0.85 * n / len(sections), f"indexed Item {item} ({n}/{len(sections)})")
+    except Exception:
+        manifest.mark(company, year, url, "failed")
+        raise
+
+    manifest.mark(company, year, url, "done", manifest.section_chunks(company, year, url))
+    log.info("✔ Successfully indexed %s.", company)
+
+
+# ------------------------------------------------------
+# 3c. BACKGROUND INGESTION (queries never block on embedding)
+# ------------------------------------------------------
+
+def _ingest_job(payload: dict, progress):
+    # Background work yields the SEC rate limit to interactive requests
+    with use_priority(BACKFILL):
+        ingest_filing(payload["company"], payload["year"], payload["url"], progress=progress)
+    if not manifest.is_done(payload["company"], payload["year"], payload["url"]):
+        raise RuntimeError(f"Nothing indexed for {payload['url']}")
+
+
+jobs = JobQueue(CHROMA_DB_DIR, handlers={"ingest": _ingest_job},
+                workers=int(os.getenv("EDDIE_INGEST_WORKERS", "2")))
+
+
+def is_indexed(company: str, year, url: str) -> bool:
+    return manifest.is_done(company, year, url)
+
+
+def ingest_filing_async(company: str, year, url: str) -> int:
+    """Queue ingestion in the background worker pool. Returns the job id (deduplicated per filing)."""
+    return jobs.submit("ingest", {"company": company, "year": year, "url": url},
+                       key=f"ingest:{company}_{year}")
 
 # ------------------------------------------------------
 # 4. SEARCH & ANSWER
 # ------------------------------------------------------
 
-def rag_pipeline(query: str, company: str, year: str):
+def fact_answer(query: str, company: str, year: str) -> str | None:
+    """
+    Answer a numeric question from the filing's own inline-XBRL tags when the
+    metric maps to a tagged concept. None → try the table store / RAG.
+    """
+    with span("retrieve", source="facts") as s:
+        hit = facts.lookup(company, year, query)
+        s["facts"] = len(hit["facts"]) if hit else 0
+    if not hit or not hit["facts"]:
+        return None
+    with span("generate", provider="facts", facts=len(hit["facts"])):
+        return format_facts(hit)
+
+
+def table_answer(query: str, company: str, year: str, items: list | None = None) -> str | None:
+    """
+    Answer a numeric question straight from the table store when a row label
+    matches the metric asked for. None → fall back to RAG.
+    """
+    with span("retrieve", source="tables") as s:
+        hits = tables.lookup(company, year, query, items=items)
+        s["rows"] = len(hits)
+    if not hits:
+        return None
+    # Same metric can appear in several tables (statements, segment notes); show those rows only
+    hits = [h for h in hits if h["label"].lower() == hits[0]["label"].lower()]
+    with span("generate", provider="table", rows=len(hits)):
+        return "\n\n".join(format_row(h) for h in hits)
+
+
+def change_answer(query: str, company: str, year, items: list | None = None) -> str | None:
+    """
+    Answer "what changed vs last year" from the precomputed delta of this
+    filing against the previous year's (added / removed / reworded
+    paragraphs only). None when that delta has not been built.
+    """
+    with span("retrieve", source="diff") as s:
+        delta = diffs.delta(company, year, items=items)
+        if delta is None or not delta["items"]:
+            return None
+        context_text = format_delta(delta, MAX_DELTA_CHARS)
+        s["items"] = ",".join(delta["items"])
+        s["bytes"] = len(context_text)
+    if not any(d["added"] or d["removed"] or d["modified"] for d in delta["items"].values()):
+        return (f"No changes found in Item(s) {', '.join(delta['items'])} of {company}'s "
+                f"{delta['year']} 10-K compared with {delta['base_year']}.")
+
+    prompt = f"""
+You are a financial analyst.
+Below are ONLY the paragraphs that changed in {company}'s {delta['year']} 10-K
+compared with its {delta['base_year']} 10-K: [ADDED], [REMOVED], and [MODIFIED]
+(old and new wording). Everything else is unchanged.
+Answer STRICTLY using these changes.
+Be concise. Use Paragraphs. Bullet points where appropriate.
+
+QUESTION:
+{query}
+
+CHANGES:
+{context_text}
+"""
+    try:
+        with span("generate", bytes=len(prompt), tokens=approx_tokens(prompt)) as s:
+            res = llm.complete(prompt, route="rag")
+            s["provider"], s["hedged"] = res["provider"], res["hedged"]
+            s["completion_tokens"] = approx_tokens(res["text"])
+        return res["text"]
+    except LLMError as e:
+        return f"LLM Error: {e}"
+
+
+def exact_search(query: str, company: str, year: str, items: list | None, k: int) -> list | None:
+    """
+    Exact top-k over the filing's .npy matrices → [(chunk_id, score)], or
+    None when some indexed section has no matrix (ingested before they
+    existed) and Chroma has to answer instead.
+    """
+    if not EXACT_SEARCH:
+        return None
+    row = manifest.get(company, year)
+    if row is None:
+        return None
+    done = manifest.sections_done(company, year, row["url"])
+    wanted = [i for i in done if not items or i in items]
+    if not wanted or not vectors.has_sections(company, year, wanted):
+        return None
+    query_vec = local_ef([query])[0]
+    return vectors.search(query_vec, [(company, year, wanted)], k)
+
+
+def rag_pipeline(query: str, company: str, year: str, items: list | None = None,
+                 chunk_ids: list | None = None, retrieved: dict | None = None):
+    """
+    `items` narrows retrieval to those 10-K Items; `chunk_ids` skips retrieval
+    and answers from those chunks (follow-ups). The ids used are written to
+    `retrieved["chunk_ids"]` when a dict is passed.
+    """
     # 1. RETRIEVE (Local - Fast)
+    where = [{"company": company}, {"year": year}]
+    if items:
+        where.append({"item": {"$in": list(items)}})
     if len(query.strip()) > 10:
         k=6           #for longer queries, get more context
     else:
         k=2
-    console.print(f"[yellow]3. Retrieving top {k} chunks from local DB...[/yellow]")
-    results = collection.query(
-        query_texts=[query], # Chroma embeds this query locally for us!
-        n_results=k,
-        where={"$and": [{"company": company}, {"year": year}]}
-    )
+    if chunk_ids:
+        with span("retrieve", cache="hit") as s:
+            got = collection.get(ids=list(chunk_ids))
+            results = {"ids": [got["ids"]], "documents": [got["documents"]]}
+            s["chunks"] = len(got["ids"])
+    else:
+        log.info("3. Retrieving top %d chunks from local DB...", k)
+        hits = exact_search(query, company, year, items, k)
+        if hits is not None:
+            with span("retrieve", k=k, search="exact") as s:
+                got = collection.get(ids=[h[0] for h in hits]) if hits else {"ids": [], "documents": []}
+                by_id = dict(zip(got["ids"], got["documents"]))
+                ids = [h[0] for h in hits if h[0] in by_id]
+                results = {"ids": [ids], "documents": [[by_id[i] for i in ids]]}
+                s["chunks"] = len(ids)
+                s["bytes"] = sum(len(d) for d in results["documents"][0])
+        else:
+            with span("retrieve", k=k, search="hnsw") as s:
+                results = collection.query(
+                    query_texts=[query], # Chroma embeds this query locally for us!
+                    n_results=k,
+                    where={"$and": where}
+                )
+                s["chunks"] = len(results["documents"][0])
+                s["bytes"] = sum(len(d) for d in results["documents"][0])
+    if retrieved is not None:
+        retrieved["chunk_ids"] = results["ids"][0]
 
     if not results["documents"][0]:
         return "No data found."
@@ -164,11 +587,14 @@ CONTEXT:
 
 
     try:
-        console.print("[yellow]4. Asking Gemini (1 API Call)...[/yellow]")
-        response = MODEL.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"Gemini Error: {e}"
+        log.info("4. Asking the LLM (1 API Call)...")
+        with span("generate", bytes=len(prompt), tokens=approx_tokens(prompt)) as s:
+            res = llm.complete(prompt, route="rag")
+            s["provider"], s["hedged"] = res["provider"], res["hedged"]
+            s["completion_tokens"] = approx_tokens(res["text"])
+        return res["text"]
+    except LLMError as e:
+        return f"LLM Error: {e}"
 
 # ------------------------------------------------------
 # 5. TEST EXECUTION
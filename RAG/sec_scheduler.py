@@ -0,0 +1,201 @@
+"""
+Eddie SEC Scheduler - one rate limit for every SEC request
+----------------------------------------------------------
+SEC throttles clients above ~10 requests/sec. Every fetcher (rag_engine,
+summarizer, the backend's tools.py) calls sec_get() instead of requests.get:
+
+1. Token bucket at SEC_MAX_RPS (default 9/s) shared by all threads.
+   Set SEC_RATE_STATE_FILE to share the bucket across processes too
+   (state kept in a small file guarded by a FileLock).
+2. Priorities: INTERACTIVE requests (a user is waiting) always get the
+   next token before BACKFILL ones (background ingestion / bulk jobs).
+   Pass priority= per call, or wrap a whole job in `with use_priority(BACKFILL):`.
+3. Coalescing: concurrent requests for the same URL share one download.
+4. stats() reports queue depth, wait times and coalesced requests.
+"""
+
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import requests
+
+try:
+    from .eddie_lock import FileLock
+except ImportError:      # copied next to tools.py in the backend (kept identical to RAG/)
+    from eddie_lock import FileLock
+
+SEC_MAX_RPS = float(os.getenv("SEC_MAX_RPS", "9"))
+SEC_RATE_STATE_FILE = os.getenv("SEC_RATE_STATE_FILE")   # e.g. /tmp/eddie_sec_bucket
+
+INTERACTIVE = 0
+BACKFILL = 10
+
+_priority = contextvars.ContextVar("sec_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def use_priority(priority: int):
+    """Default priority for every sec_get() made inside the block (this thread/context)."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _LocalBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate, self.capacity = rate, capacity
+        self.tokens, self.updated = float(capacity), time.monotonic()
+
+    def take(self) -> float:
+        """Take one token → 0.0, or return seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _FileBucket:
+    """Same bucket, but the state ("tokens updated_epoch") lives in a file shared by processes."""
+
+    def __init__(self, rate: float, capacity: int, path: str):
+        self.rate, self.capacity, self.path = rate, capacity, path
+        self.lock = FileLock(path + ".lock")
+
+    def take(self) -> float:
+        with self.lock:
+            now = time.time()
+            try:
+                with open(self.path, "r", encoding="ascii") as f:
+                    tokens, updated = (float(x) for x in f.read().split())
+            except (OSError, ValueError):
+                tokens, updated = float(self.capacity), now
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            with open(self.path, "w", encoding="ascii") as f:
+                f.write(f"{tokens} {now}")
+            return wait
+
+
+class SecScheduler:
+    def __init__(self, rate: float = SEC_MAX_RPS, state_file: str | None = SEC_RATE_STATE_FILE):
+        capacity = max(1, int(rate))
+        self.bucket = _FileBucket(rate, capacity, state_file) if state_file else _LocalBucket(rate, capacity)
+        self.cond = threading.Condition()
+        self.waiters = []                 # heap of (priority, seq)
+        self.seq = itertools.count()
+        self.inflight = {}                # url → Future
+        self.inflight_lock = threading.Lock()     # guards inflight and counts
+        self.session = requests.Session()
+        self.waits = deque(maxlen=1000)   # recent wait times (s)
+        self.counts = {"requests": 0, "coalesced": 0, "errors": 0}
+
+    # ---- rate limiting -------------------------------------------------
+    def acquire(self, priority: int | None = None) -> float:
+        """Block until this caller may send one request. Returns seconds waited."""
+        if priority is None:
+            priority = _priority.get()
+        t0 = time.monotonic()
+        ticket = (priority, next(self.seq))
+        with self.cond:
+            heapq.heappush(self.waiters, ticket)
+            try:
+                while True:
+                    if self.waiters[0] == ticket:
+                        wait = self.bucket.take()
+                        if wait == 0.0:
+                            break
+                        self.cond.wait(timeout=wait)
+                    else:
+                        self.cond.wait()
+            finally:
+                self.waiters.remove(ticket)
+                heapq.heapify(self.waiters)
+                self.cond.notify_all()
+        waited = time.monotonic() - t0
+        self.waits.append(waited)
+        return waited
+
+    # ---- requests ------------------------------------------------------
+    def _count(self, name: str):
+        with self.inflight_lock:
+            self.counts[name] += 1
+
+    def get(self, url: str, priority: int | None = None, headers: dict | None = None,
+            timeout=20, stream: bool = False) -> requests.Response:
+        """
+        Rate-limited GET. Non-streamed GETs of the same URL that overlap in
+        time are coalesced: one download, every caller gets the response.
+        """
+        if stream:
+            waited = self.acquire(priority)
+            self._count("requests")
+            res = self.session.get(url, headers=headers, timeout=timeout, stream=True)
+            res.sec_wait_ms = round(waited * 1000, 3)
+            return res
+
+        with self.inflight_lock:
+            fut = self.inflight.get(url)
+            leader = fut is None
+            if leader:
+                fut = self.inflight[url] = Future()
+            else:
+                self.counts["coalesced"] += 1
+        if not leader:
+            return fut.result()
+
+        try:
+            waited = self.acquire(priority)
+            self._count("requests")
+            res = self.session.get(url, headers=headers, timeout=timeout)
+            res.content   # read the body now so followers can share it
+            res.sec_wait_ms = round(waited * 1000, 3)
+            fut.set_result(res)
+            return res
+        except Exception as e:
+            self._count("errors")
+            fut.set_exception(e)
+            raise
+        finally:
+            with self.inflight_lock:
+                self.inflight.pop(url, None)
+
+    def stats(self) -> dict:
+        waits = sorted(self.waits)
+        with self.inflight_lock:
+            inflight, counts = len(self.inflight), dict(self.counts)
+        return {
+            "queue_depth": len(self.waiters),
+            "inflight": inflight,
+            **counts,
+            "wait_ms_mean": round(sum(waits) / len(waits) * 1000, 3) if waits else 0.0,
+            "wait_ms_p95": round(waits[int(0.95 * (len(waits) - 1))] * 1000, 3) if waits else 0.0,
+            "wait_ms_max": round(waits[-1] * 1000, 3) if waits else 0.0,
+        }
+
+
+# Process-wide default scheduler
+scheduler = SecScheduler()
+
+
+def sec_get(url: str, priority: int | None = None, **kwargs) -> requests.Response:
+    return scheduler.get(url, priority=priority, **kwargs)
+
+
+def stats() -> dict:
+    return scheduler.stats()
@@ -0,0 +1,157 @@
+"""
+Eddie Table Store - financial tables parsed out of filings
+----------------------------------------------------------
+Every <table> of an ingested filing is stored as structured rows in
+<db_dir>/tables.sqlite3, tagged with its 10-K Item and the ids of the
+Chroma chunks that contain it:
+
+    tables.replace_filing("AAPL", "2023", url, [{"item": "8", "caption": ...,
+                          "rows": [["Total net sales", "391,035", ...]], "chunk_ids": [...]}])
+    tables.lookup("AAPL", "2023", "What were total net sales?")
+    → [{"label": "Total net sales", "values": [...], "header": [...], ...}]
+
+Numeric questions whose metric matches a row label are then answered from
+the row itself instead of embedding and prompting the whole table.
+"""
+
+import json
+import os
+import re
+import sqlite3
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tables (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    company   TEXT NOT NULL,
+    year      TEXT NOT NULL,
+    url       TEXT NOT NULL,
+    item      TEXT,
+    caption   TEXT,
+    header    TEXT,                   -- JSON list (column labels, may be empty)
+    n_rows    INTEGER,
+    chunk_ids TEXT                    -- JSON list of Chroma ids holding this table
+);
+CREATE INDEX IF NOT EXISTS tables_filing ON tables(company, year);
+CREATE TABLE IF NOT EXISTS table_rows (
+    table_id  INTEGER NOT NULL,
+    row_idx   INTEGER NOT NULL,
+    label     TEXT,                   -- first cell, lower-cased for lookup
+    cells     TEXT NOT NULL,          -- JSON list of the row's cells (label first)
+    PRIMARY KEY (table_id, row_idx)
+);
+CREATE INDEX IF NOT EXISTS table_rows_label ON table_rows(label);
+"""
+
+_NUMBER = re.compile(r"^\(?-?\$?\d[\d,]*(\.\d+)?\)?%?$")
+_YEARISH = re.compile(r"^(19|20)\d\d$")
+MIN_LABEL_CHARS = 6
+
+
+def is_number(cell: str) -> bool:
+    return bool(_NUMBER.match(cell.replace(" ", "")))
+
+
+def split_header(rows: list) -> tuple:
+    """Leading rows without amounts (years are fine) are the header; the last of them labels the columns."""
+    header = []
+    i = 0
+    while i < len(rows) and not any(is_number(c) and not _YEARISH.match(c) for c in rows[i]):
+        header = rows[i]
+        i += 1
+    return header, rows[i:]
+
+
+def _norm(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9%&/ ]", " ", text.lower()).split())
+
+
+class TableStore:
+    def __init__(self, db_dir: str):
+        os.makedirs(db_dir, exist_ok=True)
+        self.path = os.path.join(db_dir, "tables.sqlite3")
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def delete_filing(self, company: str, year):
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            conn.execute("DELETE FROM table_rows WHERE table_id IN "
+                         "(SELECT id FROM tables WHERE company=? AND year=?)", (company, str(year)))
+            conn.execute("DELETE FROM tables WHERE company=? AND year=?", (company, str(year)))
+            conn.execute("COMMIT")
+
+    def replace_filing(self, company: str, year, url: str, tables: list) -> int:
+        """Store a filing's tables (replacing any previous copy). Returns rows stored."""
+        self.delete_filing(company, year)
+        n = 0
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            for t in tables:
+                header, body = split_header(t["rows"])
+                cur = conn.execute(
+                    "INSERT INTO tables (company, year, url, item, caption, header, n_rows, chunk_ids) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (company, str(year), url, t.get("item"), t.get("caption", ""),
+                     json.dumps(header), len(body), json.dumps(t.get("chunk_ids", []))),
+                )
+                conn.executemany(
+                    "INSERT INTO table_rows (table_id, row_idx, label, cells) VALUES (?, ?, ?, ?)",
+                    [(cur.lastrowid, i, _norm(r[0]), json.dumps(r)) for i, r in enumerate(body)],
+                )
+                n += len(body)
+            conn.execute("COMMIT")
+        return n
+
+    def has_filing(self, company: str, year, url: str) -> bool:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT 1 FROM tables WHERE company=? AND year=? AND url=? LIMIT 1",
+                               (company, str(year), url)).fetchone()
+        return row is not None
+
+    def lookup(self, company: str, year, query: str, items: list | None = None, limit: int = 3) -> list:
+        """
+        Rows whose label appears in the query, longest label first (the most
+        specific metric), financial-statement Items (8, 7) before others.
+        """
+        q = f" {_norm(query)} "
+        sql = ("SELECT t.item, t.caption, t.header, t.chunk_ids, r.label, r.cells FROM table_rows r "
+               "JOIN tables t ON t.id = r.table_id WHERE t.company=? AND t.year=? AND length(r.label) >= ?")
+        args = [company, str(year), MIN_LABEL_CHARS]
+        if items:
+            sql += f" AND t.item IN ({','.join('?' * len(items))})"
+            args += list(items)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, args).fetchall()
+
+        hits = []
+        for r in rows:
+            cells = json.loads(r["cells"])
+            if f" {r['label']} " in q and any(is_number(c) for c in cells[1:]):
+                hits.append({
+                    "item": r["item"], "caption": r["caption"], "label": cells[0],
+                    "header": json.loads(r["header"]), "values": cells[1:],
+                    "chunk_ids": json.loads(r["chunk_ids"]),
+                })
+        hits.sort(key=lambda h: (-len(_norm(h["label"])), h["item"] not in ("8", "7")))
+        return hits[:limit]
+
+
+def format_row(hit: dict) -> str:
+    """Markdown answer for one matched row: label, where it came from, value per column."""
+    where = f"Item {hit['item']}" if hit.get("item") else "filing"
+    if hit.get("caption"):
+        where += f" — {hit['caption']}"
+    lines = [f"**{hit['label']}** ({where})"]
+    header = hit["header"][-len(hit["values"]):] if hit["header"] else []
+    if len(header) == len(hit["values"]):
+        lines += [f"- {h}: {v}" for h, v in zip(header, hit["values"])]
+    else:
+        lines.append("- " + " | ".join(hit["values"]))
+    return "\n".join(lines)
@@ -0,0 +1,149 @@
+"""
+Tests for diffs.py (no network), run from the repository root:
+
+    python -m unittest RAG.test_diffs
+"""
+
+import hashlib
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from RAG import diffs
+from RAG.diffs import DiffStore, _hamming, _normalise, _signed, compare, paragraphs, simhash
+
+SUPPLY = ("We depend on a limited number of suppliers in Asia for key components of our products, and any "
+          "disruption in their operations, including natural disasters, pandemics or trade restrictions, "
+          "could delay shipments and materially harm our results of operations and financial condition.")
+SUPPLY_REWORDED = SUPPLY.replace("materially harm", "materially and adversely affect")
+PRIVACY = ("Our business is subject to complex and changing laws on data privacy and the protection of "
+           "personal information, and any failure to comply could result in fines, litigation and damage "
+           "to our reputation in every market where we operate.")
+COMPETITION = ("The markets for our products and services are highly competitive, and competitors with "
+               "greater resources may introduce products at lower prices or with features that make ours "
+               "less attractive to customers.")
+AI = ("The Company began to rely on artificial intelligence features in its products, which may introduce "
+      "new legal, regulatory and reputational risks that are difficult to predict and could increase our "
+      "compliance costs over time.")
+
+ITEM_2023 = "\n".join(["Item 1A. Risk Factors", SUPPLY, PRIVACY, COMPETITION, "Page 12"])
+# Competition moved to the top, supply reworded, privacy dropped, AI added
+ITEM_2024 = "\n".join(["Item 1A. Risk Factors", COMPETITION, SUPPLY_REWORDED, AI,
+                       "Net sales | 391,035 | 383,285 | 394,328 | 365,817 | 274,515 | 260,174 | 265,595 |"])
+
+
+def fingerprint(body: str) -> list:
+    """[(pos, simhash, digest, text), ...] as DiffStore.replace_filing stores them."""
+    return [(pos, _signed(simhash(p)), hashlib.blake2b(_normalise(p).encode(), digest_size=16).hexdigest(), p)
+            for pos, p in enumerate(paragraphs(body))]
+
+
+def distance(a: str, b: str) -> int:
+    return bin(simhash(a) ^ simhash(b)).count("1")
+
+
+class ParagraphsTest(unittest.TestCase):
+    def test_short_lines_and_table_rows_are_skipped(self):
+        self.assertEqual(paragraphs(ITEM_2023), [SUPPLY, PRIVACY, COMPETITION])
+        self.assertEqual(paragraphs(ITEM_2024), [COMPETITION, SUPPLY_REWORDED, AI])
+
+    def test_long_lines_split_at_sentences(self):
+        line = " ".join([SUPPLY, PRIVACY, COMPETITION] * 5)
+        units = paragraphs(line)
+        self.assertGreater(len(units), 1)
+        self.assertEqual(" ".join(units), line)
+        self.assertTrue(all(len(u) >= diffs.MIN_PARAGRAPH for u in units))
+
+
+class SimHashTest(unittest.TestCase):
+    def test_hamming(self):
+        a = np.array([0, 2**64 - 1], dtype=np.uint64)
+        b = np.array([0, 1, 2**63], dtype=np.uint64)
+        self.assertEqual(_hamming(a, b).tolist(), [[0, 1, 1], [64, 63, 63]])
+
+    def test_rewording_stays_within_threshold(self):
+        self.assertEqual(distance(SUPPLY, " ".join(SUPPLY.upper().split())), 0)    # normalised
+        self.assertLessEqual(distance(SUPPLY, SUPPLY_REWORDED), diffs.MODIFIED_BITS)
+        for other in (PRIVACY, COMPETITION, AI):
+            self.assertGreater(distance(SUPPLY, other), diffs.MODIFIED_BITS)
+
+    def test_signed_round_trip(self):
+        h = simhash(SUPPLY)
+        self.assertLess(abs(_signed(h)), 2**63)
+        self.assertEqual(_signed(h) & (2**64 - 1), h)
+
+
+class CompareTest(unittest.TestCase):
+    def setUp(self):
+        self.d = compare(fingerprint(ITEM_2023), fingerprint(ITEM_2024))
+
+    def test_added_removed_modified(self):
+        self.assertEqual([p[3] for p in self.d["added"]], [AI])
+        self.assertEqual([p[3] for p in self.d["removed"]], [PRIVACY])
+        self.assertEqual([(o[3], n[3]) for o, n, _ in self.d["modified"]], [(SUPPLY, SUPPLY_REWORDED)])
+        self.assertEqual(self.d["modified"][0][2], distance(SUPPLY, SUPPLY_REWORDED))
+
+    def test_moved_paragraph_is_unchanged(self):
+        self.assertEqual(self.d["unchanged"], 1)
+
+    def test_threshold(self):
+        d = distance(SUPPLY, SUPPLY_REWORDED)
+        with mock.patch.object(diffs, "MODIFIED_BITS", d):
+            self.assertEqual(len(compare(fingerprint(ITEM_2023), fingerprint(ITEM_2024))["modified"]), 1)
+        with mock.patch.object(diffs, "MODIFIED_BITS", d - 1):
+            below = compare(fingerprint(ITEM_2023), fingerprint(ITEM_2024))
+        self.assertEqual(below["modified"], [])
+        self.assertEqual(sorted(p[3] for p in below["added"]), sorted([AI, SUPPLY_REWORDED]))
+        self.assertEqual(sorted(p[3] for p in below["removed"]), sorted([PRIVACY, SUPPLY]))
+
+    def test_each_paragraph_pairs_once(self):
+        # Two rewordings of one old paragraph: the closer one is "modified", the other "added"
+        closer = SUPPLY.replace("Asia", "Asia and Europe")
+        d = compare(fingerprint(SUPPLY), fingerprint("\n".join([SUPPLY_REWORDED, closer])))
+        self.assertEqual(len(d["modified"]), 1)
+        self.assertEqual(len(d["added"]), 1)
+        best = min((SUPPLY_REWORDED, closer), key=lambda t: distance(SUPPLY, t))
+        self.assertEqual(d["modified"][0][1][3], best)
+
+    def test_empty_sides(self):
+        self.assertEqual(compare([], fingerprint(ITEM_2024))["added"], fingerprint(ITEM_2024))
+        self.assertEqual(compare(fingerprint(ITEM_2023), [])["removed"], fingerprint(ITEM_2023))
+
+
+class DiffStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = DiffStore(self.tmp.name)
+        self.store.replace_filing("AAPL", 2023, "u23", [("1A", ITEM_2023), ("7", PRIVACY)])
+        self.store.replace_filing("AAPL", 2024, "u24", [("1A", ITEM_2024), ("7", PRIVACY)])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_link_and_delta(self):
+        self.assertEqual(self.store.link("AAPL", 2024), [("2024", "2023")])
+        delta = self.store.delta("AAPL", 2024)
+        self.assertEqual(delta["base_year"], "2023")
+        item = delta["items"]["1A"]
+        self.assertEqual((item["added"], item["removed"], item["modified"], item["unchanged"]),
+                         ([AI], [PRIVACY], [(SUPPLY, SUPPLY_REWORDED)], 1))
+        self.assertEqual(delta["items"]["7"], {"added": [], "removed": [], "modified": [], "unchanged": 1})
+
+    def test_items_filter_and_missing_pair(self):
+        self.store.link("AAPL", 2024)
+        self.assertEqual(list(self.store.delta("AAPL", 2024, items=["1A"])["items"]), ["1A"])
+        self.assertIsNone(self.store.delta("AAPL", 2023))
+        self.assertIsNone(self.store.delta("MSFT", 2024))
+
+    def test_replacing_a_filing_drops_its_diffs(self):
+        self.store.link("AAPL", 2024)
+        self.store.replace_filing("AAPL", 2023, "u23b", [("1A", ITEM_2023)])
+        self.assertIsNone(self.store.delta("AAPL", 2024))
+        self.assertTrue(self.store.has_filing("AAPL", 2023, "u23b"))
+        self.assertFalse(self.store.has_filing("AAPL", 2023, "u23"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+"""
+Tests for html_text.py (no network), run from the repository root:
+
+    python -m unittest RAG.test_html_text
+
+The reference for plain text is the BeautifulSoup clean_html() that
+rag_engine used before the streaming parser.
+"""
+
+import unittest
+
+from bs4 import BeautifulSoup
+
+from RAG.html_text import HtmlText, clean_html, parse_ix_number
+
+
+def bs4_clean_html(html: str) -> str:
+    """The pre-lxml-target clean_html (baseline rag_engine.py)."""
+    soup = BeautifulSoup(html, "lxml")
+    for tag in soup(["script", "style", "noscript", "xbrl", "header", "footer"]):
+        tag.decompose()
+    text = soup.get_text(separator="\n")
+    return "\n".join([t.strip() for t in text.splitlines() if t.strip()])
+
+
+def parse(html: str, chunk: int | None = None) -> HtmlText:
+    data = html.encode("utf-8")
+    doc = HtmlText()
+    for i in range(0, len(data), chunk or len(data)):
+        doc.feed(data[i:i + (chunk or len(data))])
+    doc.close()
+    return doc
+
+
+# Prose only: the parts of a 10-K both parsers should read the same way
+PROSE = """<html><head><title>aapl-20240928</title><style>p { color: red }</style>
+<script>var x = "not text";</script></head>
+<body>
+<header>Site navigation</header>
+<div><span style="font-weight:bold">Item 1A.</span>   <span>Risk Factors</span></div>
+<p>The Company&#8217;s business   can be affected by
+   <b>macroeconomic</b> conditions,
+including inflation.</p>
+<div>  </div>
+<p>Item 7.&#160;Management&#8217;s Discussion and Analysis</p>
+<noscript>enable javascript</noscript>
+<ul><li>iPhone</li><li>Mac</li></ul>
+<footer>Page 12</footer>
+</body></html>"""
+
+# Inline XBRL: hidden header with contexts/units, tagged numbers in the body
+IXBRL = """<html xmlns:ix="http://www.xbrl.org/2013/inlineXBRL"><body>
+<div style="display:none"><ix:header><ix:resources>
+<xbrli:context id="FY2024"><xbrli:entity><xbrli:identifier scheme="http://www.sec.gov/CIK">0000320193</xbrli:identifier></xbrli:entity>
+<xbrli:period><xbrli:startDate>2023-10-01</xbrli:startDate><xbrli:endDate>2024-09-28</xbrli:endDate></xbrli:period></xbrli:context>
+<xbrli:context id="FY2024_US"><xbrli:entity><xbrli:identifier scheme="http://www.sec.gov/CIK">0000320193</xbrli:identifier>
+<xbrli:segment><xbrldi:explicitMember dimension="srt:StatementGeographicalAxis">country:US</xbrldi:explicitMember></xbrli:segment></xbrli:entity>
+<xbrli:period><xbrli:startDate>2023-10-01</xbrli:startDate><xbrli:endDate>2024-09-28</xbrli:endDate></xbrli:period></xbrli:context>
+<xbrli:context id="AsOf2024"><xbrli:entity><xbrli:identifier scheme="http://www.sec.gov/CIK">0000320193</xbrli:identifier></xbrli:entity>
+<xbrli:period><xbrli:instant>2024-09-28</xbrli:instant></xbrli:period></xbrli:context>
+<xbrli:unit id="usd"><xbrli:measure>iso4217:USD</xbrli:measure></xbrli:unit>
+<xbrli:unit id="usdPerShare"><xbrli:divide><xbrli:unitNumerator><xbrli:measure>iso4217:USD</xbrli:measure></xbrli:unitNumerator>
+<xbrli:unitDenominator><xbrli:measure>xbrli:shares</xbrli:measure></xbrli:unitDenominator></xbrli:divide></xbrli:unit>
+</ix:resources></ix:header></div>
+<p>Total net sales were $<ix:nonFraction name="us-gaap:Revenues" contextRef="FY2024" unitRef="usd" decimals="-6" scale="6" format="ixt:num-dot-decimal">391,035</ix:nonFraction> million.</p>
+<p>Other income (expense) was $(<ix:nonFraction name="us-gaap:NonoperatingIncomeExpense" contextRef="FY2024" unitRef="usd" decimals="-6" scale="6" sign="-">269</ix:nonFraction>) million.</p>
+<p>U.S. sales: <ix:nonFraction name="us-gaap:Revenues" contextRef="FY2024_US" unitRef="usd" scale="6">167,045</ix:nonFraction></p>
+<p>Diluted EPS <ix:nonFraction name="us-gaap:EarningsPerShareDiluted" contextRef="FY2024" unitRef="usdPerShare" decimals="2">6.08</ix:nonFraction></p>
+<p>Goodwill: <ix:nonFraction name="us-gaap:Goodwill" contextRef="AsOf2024" unitRef="usd" format="ixt:fixed-zero">&#8212;</ix:nonFraction></p>
+<p>Fiscal year end: <ix:nonNumeric name="dei:CurrentFiscalYearEndDate" contextRef="FY2024">--09-28</ix:nonNumeric></p>
+</body></html>"""
+
+TABLE = """<html><body>
+<p>CONSOLIDATED STATEMENTS OF OPERATIONS</p>
+<p>(In millions)</p>
+<table>
+<tr><td></td><td>2024</td><td></td><td>2023</td></tr>
+<tr><td>Net sales</td><td>$</td><td>391,035</td><td>$</td><td>383,285</td></tr>
+<tr><td>Other income/(expense), net</td><td>(</td><td>269</td><td>)</td><td>(565</td><td>)</td></tr>
+<tr><td>Gross margin percentage</td><td>46.2</td><td>%</td><td>44.1</td><td>%</td></tr>
+<tr><td></td><td></td></tr>
+</table>
+<p>See accompanying Notes.</p>
+</body></html>"""
+
+
+class PlainTextTest(unittest.TestCase):
+    def test_matches_beautifulsoup_clean_html(self):
+        self.assertEqual(clean_html(PROSE), bs4_clean_html(PROSE))
+
+    def test_whitespace_and_skipped_tags(self):
+        lines = clean_html(PROSE).split("\n")
+        self.assertIn("Risk Factors", lines)
+        self.assertIn("macroeconomic", lines)
+        self.assertNotIn("Site navigation", lines)
+        self.assertFalse(any("not text" in l or "color" in l or "javascript" in l for l in lines))
+        self.assertTrue(all(l == l.strip() and l for l in lines))
+
+    def test_chunked_feed_matches_single_feed(self):
+        for html in (PROSE, IXBRL, TABLE):
+            whole = parse(html)
+            for chunk in (1, 7, 64):
+                doc = parse(html, chunk)
+                self.assertEqual(doc.text, whole.text)
+                self.assertEqual(doc.facts, whole.facts)
+                self.assertEqual(doc.tables, whole.tables)
+
+    def test_str_and_bytes_input(self):
+        self.assertEqual(clean_html(PROSE), clean_html(PROSE.encode("utf-8")))
+
+
+class InlineXbrlTest(unittest.TestCase):
+    def setUp(self):
+        self.doc = parse(IXBRL)
+        self.facts = {(f["concept"], f["dims"]): f for f in self.doc.facts}
+
+    def test_header_is_not_text(self):
+        self.assertNotIn("0000320193", self.doc.text)
+        self.assertNotIn("iso4217", self.doc.text)
+        self.assertIn("391,035", self.doc.text)
+
+    def test_scale(self):
+        f = self.facts[("us-gaap:Revenues", "")]
+        self.assertEqual(f["value"], 391_035_000_000.0)
+        self.assertEqual((f["start"], f["end"], f["unit"], f["decimals"]), ("2023-10-01", "2024-09-28", "USD", "-6"))
+
+    def test_sign(self):
+        self.assertEqual(self.facts[("us-gaap:NonoperatingIncomeExpense", "")]["value"], -269_000_000.0)
+
+    def test_dimensions_and_instants(self):
+        us = self.facts[("us-gaap:Revenues", "srt:StatementGeographicalAxis=country:US")]
+        self.assertEqual(us["value"], 167_045_000_000.0)
+        goodwill = self.facts[("us-gaap:Goodwill", "")]
+        self.assertEqual((goodwill["value"], goodwill["start"], goodwill["end"]), (0.0, None, "2024-09-28"))
+
+    def test_divided_units_and_text_facts(self):
+        self.assertEqual(self.facts[("us-gaap:EarningsPerShareDiluted", "")]["unit"], "USD/shares")
+        fye = self.facts[("dei:CurrentFiscalYearEndDate", "")]
+        self.assertEqual((fye["value"], fye["text"]), (None, "--09-28"))
+
+    def test_parse_ix_number(self):
+        self.assertEqual(parse_ix_number("1.234,5", "ixt:num-comma-decimal"), 1234.5)
+        self.assertEqual(parse_ix_number("12", scale="-2"), 0.12)
+        self.assertEqual(parse_ix_number("no", "ixt:fixed-zero", sign="-"), -0.0)
+        self.assertIsNone(parse_ix_number("n/a"))
+
+
+class TableTest(unittest.TestCase):
+    def setUp(self):
+        self.doc = parse(TABLE)
+
+    def test_rows_merge_currency_and_parenthesis_cells(self):
+        self.assertEqual(len(self.doc.tables), 1)
+        self.assertEqual(self.doc.tables[0]["rows"], [
+            ["2024", "2023"],
+            ["Net sales", "391,035", "383,285"],
+            ["Other income/(expense), net", "(269)", "(565)"],
+            ["Gross margin percentage", "46.2%", "44.1%"],
+        ])
+
+    def test_caption_and_offset(self):
+        table = self.doc.tables[0]
+        self.assertEqual(table["caption"], "CONSOLIDATED STATEMENTS OF OPERATIONS (In millions)")
+        self.assertEqual(self.doc.text[table["offset"]:table["offset"] + len(table["text"])], table["text"])
+
+    def test_one_line_per_row_in_text(self):
+        lines = self.doc.text.split("\n")
+        self.assertIn("Net sales | 391,035 | 383,285", lines)
+        self.assertEqual(lines[-1], "See accompanying Notes.")
+
+    def test_same_characters_as_beautifulsoup(self):
+        # Cells are joined per row ("$" dropped) instead of one per line; nothing else is lost or added
+        def squash(text):
+            return "".join(text.replace(" | ", "").replace("$", "").split())
+        self.assertEqual(squash(clean_html(TABLE)), squash(bs4_clean_html(TABLE)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Tests for vectors.py (no network, no Chroma), run from the repository root:
+
+    python -m unittest RAG.test_vectors
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from RAG.vectors import VectorStore, normalize, quantize, top_k
+
+DIM = 384          # all-MiniLM-L6-v2
+SECTIONS = {"1A": 300, "7": 200, "8": 120}
+K = 6
+
+
+def random_filing(seed: int = 7) -> dict:
+    rng = np.random.default_rng(seed)
+    return {item: ([f"AAPL_2023_{item}_{i}" for i in range(n)], rng.standard_normal((n, DIM)).astype(np.float32))
+            for item, n in SECTIONS.items()}
+
+
+class QuantizeTest(unittest.TestCase):
+    def test_round_trip_error_within_half_a_step(self):
+        m = normalize(np.random.default_rng(0).standard_normal((50, DIM)))
+        codes, scales = quantize(m)
+        self.assertEqual((codes.dtype, scales.dtype, scales.shape), (np.int8, np.float32, (50,)))
+        err = np.abs(codes * scales[:, None] - m)
+        self.assertTrue(np.all(err <= scales[:, None] / 2 + 1e-7))
+
+    def test_top_k(self):
+        scores = np.array([0.1, 0.9, 0.3, 0.9, 0.5])
+        self.assertEqual(top_k(scores, 3).tolist(), [1, 3, 4])
+        self.assertEqual(top_k(scores, 10).tolist(), [1, 3, 4, 2, 0])
+
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.filing = random_filing()
+        self.f32 = VectorStore(self.tmp.name, tier="float32")
+        self.i8 = VectorStore(self.tmp.name, tier="int8")
+        for item, (ids, emb) in self.filing.items():
+            self.i8.write_section("AAPL", "2023", item, ids, emb)
+        self.scope = [("AAPL", "2023", list(SECTIONS))]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def exact(self, q) -> list:
+        ids = [i for item in SECTIONS for i in self.filing[item][0]]
+        m = normalize(np.concatenate([self.filing[item][1] for item in SECTIONS]))
+        scores = m @ normalize(q)
+        return [(ids[i], float(scores[i])) for i in top_k(scores, K)]
+
+    def test_float32_is_exact(self):
+        rng = np.random.default_rng(1)
+        for _ in range(20):
+            q = rng.standard_normal(DIM)
+            got = self.f32.search(q, self.scope, K)
+            want = self.exact(q)
+            self.assertEqual([i for i, _ in got], [i for i, _ in want])
+            np.testing.assert_allclose([s for _, s in got], [s for _, s in want], rtol=1e-5)
+
+    def test_int8_top_k_matches_float32(self):
+        rng = np.random.default_rng(2)
+        for _ in range(50):
+            q = rng.standard_normal(DIM)
+            got = self.i8.search(q, self.scope, K)
+            want = self.f32.search(q, self.scope, K)
+            self.assertEqual([i for i, _ in got], [i for i, _ in want])
+            # Re-scored in float32: the reported scores are exact, not int8 approximations
+            np.testing.assert_allclose([s for _, s in got], [s for _, s in want], rtol=1e-5)
+
+    def test_int8_store_without_int8_files_falls_back(self):
+        ids, emb = self.filing["7"]
+        self.f32.write_section("MSFT", "2023", "7", ids, emb)
+        q = np.random.default_rng(3).standard_normal(DIM)
+        scope = [("MSFT", "2023", ["7"])]
+        self.assertEqual(self.i8.search(q, scope, K), self.f32.search(q, scope, K))
+
+    def test_missing_section(self):
+        self.assertIsNone(self.i8.search(np.ones(DIM), [("AAPL", "2023", ["1A", "9A"])], K))
+        self.assertFalse(self.i8.has_sections("AAPL", "2023", ["1A", "9A"]))
+
+
+class FootprintTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = VectorStore(self.tmp.name, tier="int8", rescore=4)
+        for item, (ids, emb) in random_filing().items():
+            self.store.write_section("AAPL", "2023", item, ids, emb)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sizes(self, suffix: str) -> int:
+        """Bytes of this filing's files named <item><suffix>."""
+        d = self.store._dir("AAPL", "2023")
+        return sum(os.path.getsize(os.path.join(d, item + suffix)) for item in SECTIONS)
+
+    def test_disk_bytes_match_files(self):
+        fp = self.store.footprint("AAPL", "2023", list(SECTIONS), k=K)
+        f32 = self.sizes(".npy")
+        i8 = self.sizes(".i8.npy") + self.sizes(".scale.npy")
+        self.assertEqual(fp["disk_bytes"], {"float32": f32, "int8": i8, "total": f32 + i8})
+        rows = sum(SECTIONS.values())
+        self.assertGreaterEqual(f32, rows * DIM * 4)
+        self.assertGreaterEqual(i8, rows * (DIM + 4))
+        self.assertLess(i8, f32 / 3)
+
+    def test_query_bytes(self):
+        fp = self.store.footprint("AAPL", "2023", list(SECTIONS), k=K)
+        rescored = K * 4 * DIM * 4     # one shortlist of k × rescore float32 rows for the whole search
+        self.assertEqual(fp["query_bytes"], {"float32": fp["disk_bytes"]["float32"],
+                                             "int8": fp["disk_bytes"]["int8"] + rescored})
+        self.assertLess(fp["query_bytes"]["int8"], fp["query_bytes"]["float32"])
+
+    def test_float32_store_has_no_int8_bytes(self):
+        store = VectorStore(self.tmp.name, tier="float32")
+        ids, emb = random_filing()["7"]
+        store.write_section("MSFT", "2023", "7", ids, emb)
+        fp = store.footprint("MSFT", "2023", ["7"], k=K)
+        self.assertEqual(fp["disk_bytes"]["int8"], 0)
+        self.assertIsNone(fp["query_bytes"]["int8"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Eddie Tracing - per-stage timings for one query
+-----------------------------------------------
+A Trace collects one span per pipeline stage:
+    nl_to_json → dispatch → fetch → clean → chunk → embed → retrieve → generate
+Each span records duration, and optionally bytes / tokens / cache hit-miss.
+
+Usage:
+    with start_trace("query", query=user_query) as tr:
+        with span("dispatch") as s:
+            resp = call_dispatch(...)
+            s["bytes"] = len(resp.content)
+    tr.to_dict()       # → JSON-able dict (Streamlit sidebar, benchmarks)
+
+Export:
+- EDDIE_TRACE_FILE=traces.jsonl  → one JSON line per finished trace
+- EDDIE_TRACE_OTEL=1             → also emit OpenTelemetry spans
+                                   (only if opentelemetry-api is installed)
+Spans opened outside a trace are no-ops apart from the timing itself.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+TRACE_FILE = os.getenv("EDDIE_TRACE_FILE")
+OTEL_ENABLED = os.getenv("EDDIE_TRACE_OTEL", "").lower() in ("1", "true", "yes")
+
+_tracer = None
+if OTEL_ENABLED:
+    try:
+        from opentelemetry import trace as otel_trace
+        _tracer = otel_trace.get_tracer("eddie")
+    except ImportError:
+        _tracer = None
+
+_current_trace = contextvars.ContextVar("eddie_trace", default=None)
+_current_span = contextvars.ContextVar("eddie_span", default=None)
+_file_lock = threading.Lock()
+
+
+def approx_tokens(text) -> int:
+    """~4 chars per token; good enough for tracing without paying for tiktoken."""
+    if not text:
+        return 0
+    return len(text) // 4 + 1
+
+
+class Trace:
+    def __init__(self, name: str = "query", **attrs):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attrs = attrs
+        self.spans = []
+        self.started = time.time()
+        self.duration_ms = None
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, record: dict):
+        with self._lock:
+            self.spans.append(record)
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self._t0) * 1000, 3)
+
+    def stage_totals(self) -> dict:
+        """{stage: total ms} — handy for one-line summaries."""
+        totals = {}
+        for s in self.spans:
+            totals[s["stage"]] = round(totals.get(s["stage"], 0) + s["duration_ms"], 3)
+        return totals
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started": self.started,
+            "duration_ms": self.duration_ms,
+            "attrs": self.attrs,
+            "spans": list(self.spans),
+        }
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(name: str = "query", trace: Trace | None = None, **attrs):
+    """Open (or re-enter) a trace for the current context and export it on exit."""
+    tr = trace or Trace(name)
+    tr.attrs.update(attrs)
+    token = _current_trace.set(tr)
+    try:
+        yield tr
+    finally:
+        _current_trace.reset(token)
+        tr.finish()
+        if TRACE_FILE:
+            export_jsonl(tr, TRACE_FILE)
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """
+    Time one stage. Yields a dict; set "bytes", "tokens", "cache" etc. on it.
+    Exceptions are recorded on the span and re-raised.
+    """
+    tr = _current_trace.get()
+    record = {
+        "stage": stage,
+        "span_id": uuid.uuid4().hex[:16],
+        "parent": _current_span.get(),
+        "start": time.time(),
+        **attrs,
+    }
+    token = _current_span.set(record["span_id"])
+    otel_cm = _tracer.start_as_current_span(stage) if _tracer else None
+    otel_span = otel_cm.__enter__() if otel_cm else None
+    t0 = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = repr(e)
+        raise
+    finally:
+        record["duration_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        _current_span.reset(token)
+        if otel_span is not None:
+            for k, v in record.items():
+                if isinstance(v, (str, int, float, bool)):
+                    otel_span.set_attribute(f"eddie.{k}", v)
+            otel_cm.__exit__(None, None, None)
+        if tr is not None:
+            tr.add(record)
+
+
+def export_jsonl(trace: Trace, path: str):
+    line = json.dumps(trace.to_dict(), default=str)
+    with _file_lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
@@ -0,0 +1,223 @@
+"""
+Eddie Vector Files - exact search over one filing's chunks
+----------------------------------------------------------
+A 10-K is a few hundred chunks. Asking Chroma's global HNSW graph for the
+top-k of one filing (metadata `where` filter) walks far more of the graph
+than that and is approximate. So every embedded section is also written as
+a small matrix next to the DB:
+
+    <db_dir>/vectors/<company>_<year>/<item>.npy        float32, L2-normalised rows
+    <db_dir>/vectors/<company>_<year>/<item>.ids.json   Chroma id of each row
+
+    vectors.write_section("AAPL", "2023", "1A", ids, embeddings)
+    vectors.search(query_vec, [("AAPL", "2023", ["1A", "7"])], k=6)
+    → [("AAPL_2023_1A_12", 0.61), ...]
+
+Queries scoped to one (or a few) filings are then an exact matrix-vector
+product over memory-mapped files plus an argpartition; Chroma's HNSW index
+is only needed for corpus-wide searches.
+
+Optional int8 tier (EDDIE_VECTOR_TIER=int8): each section also gets
+<item>.i8.npy (one int8 code per dimension) + <item>.scale.npy (one float
+per row), a quarter of the float32 bytes. Searches scan the int8 codes,
+then re-score the best k × EDDIE_RESCORE candidates with their float32 rows,
+so only those rows of the float32 file are ever paged in. The tier saves
+memory, not disk: the float32 files stay (they are needed for re-scoring),
+so the vector files grow by ~25%; what shrinks is the bytes a query reads
+and keeps resident (see footprint()).
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+VECTOR_TIER = os.getenv("EDDIE_VECTOR_TIER", "float32")     # float32 | int8
+RESCORE = int(os.getenv("EDDIE_RESCORE", "4"))              # int8 candidates per result re-scored in float32
+OPEN_FILES = 256                                            # memory maps kept open per store
+
+
+def normalize(matrix) -> np.ndarray:
+    m = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(m, axis=-1, keepdims=True)
+    return m / np.maximum(norms, 1e-12)
+
+
+def quantize(matrix: np.ndarray) -> tuple:
+    """Symmetric per-row int8: row ≈ codes * scale. → (codes int8 [n, d], scales float32 [n])."""
+    m = np.asarray(matrix, dtype=np.float32)
+    scales = np.maximum(np.abs(m).max(axis=1), 1e-12) / 127.0
+    codes = np.clip(np.rint(m / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (argpartition, then sort only those k)."""
+    if len(scores) > k:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(len(scores))
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def _save(path: str, array: np.ndarray):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+class VectorStore:
+    def __init__(self, db_dir: str, tier: str = VECTOR_TIER, rescore: int = RESCORE):
+        if tier not in ("float32", "int8"):
+            raise ValueError("tier must be 'float32' or 'int8'")
+        self.root = os.path.join(db_dir, "vectors")
+        self.tier, self.rescore = tier, rescore
+        self._maps = OrderedDict()      # (path, mtime_ns, size) → memmap / ids list
+        self._maps_lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _open(self, path: str):
+        """Memory-map a .npy (or read an .ids.json) once; reopened when the file is replaced."""
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size)
+        with self._maps_lock:
+            if key in self._maps:
+                self._maps.move_to_end(key)
+                return self._maps[key]
+        if path.endswith(".json"):
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        else:
+            value = np.load(path, mmap_mode="r")
+        with self._maps_lock:
+            self._maps[key] = value
+            while len(self._maps) > OPEN_FILES:
+                self._maps.popitem(last=False)
+        return value
+
+    def _dir(self, company: str, year) -> str:
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9_.-]", "_", f"{company}_{year}"))
+
+    def _paths(self, company: str, year, item: str) -> tuple:
+        base = os.path.join(self._dir(company, year), re.sub(r"[^A-Za-z0-9_.-]", "_", item))
+        return base + ".npy", base + ".ids.json"
+
+    def _int8_paths(self, company: str, year, item: str) -> tuple:
+        npy = self._paths(company, year, item)[0]
+        return npy[:-4] + ".i8.npy", npy[:-4] + ".scale.npy"
+
+    # ---- writes --------------------------------------------------------
+    def write_section(self, company: str, year, item: str, ids: list, embeddings):
+        """Write one section's matrix + ids (atomically: readers see the old or the new pair)."""
+        matrix = normalize(embeddings).reshape(len(ids), -1)
+        npy, ids_path = self._paths(company, year, item)
+        os.makedirs(os.path.dirname(npy), exist_ok=True)
+        tmp = f"{ids_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(list(ids), f)
+        # ids first: a reader only trusts matrices whose row count matches its ids
+        os.replace(tmp, ids_path)
+        if self.tier == "int8":
+            codes, scales = quantize(matrix)
+            i8, scale = self._int8_paths(company, year, item)
+            _save(scale, scales)
+            _save(i8, codes)
+        _save(npy, matrix)
+
+    def delete_filing(self, company: str, year):
+        shutil.rmtree(self._dir(company, year), ignore_errors=True)
+
+    # ---- reads ---------------------------------------------------------
+    def has_sections(self, company: str, year, items: list) -> bool:
+        return all(os.path.exists(self._paths(company, year, i)[0]) for i in items)
+
+    def load_section(self, company: str, year, item: str) -> tuple:
+        """(ids, memory-mapped matrix) or ([], None) if missing / half-written."""
+        npy, ids_path = self._paths(company, year, item)
+        try:
+            ids = self._open(ids_path)
+            matrix = self._open(npy)
+        except (OSError, ValueError):
+            return [], None
+        if matrix.shape[0] != len(ids):
+            return [], None
+        return ids, matrix
+
+    def load_int8(self, company: str, year, item: str, rows: int) -> tuple:
+        """(codes, scales) memory-mapped, or (None, None) if the section has no int8 tier."""
+        i8, scale = self._int8_paths(company, year, item)
+        try:
+            codes, scales = self._open(i8), self._open(scale)
+        except (OSError, ValueError):
+            return None, None
+        if codes.shape[0] != rows or scales.shape[0] != rows:
+            return None, None
+        return codes, scales
+
+    def search(self, query_vec, scopes: list, k: int) -> list | None:
+        """
+        Cosine top-k over the given (company, year, items) scopes: exact on the
+        float32 tier, int8 scan + float32 re-scoring on the int8 tier.
+        → [(chunk_id, score), ...] best first, or None if a section is missing.
+        """
+        q = normalize(query_vec).reshape(-1)
+        all_ids, matrices, approx = [], [], []
+        quantized = False
+        for company, year, items in scopes:
+            for item in items:
+                ids, matrix = self.load_section(company, year, item)
+                if matrix is None:
+                    return None
+                codes, scales = self.load_int8(company, year, item, len(ids)) if self.tier == "int8" else (None, None)
+                if codes is not None:
+                    approx.append((codes @ q) * scales)
+                    quantized = True
+                else:
+                    approx.append(matrix @ q)
+                all_ids += ids
+                matrices.append(matrix)
+        if not all_ids:
+            return []
+        scores = np.concatenate(approx)
+        if not quantized:
+            return [(all_ids[i], float(scores[i])) for i in top_k(scores, k)]
+
+        # Re-score the int8 shortlist with the float32 rows (only these rows are read)
+        cand = top_k(scores, k * max(1, self.rescore))
+        offsets = np.cumsum([0] + [m.shape[0] for m in matrices])
+        which = np.searchsorted(offsets, cand, side="right") - 1
+        exact = np.empty(len(cand), dtype=np.float32)
+        for sec in np.unique(which):
+            mask = which == sec
+            exact[mask] = matrices[sec][cand[mask] - offsets[sec]] @ q
+        return [(all_ids[cand[i]], float(exact[i])) for i in top_k(exact, k)]
+
+    def footprint(self, company: str, year, items: list, k: int = 6) -> dict:
+        """
+        For these sections:
+        - disk_bytes: the vector files on disk, float32 and int8 tiers and both
+          together (the int8 tier adds files, Chroma keeps its own copy too)
+        - query_bytes: what one top-k search reads (and keeps resident in the
+          page cache) on each tier: every float32 row, or every int8 code +
+          scale plus the k × rescore float32 rows re-scored
+        """
+        f32 = i8 = rows = row_bytes = 0
+        for item in items:
+            npy = self._paths(company, year, item)[0]
+            codes, scale = self._int8_paths(company, year, item)
+            f32 += os.path.getsize(npy) if os.path.exists(npy) else 0
+            i8 += sum(os.path.getsize(p) for p in (codes, scale) if os.path.exists(p))
+            ids, matrix = self.load_section(company, year, item)
+            if matrix is not None:
+                rows, row_bytes = rows + len(ids), matrix.shape[1] * 4
+        # search() re-scores one shortlist across all the sections, not one per section
+        rescored = min(rows, k * max(1, self.rescore)) * row_bytes
+        return {
+            "disk_bytes": {"float32": f32, "int8": i8, "total": f32 + i8},
+            "query_bytes": {"float32": f32, "int8": i8 + rescored if i8 else None},
+        }